@@ -0,0 +1 @@
+"""SDP workflow library benchmarks."""
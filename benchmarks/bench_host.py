@@ -0,0 +1,140 @@
+"""Benchmark claiming and completing many processing blocks in one process.
+
+Creates batch processing blocks on the memory config DB backend and drives
+each of them through an empty phase, either with a :class:`WorkflowHost`
+sharing one config DB client, or with one :class:`ProcessingBlock` (and so
+one client) per processing block, in the same number of threads. Reports
+the processing blocks claimed and completed per second and the number of
+config DB clients opened.
+
+Usage::
+
+    python -m benchmarks.bench_host [--pbs 100 1000] [--threads 8]
+        [--output results.json]
+
+"""
+
+import argparse
+import concurrent.futures
+import json
+import platform
+import time
+from unittest.mock import patch
+
+import ska_sdp_config
+
+from ska_sdp_workflow import __version__, workflow
+from ska_sdp_workflow.host import WorkflowHost
+
+SBI_ID = "sbi-bench-20210101-00000"
+
+
+def setup_config_db(config, n_pbs):
+    """Create the SBI and the processing blocks with their states."""
+    for path in ("/pb", "/sb", "/deploy"):
+        config.backend.delete(path, must_exist=False, recursive=True)
+
+    pb_ids = ["pb-bench-20210101-{:05d}".format(i) for i in range(n_pbs)]
+    sbi = {
+        "id": SBI_ID,
+        "subarray_id": "01",
+        "scan_types": [],
+        "pb_realtime": [],
+        "pb_batch": pb_ids,
+        "pb_receive_addresses": None,
+        "current_scan_type": None,
+        "scan_id": None,
+        "status": "ACTIVE",
+    }
+    for txn in config.txn():
+        txn.create_scheduling_block(SBI_ID, sbi)
+    for pb_id in pb_ids:
+        pb = ska_sdp_config.ProcessingBlock(
+            pb_id,
+            SBI_ID,
+            {"type": "batch", "id": "bench", "version": "0.1.0"},
+            parameters={},
+            dependencies=[],
+        )
+        for txn in config.txn():
+            txn.create_processing_block(pb)
+            txn.create_processing_block_state(
+                pb_id, {"status": "WAITING", "resources_available": True}
+            )
+    return pb_ids
+
+
+def run_phase(pb):
+    """Drive a processing block through an empty phase."""
+    with pb.create_phase("Work", []):
+        pass
+
+
+def run_separate(pb_id):
+    """Claim a processing block with its own client and drive it."""
+    pb = workflow.ProcessingBlock(pb_id)
+    try:
+        run_phase(pb)
+    finally:
+        pb.exit()
+
+
+def run_mode(mode, pb_ids, n_threads):
+    """Drive the processing blocks and return the rate and clients opened."""
+    with patch.object(
+        workflow, "new_config_db", wraps=workflow.new_config_db
+    ) as new_config_db:
+        start = time.perf_counter()
+        if mode == "host":
+            with WorkflowHost(max_pbs=n_threads) as host:
+                host.run(pb_ids, run_phase)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(n_threads) as pool:
+                list(pool.map(run_separate, pb_ids))
+        wall_time = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "pbs": len(pb_ids),
+        "wall_time": wall_time,
+        "pbs_per_second": len(pb_ids) / wall_time,
+        "clients": new_config_db.call_count,
+    }
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pbs", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    workflow.FEATURE_CONFIG_DB.set_default(False)
+    config = workflow.new_config_db()
+
+    results = []
+    for n_pbs in args.pbs:
+        for mode in ("separate", "host"):
+            pb_ids = setup_config_db(config, n_pbs)
+            result = run_mode(mode, pb_ids, args.threads)
+            results.append(result)
+            print(
+                "{pbs:>6} PBs {mode:<8} {wall_time:>9.3f} s"
+                " {pbs_per_second:>9.1f} PB/s {clients:>6} clients".format(**result)
+            )
+
+    config.close()
+
+    if args.output:
+        report = {
+            "version": __version__,
+            "python": platform.python_version(),
+            "threads": args.threads,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Benchmark the workflow lifecycle on the memory config DB backend.
+
+Runs the operations of a real-time workflow (claiming the processing block,
+planning receive processes, converting parameters, entering the phase,
+deploying Helm charts, publishing receive addresses and exiting the phase)
+and reports the wall time, the number of transactions, reads, writes and the
+number of bytes written for each operation, as recorded by the instrumented
+config DB client.
+
+The memory backend is selected by default, it can be overridden by setting
+the FEATURE_CONFIG_DB environment variable.
+
+Usage::
+
+    python -m benchmarks.bench_lifecycle [--channels 100 10000]
+        [--scan-types 1 4] [--deployments 1 16] [--output results.json]
+
+"""
+# pylint: disable=too-few-public-methods
+
+import argparse
+import itertools
+import json
+import platform
+import time
+
+import ska_sdp_config
+
+from ska_sdp_workflow import __version__, instrumentation, workflow
+from ska_sdp_workflow.instrumentation import METRICS
+
+SBI_ID = "sbi-bench-20210101-00000"
+PB_ID = "pb-bench-20210101-00000"
+NAMESPACE = "sdp"
+
+
+class Recorder:
+    """Measure the operations of one lifecycle run."""
+
+    def __init__(self):
+        self.results = []
+
+    def measure(self, operation, func, *args, calls=1):
+        """Call a function and record its wall time, transactions and bytes.
+
+        The transactions and bytes written are taken from the metrics of the
+        instrumented config DB client.
+
+        """
+        before = _config_totals()
+        start = time.perf_counter()
+        for _ in range(calls):
+            result = func(*args)
+        wall_time = time.perf_counter() - start
+        after = _config_totals()
+        self.results.append(
+            dict(
+                {"operation": operation, "calls": calls, "wall_time": wall_time},
+                **{key: after[key] - before[key] for key in after}
+            )
+        )
+        return result
+
+
+def _config_totals():
+    """Get the totals of the config DB metrics."""
+    return {
+        key: METRICS.total(name)
+        for key, name in (
+            ("transactions", "config_transactions_total"),
+            ("retries", "config_transaction_retries_total"),
+            ("reads", "config_reads_total"),
+            ("writes", "config_writes_total"),
+            ("bytes_written", "config_bytes_written_total"),
+        )
+    }
+
+
+def make_scan_types(n_scan_types, n_channels):
+    """Make scan types with the given number of channels."""
+    return [
+        {
+            "id": "scan_{}".format(i),
+            "channels": [
+                {"count": n_channels, "start": 0, "stride": 1},
+            ],
+        }
+        for i in range(n_scan_types)
+    ]
+
+
+def make_parameters(n_channels):
+    """Make flattened parameters with per-channel settings."""
+    parameters = {"reception.receiver_port_start": 9000, "reception.num_ports": 1}
+    for i in range(min(n_channels, 10000)):
+        parameters["channels.{}.gain".format(i)] = 1.0
+    return parameters
+
+
+def setup_config_db(config, n_channels, n_scan_types):
+    """Create the SBI, the PB and its state."""
+    for path in ("/pb", "/sb", "/deploy"):
+        config.backend.delete(path, must_exist=False, recursive=True)
+
+    sbi = {
+        "id": SBI_ID,
+        "subarray_id": "01",
+        "scan_types": make_scan_types(n_scan_types, n_channels),
+        "pb_realtime": [PB_ID],
+        "pb_batch": [],
+        "pb_receive_addresses": None,
+        "current_scan_type": None,
+        "scan_id": None,
+        "status": "ACTIVE",
+    }
+    pb = ska_sdp_config.ProcessingBlock(
+        PB_ID,
+        SBI_ID,
+        {"type": "realtime", "id": "bench", "version": "0.1.0"},
+        parameters=make_parameters(n_channels),
+        dependencies=[],
+    )
+    for txn in config.txn():
+        txn.create_scheduling_block(SBI_ID, sbi)
+        txn.create_processing_block(pb)
+        txn.create_processing_block_state(
+            PB_ID, {"status": "WAITING", "resources_available": True}
+        )
+
+
+def run_lifecycle(config, n_channels, n_scan_types, n_deployments):
+    """Run the workflow lifecycle once."""
+    setup_config_db(config, n_channels, n_scan_types)
+
+    recorder = Recorder()
+    pb = recorder.measure("claim", workflow.ProcessingBlock, PB_ID)
+
+    scan_types = pb.get_scan_types()
+    host_port, num_process = recorder.measure(
+        "configure_recv_processes_ports",
+        pb.configure_recv_processes_ports,
+        scan_types,
+        20,
+        9000,
+        1,
+    )
+    values = recorder.measure(
+        "nested_parameters", pb.nested_parameters, pb.get_parameters()
+    )
+    values["replicas"] = num_process
+
+    phase = pb.create_phase("Work", [])
+    recorder.measure("phase_enter", phase.__enter__)
+
+    deploy_names = iter(["receive-{}".format(i) for i in range(n_deployments)])
+    recorder.measure(
+        "ee_deploy_helm",
+        lambda: phase.ee_deploy_helm(next(deploy_names), values),
+        calls=n_deployments,
+    )
+    recorder.measure(
+        "receive_addresses",
+        pb.receive_addresses,
+        "proc-{}-receive-0".format(PB_ID),
+        None,
+        NAMESPACE,
+        host_port,
+    )
+    recorder.measure("phase_exit", phase.__exit__, None, None, None)
+    pb.exit()
+
+    return recorder.results
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--scan-types", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--deployments", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    workflow.FEATURE_CONFIG_DB.set_default(False)
+    instrumentation.FEATURE_COUNT_BYTES.set_default(True)
+    config = workflow.new_config_db()
+
+    results = []
+    for n_channels, n_scan_types, n_deployments in itertools.product(
+        args.channels, args.scan_types, args.deployments
+    ):
+        params = {
+            "channels": n_channels,
+            "scan_types": n_scan_types,
+            "deployments": n_deployments,
+        }
+        runs = [
+            run_lifecycle(config, n_channels, n_scan_types, n_deployments)
+            for _ in range(args.repeat)
+        ]
+        for operation in zip(*runs):
+            result = dict(operation[0], **params)
+            result["wall_time"] = min(op["wall_time"] for op in operation)
+            results.append(result)
+            print(
+                "{channels:>7} {scan_types:>3} {deployments:>3} {operation:<32}"
+                " {wall_time:>10.6f} s {transactions:>4} txn {reads:>4} r"
+                " {writes:>4} w {bytes_written:>10} B".format(**result)
+            )
+
+    config.close()
+
+    if args.output:
+        report = {
+            "version": __version__,
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
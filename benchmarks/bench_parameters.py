@@ -0,0 +1,73 @@
+"""Benchmark the validation and conversion of workflow parameters.
+
+Compares validating parameters with a schema compiled on every call against
+the cached validator, and converting the flattened parameters to nested
+parameters with the original recursive approach and the iterative approach,
+for 10 to 100k channels with per-channel settings.
+
+Usage::
+
+    python -m benchmarks.bench_parameters [--output results.json]
+
+"""
+
+import argparse
+import json
+
+import jsonschema
+
+from ska_sdp_workflow import parameters
+from tests.test_parameters import make_parameters, recursive_nested_parameters
+from .bench_recv_planner import CHANNEL_COUNTS, time_call
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reception.receiver_port_start": {"type": "integer"},
+        "reception.num_ports": {"type": "integer", "minimum": 1},
+    },
+    "patternProperties": {"^channels\\.[0-9]+\\.": {"type": "number"}},
+    "required": ["reception.num_ports"],
+}
+
+
+def validate_uncached(flat, schema):
+    """Validate parameters, compiling the schema every time."""
+    jsonschema.validate(flat, schema)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    print(
+        "{:>10} {:>12} {:>12} {:>12} {:>12}".format(
+            "channels", "validate", "cached", "recursive", "iterative"
+        )
+    )
+    for n_channels in CHANNEL_COUNTS:
+        flat = make_parameters(n_channels)
+        assert parameters.unflatten(flat) == recursive_nested_parameters(flat)
+        result = {
+            "channels": n_channels,
+            "validate": time_call(validate_uncached, flat, SCHEMA),
+            "validate_cached": time_call(parameters.validate, flat, SCHEMA),
+            "nested_recursive": time_call(recursive_nested_parameters, flat),
+            "nested_iterative": time_call(parameters.unflatten, flat),
+        }
+        results.append(result)
+        print(
+            "{channels:>10} {validate:>12.6f} {validate_cached:>12.6f}"
+            " {nested_recursive:>12.6f} {nested_iterative:>12.6f}".format(**result)
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
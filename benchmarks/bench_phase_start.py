@@ -0,0 +1,117 @@
+"""Benchmark the reads and log lines of starting a phase.
+
+Starts a phase of a real-time workflow repeatedly on the memory config DB
+backend and reports, per phase start, the number of transactions, the number
+of reads, the number of state checks, and the number of log lines written by
+the library at INFO level. Wake-ups of the transaction loop while waiting for
+resources (e.g. caused by changes of unrelated keys) are simulated by checking
+the state again in new transactions.
+
+Usage::
+
+    python -m benchmarks.bench_phase_start [--starts 100] [--wakeups 0 10]
+        [--output results.json]
+
+"""
+
+import argparse
+import json
+import logging
+import platform
+import time
+
+from ska_sdp_workflow import __version__, workflow
+from ska_sdp_workflow.instrumentation import METRICS
+
+from .bench_lifecycle import PB_ID, setup_config_db
+
+
+class CountHandler(logging.Handler):
+    """Count the log records."""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def _totals():
+    """Get the totals of the metrics of interest."""
+    labels = {"pb_id": PB_ID, "phase": "Work"}
+    return {
+        "transactions": METRICS.total("config_transactions_total"),
+        "reads": METRICS.total("config_reads_total"),
+        "checks": METRICS.get("phase_state_checks_total", labels) or 0,
+    }
+
+
+def run_starts(config, pb, n_starts, n_wakeups):
+    """Start the phase repeatedly and return the totals per start."""
+    handler = CountHandler()
+    logger = logging.getLogger("ska_sdp_workflow")
+    logger.addHandler(handler)
+    level = logger.level
+    logger.setLevel(logging.INFO)
+
+    before = _totals()
+    start = time.perf_counter()
+    for _ in range(n_starts):
+        phase = pb.create_phase("Work", [])
+        for _ in range(n_wakeups):
+            for txn in config.txn():
+                phase.check_state(txn)
+        phase.__enter__()  # pylint: disable=unnecessary-dunder-call
+    wall_time = time.perf_counter() - start
+    after = _totals()
+
+    logger.removeHandler(handler)
+    logger.setLevel(level)
+
+    result = {key: (value - before[key]) / n_starts for key, value in after.items()}
+    result["log_lines"] = handler.count / n_starts
+    result["wall_time"] = wall_time / n_starts
+    return result
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--starts", type=int, default=100)
+    parser.add_argument("--wakeups", type=int, nargs="+", default=[0, 10])
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    workflow.FEATURE_CONFIG_DB.set_default(False)
+    config = workflow.new_config_db()
+    setup_config_db(config, 10, 1)
+    pb = workflow.ProcessingBlock(PB_ID)
+
+    results = []
+    for n_wakeups in args.wakeups:
+        result = dict(run_starts(config, pb, args.starts, n_wakeups))
+        result["wakeups"] = n_wakeups
+        results.append(result)
+        print(
+            "{wakeups:>4} wake-ups {wall_time:>10.6f} s {transactions:>6.1f} txn"
+            " {reads:>6.1f} r {checks:>6.1f} chk"
+            " {log_lines:>6.1f} log".format(**result)
+        )
+
+    pb.exit()
+    config.close()
+
+    if args.output:
+        report = {
+            "version": __version__,
+            "python": platform.python_version(),
+            "starts": args.starts,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
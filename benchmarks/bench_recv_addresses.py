@@ -0,0 +1,87 @@
+"""Benchmark the compact receive address encoding.
+
+Compares the size and the JSON serialisation time of the receive addresses
+in the full and the compact encodings, for scan types from 10 to 100k
+channels. The encoding and decoding times are also reported.
+
+Usage::
+
+    python -m benchmarks.bench_recv_addresses [--output results.json]
+
+"""
+
+import argparse
+import json
+
+from ska_sdp_workflow import recv_addresses, recv_planner
+from .bench_recv_planner import (
+    CHANNEL_COUNTS,
+    CHANNELS_PER_PORT,
+    MAX_CHANNELS_PER_PROCESS,
+    PORT_START,
+    make_scan_types,
+    time_call,
+)
+
+DNS_NAME = "proc-pb-bench-20210101-00000-receive{}receive.sdp.svc.cluster.local"
+
+
+def make_receive_addresses(n_channels):
+    """Make the receive addresses for scan types with the given channels."""
+    configured, _ = recv_planner.configure_recv_processes_ports(
+        make_scan_types(n_channels),
+        MAX_CHANNELS_PER_PROCESS,
+        PORT_START,
+        CHANNELS_PER_PORT,
+    )
+    for value in configured.values():
+        for host in value["host"]:
+            host[1] = DNS_NAME.format(host[1])
+    configured["interface"] = "https://schema.skao.int/ska-sdp-recvaddrs/0.2"
+    return configured
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    print(
+        "{:>10} {:>12} {:>12} {:>12} {:>12} {:>12} {:>12}".format(
+            "channels",
+            "full B",
+            "compact B",
+            "full dumps",
+            "compact dumps",
+            "encode",
+            "decode",
+        )
+    )
+    for n_channels in CHANNEL_COUNTS:
+        full = make_receive_addresses(n_channels)
+        compact = recv_addresses.encode(full)
+        assert recv_addresses.decode(compact) == full
+        result = {
+            "channels": n_channels,
+            "full_bytes": len(json.dumps(full)),
+            "compact_bytes": len(json.dumps(compact)),
+            "full_dumps": time_call(json.dumps, full),
+            "compact_dumps": time_call(json.dumps, compact),
+            "encode": time_call(recv_addresses.encode, full),
+            "decode": time_call(recv_addresses.decode, compact),
+        }
+        results.append(result)
+        print(
+            "{channels:>10} {full_bytes:>12} {compact_bytes:>12} {full_dumps:>12.6f}"
+            " {compact_dumps:>12.6f} {encode:>12.6f} {decode:>12.6f}".format(**result)
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
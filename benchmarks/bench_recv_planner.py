@@ -0,0 +1,92 @@
+"""Benchmark the receive process and port planner.
+
+Compares the vectorised planner in :mod:`ska_sdp_workflow.recv_planner`
+(equivalence mode and arrays mode) against the original loop-based
+implementation, for scan types from 10 to 100k channels.
+
+Usage::
+
+    python -m benchmarks.bench_recv_planner [--output results.json]
+
+"""
+
+import argparse
+import json
+import timeit
+
+from ska_sdp_workflow import recv_planner
+from tests.test_recv_planner import loop_configure_recv_processes_ports
+
+CHANNEL_COUNTS = [10, 100, 1000, 10000, 100000]
+CHANNELS_PER_BLOCK = 1000
+MAX_CHANNELS_PER_PROCESS = 20
+PORT_START = 9000
+CHANNELS_PER_PORT = 1
+
+
+def make_scan_types(n_channels, n_scan_types=2):
+    """Make scan types with the given number of channels each."""
+    scan_types = []
+    for i in range(n_scan_types):
+        channels = []
+        start = 0
+        remaining = n_channels
+        while remaining > 0:
+            count = min(remaining, CHANNELS_PER_BLOCK)
+            channels.append({"count": count, "start": start, "stride": 1})
+            start += count
+            remaining -= count
+        scan_types.append({"id": "scan_{}".format(i), "channels": channels})
+    return scan_types
+
+
+def time_call(func, *args, **kwargs):
+    """Return the best time of a call in seconds."""
+    number = 1
+    timer = timeit.Timer(lambda: func(*args, **kwargs))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    params = (MAX_CHANNELS_PER_PROCESS, PORT_START, CHANNELS_PER_PORT)
+    results = []
+    print(
+        "{:>10} {:>12} {:>12} {:>12}".format("channels", "loop", "equivalent", "arrays")
+    )
+    for n_channels in CHANNEL_COUNTS:
+        scan_types = make_scan_types(n_channels)
+        assert loop_configure_recv_processes_ports(
+            scan_types, *params
+        ) == recv_planner.configure_recv_processes_ports(scan_types, *params)
+        result = {
+            "channels": n_channels,
+            "loop": time_call(loop_configure_recv_processes_ports, scan_types, *params),
+            "equivalent": time_call(
+                recv_planner.configure_recv_processes_ports, scan_types, *params
+            ),
+            "arrays": time_call(
+                recv_planner.configure_recv_processes_ports,
+                scan_types,
+                *params,
+                mode=recv_planner.ARRAYS
+            ),
+        }
+        results.append(result)
+        print(
+            "{channels:>10} {loop:>12.6f} {equivalent:>12.6f} {arrays:>12.6f}".format(
+                **result
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
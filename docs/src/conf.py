@@ -24,6 +24,7 @@ import sys
 
 autodoc_mock_imports = [
     "distributed",
+    "numpy",
     "ska_sdp_config",
     "ska_ser_logging",
     "ska_telmodel",
@@ -1,23 +1,86 @@
 # -*- coding: utf-8 -*-
-"""SDP Workflow Library."""
+"""SDP Workflow Library.
+
+The classes are imported from their modules on first use, so that a
+workflow only loads the execution engines (and their dependencies, such as
+Dask) that it uses.
+"""
+
 # pylint: disable=invalid-name
 
+import importlib
+from typing import TYPE_CHECKING
+
+from . import startup
 from .version import __version__
-from .workflow import ProcessingBlock
-from .phase import Phase
-from .ee_base_deploy import EEDeploy
-from .helm_deploy import HelmDeploy
-from .dask_deploy import DaskDeploy
-from .buffer_request import BufferRequest
-from .fake_deploy import FakeDeploy
+
+# Record the imports from here on if the startup profiler is enabled
+startup.start_from_env()
+
+if TYPE_CHECKING:
+    from .workflow import ProcessingBlock
+    from .host import WorkflowHost
+    from .phase import Phase, ProcessingCancelledError
+    from .phase_events import PhaseEvent
+    from .ee_base_deploy import EEDeploy, DeploymentFailedError
+    from .helm_deploy import HelmDeploy
+    from .dask_deploy import DaskDeploy
+    from .buffer_request import BufferRequest
+    from .fake_deploy import FakeDeploy
+    from .process_deploy import ProcessDeploy
+    from .async_workflow import AsyncProcessingBlock
+    from .async_phase import AsyncPhase
+    from .startup import fast_start
 
 __all__ = [
     "__version__",
     "ProcessingBlock",
+    "WorkflowHost",
     "BufferRequest",
     "Phase",
+    "ProcessingCancelledError",
+    "PhaseEvent",
     "EEDeploy",
+    "DeploymentFailedError",
     "HelmDeploy",
     "DaskDeploy",
     "FakeDeploy",
+    "ProcessDeploy",
+    "AsyncProcessingBlock",
+    "AsyncPhase",
+    "fast_start",
 ]
+
+# Module containing each of the lazily-loaded classes
+_LAZY_MODULES = {
+    "ProcessingBlock": ".workflow",
+    "WorkflowHost": ".host",
+    "BufferRequest": ".buffer_request",
+    "Phase": ".phase",
+    "ProcessingCancelledError": ".phase",
+    "PhaseEvent": ".phase_events",
+    "EEDeploy": ".ee_base_deploy",
+    "DeploymentFailedError": ".ee_base_deploy",
+    "HelmDeploy": ".helm_deploy",
+    "DaskDeploy": ".dask_deploy",
+    "FakeDeploy": ".fake_deploy",
+    "ProcessDeploy": ".process_deploy",
+    "AsyncProcessingBlock": ".async_workflow",
+    "AsyncPhase": ".async_phase",
+    "fast_start": ".startup",
+}
+
+
+def __getattr__(name):
+    """Import a class from its module on first use."""
+    if name not in _LAZY_MODULES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    module = importlib.import_module(_LAZY_MODULES[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List the attributes of the module, including the lazy ones."""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,259 @@
+"""Asyncio phase class module for SDP workflow."""
+
+import asyncio
+import functools
+import logging
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+
+async def run_in_executor(executor, func, *args, **kwargs):
+    """
+    Run a blocking function in an executor.
+
+    :param executor: executor, or None to use the default executor of the loop
+    :type executor: concurrent.futures.Executor
+    :param func: function to run
+    :type func: function
+    :returns: return value of the function
+
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+class AsyncPhase:
+    """
+    Workflow phase, asyncio version.
+
+    This wraps a :class:`Phase` and runs its blocking configuration DB
+    operations in an executor, so that the event loop is free to do other work
+    while waiting. It is used as an asynchronous context manager:
+
+    .. code-block:: python
+
+        async with phase:
+            deploy = await phase.ee_deploy_helm("receive", values)
+            await phase.wait_for(deploy)
+
+    This should not be created directly, use the
+    :func:`AsyncProcessingBlock.create_phase()` method instead.
+
+    :param phase: workflow phase
+    :type phase: :class:`Phase`
+    :param executor: executor for blocking calls, None to use the default
+    :type executor: concurrent.futures.Executor, optional
+    """
+
+    def __init__(self, phase, executor=None):
+        self._phase = phase
+        self._executor = executor
+
+    async def __aenter__(self):
+        """
+        Wait for resources to be available.
+
+        See :func:`Phase.__enter__`.
+        """
+        await run_in_executor(self._executor, self._phase.__enter__)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """
+        Clean up deployments and update the processing block state.
+
+        See :func:`Phase.__exit__`.
+        """
+        await run_in_executor(
+            self._executor, self._phase.__exit__, exc_type, exc_val, exc_tb
+        )
+
+    def get_phase(self):
+        """
+        Get the underlying phase.
+
+        :rtype: :class:`Phase`
+
+        """
+        return self._phase
+
+    async def ee_deploy_test(self, deploy_name, func=None, f_args=None):
+        """
+        Deploy a fake execution engine.
+
+        See :func:`Phase.ee_deploy_test`.
+
+        :rtype: :class:`FakeDeploy`
+
+        """
+        return await run_in_executor(
+            self._executor, self._phase.ee_deploy_test, deploy_name, func, f_args
+        )
+
+    async def ee_deploy_local(self, deploy_name, func, batch, **kwargs):
+        """
+        Deploy a local process pool execution engine.
+
+        See :func:`Phase.ee_deploy_local`.
+
+        :rtype: :class:`ProcessDeploy`
+
+        """
+        return await run_in_executor(
+            self._executor,
+            self._phase.ee_deploy_local,
+            deploy_name,
+            func,
+            batch,
+            **kwargs
+        )
+
+    async def ee_deploy_helm(self, deploy_name, values=None, track_ready=False):
+        """
+        Deploy a Helm execution engine.
+
+        See :func:`Phase.ee_deploy_helm`.
+
+        :rtype: :class:`HelmDeploy`
+
+        """
+        return await run_in_executor(
+            self._executor,
+            self._phase.ee_deploy_helm,
+            deploy_name,
+            values,
+            track_ready=track_ready,
+        )
+
+    async def ee_deploy_helm_bulk(self, charts, track_ready=False):
+        """
+        Deploy several Helm execution engines together.
+
+        See :func:`Phase.ee_deploy_helm_bulk`.
+
+        :rtype: :class:`DeploymentGroup`
+
+        """
+        return await run_in_executor(
+            self._executor,
+            self._phase.ee_deploy_helm_bulk,
+            charts,
+            track_ready=track_ready,
+        )
+
+    async def ee_deploy_dask(self, name, n_workers, func, f_args, **kwargs):
+        """
+        Deploy a Dask execution engine.
+
+        See :func:`Phase.ee_deploy_dask`.
+
+        :rtype: :class:`DaskDeploy`
+
+        """
+        return await run_in_executor(
+            self._executor,
+            self._phase.ee_deploy_dask,
+            name,
+            n_workers,
+            func,
+            f_args,
+            **kwargs
+        )
+
+    async def ee_remove(self):
+        """
+        Remove execution engines deployments.
+
+        See :func:`Phase.ee_remove`.
+        """
+        await run_in_executor(self._executor, self._phase.ee_remove)
+
+    async def update_pb_state(self, status=None):
+        """
+        Update processing block state.
+
+        See :func:`Phase.update_pb_state`.
+        """
+        await run_in_executor(self._executor, self._phase.update_pb_state, status)
+
+    async def wait_loop(self):
+        """
+        Wait loop to check the status of the processing block.
+
+        This is the asynchronous iterator version of :func:`Phase.wait_loop`.
+        Each step of the loop, including the wait for changes requested with
+        ``txn.loop(wait=True)``, runs in the executor.
+        """
+        sync_loop = self._phase.wait_loop()
+        try:
+            while True:
+                txn = await run_in_executor(self._executor, next, sync_loop, None)
+                if txn is None:
+                    break
+                yield txn
+        finally:
+            try:
+                sync_loop.close()
+            except ValueError:
+                # Still running in the executor after being cancelled
+                pass
+
+    async def events(self, **kwargs):
+        """
+        Wait for changes of the processing block.
+
+        This is the asynchronous iterator version of :func:`Phase.events`.
+        The stream is read in the executor.
+        """
+        sync_events = await run_in_executor(
+            self._executor, self._phase.events, **kwargs
+        )
+        try:
+            while True:
+                event = await run_in_executor(self._executor, next, sync_events, None)
+                if event is None:
+                    break
+                yield event
+        finally:
+            try:
+                sync_events.close()
+            except ValueError:
+                # Still running in the executor after being cancelled
+                pass
+
+    async def wait_for(self, *deploys, timeout=None):
+        """
+        Wait for deployments to finish.
+
+        See :func:`Phase.wait_for`. The wait runs in the executor, so waiting
+        for many deployments uses only one thread.
+
+        :param deploys: deployments
+        :type deploys: :class:`EEDeploy`
+        :param timeout: timeout in seconds
+        :type timeout: float, optional
+        :raises TimeoutError: if the deployments do not finish in time
+
+        """
+        await run_in_executor(
+            self._executor, self._phase.wait_for, *deploys, timeout=timeout
+        )
+
+    async def wait_until_ready(self, deploy, timeout=None):
+        """
+        Wait for a Helm deployment or a group of deployments to be ready.
+
+        See :func:`HelmDeploy.wait_until_ready` and
+        :func:`DeploymentGroup.wait_until_ready`.
+
+        :param deploy: deployment or group of deployments
+        :type deploy: :class:`HelmDeploy` or :class:`DeploymentGroup`
+        :param timeout: timeout in seconds
+        :type timeout: float, optional
+        :returns: time to ready in seconds
+        :rtype: float
+
+        """
+        return await run_in_executor(self._executor, deploy.wait_until_ready, timeout)
@@ -0,0 +1,169 @@
+"""Asyncio API for SKA SDP workflows."""
+
+from .async_phase import AsyncPhase, run_in_executor
+from .workflow import ProcessingBlock
+
+
+class AsyncProcessingBlock:
+    """
+    Claim the processing block, asyncio version.
+
+    This wraps a :class:`ProcessingBlock` and runs its blocking configuration
+    DB operations in an executor. Since claiming the processing block blocks,
+    it is created with the :func:`create` coroutine:
+
+    .. code-block:: python
+
+        pb = await AsyncProcessingBlock.create(pb_id)
+        phase = pb.create_phase("Work", [])
+
+        async with phase:
+            ...
+
+    :param pb: processing block
+    :type pb: :class:`ProcessingBlock`
+    :param executor: executor for blocking calls, None to use the default
+    :type executor: concurrent.futures.Executor, optional
+    """
+
+    def __init__(self, pb, executor=None):
+        self._pb = pb
+        self._executor = executor
+
+    @classmethod
+    async def create(cls, pb_id=None, executor=None, **kwargs):
+        """
+        Claim the processing block.
+
+        :param pb_id: processing block ID
+        :type pb_id: str, optional
+        :param executor: executor for blocking calls, None to use the default
+        :type executor: concurrent.futures.Executor, optional
+        :param kwargs: other arguments passed to :class:`ProcessingBlock`
+        :returns: the processing block
+        :rtype: :class:`AsyncProcessingBlock`
+
+        """
+        pb = await run_in_executor(executor, ProcessingBlock, pb_id, **kwargs)
+        return cls(pb, executor)
+
+    def get_processing_block(self):
+        """
+        Get the underlying processing block.
+
+        :rtype: :class:`ProcessingBlock`
+
+        """
+        return self._pb
+
+    async def receive_addresses(
+        self,
+        chart_name=None,
+        service_name=None,
+        namespace=None,
+        configured_host_port=None,
+        compact=False,
+    ):
+        """
+        Generate receive addresses and update the processing block state.
+
+        See :func:`ProcessingBlock.receive_addresses`.
+        """
+        await run_in_executor(
+            self._executor,
+            self._pb.receive_addresses,
+            chart_name,
+            service_name,
+            namespace,
+            configured_host_port,
+            compact,
+        )
+
+    async def stream_receive_addresses(self, *args, **kwargs):
+        """
+        Generate receive addresses and write them in chunks.
+
+        See :func:`ProcessingBlock.stream_receive_addresses`.
+
+        :rtype: int
+
+        """
+        return await run_in_executor(
+            self._executor, self._pb.stream_receive_addresses, *args, **kwargs
+        )
+
+    def get_parameters(self, schema=None):
+        """
+        Get workflow parameters from processing block.
+
+        See :func:`ProcessingBlock.get_parameters`.
+
+        :rtype: dict
+
+        """
+        return self._pb.get_parameters(schema)
+
+    async def get_scan_types(self):
+        """
+        Get scan types from the scheduling block instance.
+
+        See :func:`ProcessingBlock.get_scan_types`.
+
+        :rtype: list
+
+        """
+        return await run_in_executor(self._executor, self._pb.get_scan_types)
+
+    def request_buffer(self, size, tags):
+        """
+        Request a buffer reservation.
+
+        See :func:`ProcessingBlock.request_buffer`.
+
+        :rtype: :class:`BufferRequest`
+
+        """
+        return self._pb.request_buffer(size, tags)
+
+    def create_phase(self, name, requests, **kwargs):
+        """
+        Create a workflow phase for deploying execution engines.
+
+        See :func:`ProcessingBlock.create_phase`.
+
+        :rtype: :class:`AsyncPhase`
+
+        """
+        return AsyncPhase(
+            self._pb.create_phase(name, requests, **kwargs), self._executor
+        )
+
+    def configure_recv_processes_ports(
+        self, scan_types, max_channels_per_process, port_start, channels_per_port
+    ):
+        """
+        Calculate how many receive process(es) and ports are required.
+
+        See :func:`ProcessingBlock.configure_recv_processes_ports`.
+
+        :rtype: dict
+
+        """
+        return self._pb.configure_recv_processes_ports(
+            scan_types, max_channels_per_process, port_start, channels_per_port
+        )
+
+    def nested_parameters(self, parameters):
+        """
+        Convert flattened dictionary to nested dictionary.
+
+        See :func:`ProcessingBlock.nested_parameters`.
+
+        :rtype: dict
+
+        """
+        return self._pb.nested_parameters(parameters)
+
+    async def exit(self):
+        """Close connection to the configuration."""
+        await run_in_executor(self._executor, self._pb.exit)
@@ -0,0 +1,220 @@
+"""Configuration DB cache module for SDP workflow."""
+# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-arguments
+# pylint: disable=broad-except
+
+import copy
+import logging
+import threading
+import time
+
+from .instrumentation import METRICS
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# Names of the cache entries
+PB = "pb"
+SBI = "sbi"
+PB_STATE = "pb_state"
+DEPLOYMENTS = "deployments"
+ENTRIES = (PB, SBI, PB_STATE, DEPLOYMENTS)
+
+
+class ConfigCache:
+    """
+    Read-through cache of the configuration DB entries of a processing block.
+
+    The cache holds the processing block, the scheduling block instance, the
+    processing block state and the list of deployments. An entry is read from
+    the configuration DB on a miss, and it is served from the cache until it
+    is older than the maximum staleness or it is invalidated.
+
+    If watching is enabled, a thread keeps the entries fresh: it reads them
+    in a transaction loop which wakes up when any of them changes, and at
+    least every half of the maximum staleness. Reads then do not need a round
+    trip to the configuration DB. Watching requires a backend which supports
+    waiting for changes (i.e. etcd).
+
+    Values returned by the cache are copies, so they can be modified by the
+    caller.
+
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param sbi_id: scheduling block instance ID
+    :type sbi_id: str
+    :param max_staleness: maximum age of an entry in seconds
+    :type max_staleness: float, optional
+    :param watch: start the thread watching the entries
+    :type watch: bool, optional
+    """
+
+    def __init__(self, config, pb_id, sbi_id, max_staleness=1.0, watch=False):
+        self._config = config
+        self._pb_id = pb_id
+        self._sbi_id = sbi_id
+        self._max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._values = {}
+        self._stamps = {}
+        self._stats = {name: {"hits": 0, "misses": 0} for name in ENTRIES}
+        self._stop = threading.Event()
+        self._watcher = None
+        if watch:
+            self._watcher = threading.Thread(
+                target=self._watch, name="config-cache-{}".format(pb_id), daemon=True
+            )
+            self._watcher.start()
+
+    def get_processing_block(self):
+        """
+        Get the processing block.
+
+        :rtype: ska_sdp_config.ProcessingBlock
+
+        """
+        return self._get(PB)
+
+    def get_scheduling_block(self):
+        """
+        Get the scheduling block instance.
+
+        :rtype: dict
+
+        """
+        return self._get(SBI)
+
+    def get_processing_block_state(self):
+        """
+        Get the processing block state.
+
+        :rtype: dict
+
+        """
+        return self._get(PB_STATE)
+
+    def list_deployments(self):
+        """
+        Get the list of deployment IDs.
+
+        :rtype: list of str
+
+        """
+        return self._get(DEPLOYMENTS)
+
+    def invalidate(self, *names):
+        """
+        Invalidate entries of the cache.
+
+        This should be called after writing to the configuration DB, so that
+        the next read does not return the old value.
+
+        :param names: names of the entries, all entries if none are given
+        :type names: str
+
+        """
+        with self._lock:
+            for name in names or ENTRIES:
+                self._stamps.pop(name, None)
+                self._values.pop(name, None)
+
+    def is_watching(self):
+        """
+        Check if the watcher thread is running.
+
+        :rtype: bool
+
+        """
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def get_stats(self):
+        """
+        Get the number of hits and misses of each entry.
+
+        :returns: hits and misses by entry name
+        :rtype: dict
+
+        """
+        with self._lock:
+            return copy.deepcopy(self._stats)
+
+    def close(self):
+        """Stop the watcher thread."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(self._max_staleness)
+            self._watcher = None
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _get(self, name):
+        """
+        Get an entry, reading it from the configuration DB on a miss.
+
+        :param name: name of the entry
+        :returns: copy of the value
+
+        """
+        with self._lock:
+            stamp = self._stamps.get(name)
+            hit = stamp is not None and time.monotonic() - stamp <= self._max_staleness
+            self._stats[name]["hits" if hit else "misses"] += 1
+            value = self._values.get(name)
+        METRICS.inc(
+            "config_cache_hits_total" if hit else "config_cache_misses_total",
+            {"entry": name},
+        )
+
+        if not hit:
+            for txn in self._config.txn():
+                value = self._read(txn, name)
+            self._store({name: value})
+
+        return copy.deepcopy(value)
+
+    def _read(self, txn, name):
+        """
+        Read an entry from the configuration DB.
+
+        :param txn: SDP configuration transaction
+        :param name: name of the entry
+        :returns: value
+
+        """
+        if name == PB:
+            return txn.get_processing_block(self._pb_id)
+        if name == SBI:
+            return txn.get_scheduling_block(self._sbi_id)
+        if name == PB_STATE:
+            return txn.get_processing_block_state(self._pb_id)
+        return txn.list_deployments()
+
+    def _store(self, values):
+        """
+        Store entries in the cache.
+
+        :param values: values by entry name
+
+        """
+        stamp = time.monotonic()
+        with self._lock:
+            self._values.update(values)
+            for name in values:
+                self._stamps[name] = stamp
+
+    def _watch(self):
+        """Keep the entries fresh until the cache is closed."""
+        LOG.debug("Starting config DB cache watcher")
+        try:
+            for txn in self._config.txn():
+                self._store({name: self._read(txn, name) for name in ENTRIES})
+                if self._stop.is_set():
+                    break
+                txn.loop(wait=True, timeout=self._max_staleness / 2)
+        except Exception as ex:
+            # Entries will be read through until they are invalidated
+            LOG.error("Config DB cache watcher failed: %s", ex)
+        LOG.debug("Stopped config DB cache watcher")
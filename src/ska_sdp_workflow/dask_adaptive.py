@@ -0,0 +1,234 @@
+"""Adaptive scaling of Dask execution engines for SDP workflow."""
+# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-arguments
+# pylint: disable=broad-except
+
+import logging
+import threading
+import time
+
+from .instrumentation import METRICS
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# Default time to wait for the monitor thread to stop in seconds
+STOP_TIMEOUT = 5.0
+
+
+class AdaptiveScaler:
+    """
+    Decide the number of Dask workers from the task backlog.
+
+    The target number of workers is the number needed to run the backlog
+    with the given number of tasks per worker, bounded by the minimum and
+    maximum number of workers. Scaling up is immediate, scaling down only
+    happens once the target has been lower than the current number of workers
+    for the scale-down delay, so that short dips in the backlog do not cause
+    the workers to be restarted.
+
+    :param min_workers: minimum number of workers
+    :type min_workers: int
+    :param max_workers: maximum number of workers
+    :type max_workers: int
+    :param tasks_per_worker: number of tasks in the backlog for each worker
+    :type tasks_per_worker: int, optional
+    :param scale_down_delay: time before scaling down in seconds
+    :type scale_down_delay: float, optional
+    """
+
+    def __init__(
+        self, min_workers, max_workers, tasks_per_worker=2, scale_down_delay=30.0
+    ):
+        if min_workers < 0 or max_workers < min_workers:
+            raise ValueError(
+                "Invalid worker limits {} to {}".format(min_workers, max_workers)
+            )
+        self._min_workers = min_workers
+        self._max_workers = max_workers
+        self._tasks_per_worker = tasks_per_worker
+        self._scale_down_delay = scale_down_delay
+        self._below_since = None
+
+    def clamp(self, n_workers):
+        """
+        Bound a number of workers by the minimum and maximum.
+
+        :param n_workers: number of workers
+        :type n_workers: int
+        :rtype: int
+
+        """
+        return max(self._min_workers, min(self._max_workers, n_workers))
+
+    def decide(self, n_workers, backlog, now=None):
+        """
+        Decide the number of workers.
+
+        :param n_workers: current number of workers
+        :type n_workers: int
+        :param backlog: number of tasks waiting or running
+        :type backlog: int
+        :param now: current time in seconds, defaults to the monotonic clock
+        :type now: float, optional
+        :returns: number of workers
+        :rtype: int
+
+        """
+        now = time.monotonic() if now is None else now
+        target = self.clamp(-(-backlog // self._tasks_per_worker))
+
+        if target >= n_workers:
+            self._below_since = None
+            return target
+
+        if self._below_since is None:
+            self._below_since = now
+        if now - self._below_since < self._scale_down_delay:
+            return n_workers
+
+        self._below_since = None
+        return target
+
+
+class AdaptiveMonitor:
+    """
+    Rescale a Dask deployment while it is computing.
+
+    The monitor thread periodically gets the task backlog from the scheduler
+    and asks the scaler for the number of workers. If it changes, the number
+    of worker replicas in the Helm values of the deployment is updated in the
+    configuration DB. If the configuration DB client cannot update
+    deployments, adaptive scaling is disabled with a warning and the
+    deployment keeps its initial number of workers.
+
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param deploy_id: deployment ID
+    :type deploy_id: str
+    :param connection: connection to the Dask scheduler
+    :type connection: :class:`DaskConnection`
+    :param scaler: scaler
+    :type scaler: :class:`AdaptiveScaler`
+    :param n_workers: initial number of workers
+    :type n_workers: int
+    :param interval: interval between checks in seconds
+    :type interval: float, optional
+    """
+
+    def __init__(self, config, deploy_id, connection, scaler, n_workers, interval=5.0):
+        self._config = config
+        self._deploy_id = deploy_id
+        self._connection = connection
+        self._scaler = scaler
+        self._n_workers = n_workers
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._disabled = False
+
+    def start(self):
+        """Start the monitor thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        Stop the monitor thread.
+
+        The thread is a daemon thread, so if it does not stop in time (e.g.
+        while it is waiting for the scheduler), it is abandoned and it stops
+        after its current step.
+
+        :param timeout: time to wait for the thread in seconds
+        :type timeout: float, optional
+
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                LOG.warning("Adaptive monitor did not stop in %s s", timeout)
+
+    def get_workers(self):
+        """
+        Get the number of workers.
+
+        :rtype: int
+
+        """
+        return self._n_workers
+
+    def step(self, now=None):
+        """
+        Check the backlog and rescale the deployment if needed.
+
+        :param now: current time in seconds, defaults to the monotonic clock
+        :type now: float, optional
+        :returns: True if the deployment was rescaled
+        :rtype: bool
+
+        """
+        if self._disabled:
+            return False
+        backlog = self._connection.get_backlog()
+        n_workers = self._scaler.decide(self._n_workers, backlog, now)
+        METRICS.set("dask_task_backlog", backlog, {"deployment": self._deploy_id})
+        if n_workers == self._n_workers:
+            return False
+
+        LOG.info(
+            "Scaling %s from %d to %d worker(s), backlog %d task(s)",
+            self._deploy_id,
+            self._n_workers,
+            n_workers,
+            backlog,
+        )
+        if not self._set_replicas(n_workers):
+            LOG.warning(
+                "Config DB client cannot update deployments, "
+                "adaptive scaling of %s disabled",
+                self._deploy_id,
+            )
+            self._disabled = True
+            self._stop.set()
+            return False
+        METRICS.inc(
+            "dask_scaling_decisions_total",
+            {
+                "deployment": self._deploy_id,
+                "direction": "up" if n_workers > self._n_workers else "down",
+            },
+        )
+        self._n_workers = n_workers
+        METRICS.set("dask_workers", n_workers, {"deployment": self._deploy_id})
+        return True
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _run(self):
+        """Check the backlog until the monitor is stopped."""
+        while not self._stop.wait(self._interval):
+            try:
+                self.step()
+            except Exception as ex:
+                LOG.error("Could not rescale %s: %s", self._deploy_id, ex)
+
+    def _set_replicas(self, n_workers):
+        """
+        Update the number of worker replicas of the deployment.
+
+        :param n_workers: number of workers
+        :returns: False if the configuration DB client cannot update
+            deployments
+
+        """
+        for txn in self._config.txn():
+            if not hasattr(txn, "update_deployment"):
+                return False
+            deploy = txn.get_deployment(self._deploy_id)
+            deploy.args.setdefault("values", {})["worker.replicas"] = n_workers
+            txn.update_deployment(deploy)
+        return True
@@ -0,0 +1,342 @@
+"""Dask connection module for SDP workflow."""
+# pylint: disable=too-many-arguments
+# pylint: disable=broad-except
+# pylint: disable=too-many-instance-attributes
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+import distributed
+
+from .instrumentation import METRICS
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# States of the tasks counted in the backlog of the scheduler
+BACKLOG_STATES = ("waiting", "queued", "no-worker", "processing")
+
+# Interval between checks for cancellation while waiting for the workers
+WORKER_WAIT_INTERVAL = 1.0
+
+
+class DaskConnection:
+    """
+    Connection to a Dask scheduler.
+
+    The connection waits for the scheduler to be ready, retrying with an
+    exponential backoff bounded by the maximum delay. Exactly one client is
+    created, which is reused for every computation in the deployment.
+
+    The connection can be used as a context manager, which closes the client
+    on exit, including when the computation raises an exception.
+
+    The futures of the running computation are kept, so that it can be
+    cancelled on the cluster from another thread with :func:`cancel`. Waiting
+    for the scheduler or the workers also stops when the connection is
+    cancelled, within the timeout of a connection attempt.
+
+    :param address: address of the scheduler
+    :type address: str
+    :param timeout: total time to wait for the scheduler, and for the workers,
+        in seconds
+    :type timeout: float, optional
+    :param initial_delay: delay before the first retry in seconds
+    :type initial_delay: float, optional
+    :param max_delay: maximum delay between retries in seconds
+    :type max_delay: float, optional
+    :param connect_timeout: timeout of each connection attempt in seconds
+    :type connect_timeout: float, optional
+    """
+
+    def __init__(
+        self,
+        address,
+        timeout=600.0,
+        initial_delay=0.5,
+        max_delay=10.0,
+        connect_timeout=10.0,
+    ):
+        self._address = address
+        self._timeout = timeout
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._connect_timeout = connect_timeout
+        self._client = None
+        self._time_to_ready = None
+        self._lock = threading.Lock()
+        self._futures = []
+        self._cancelled = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def connect(self):
+        """
+        Connect to the scheduler.
+
+        If the client has already been created it is returned.
+
+        :returns: Dask client
+        :rtype: distributed.Client
+        :raises TimeoutError: if the scheduler is not ready in time
+        :raises concurrent.futures.CancelledError: if the connection is
+            cancelled
+
+        """
+        if self._client is not None:
+            return self._client
+
+        start = time.monotonic()
+        deadline = start + self._timeout
+        delay = self._initial_delay
+        attempt = 0
+        while self._client is None:
+            self._check_cancelled()
+            attempt += 1
+            try:
+                self._client = distributed.Client(
+                    self._address, timeout=self._connect_timeout
+                )
+            except Exception as ex:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        "Dask scheduler {} not ready after {} attempts".format(
+                            self._address, attempt
+                        )
+                    ) from ex
+                LOG.info("Dask scheduler not ready (attempt %d): %s", attempt, ex)
+                self._cancelled.wait(min(delay, remaining))
+                delay = min(2 * delay, self._max_delay)
+
+        self._time_to_ready = time.monotonic() - start
+        self._record_time_to_ready()
+        LOG.info(
+            "Connected to Dask after %d attempt(s) in %.3f s",
+            attempt,
+            self._time_to_ready,
+        )
+        return self._client
+
+    def wait_for_workers(self, n_workers, timeout=None):
+        """
+        Wait for workers to connect to the scheduler.
+
+        The time to ready includes the time waiting for the workers. The wait
+        is split into intervals, between which the connection checks whether
+        it has been cancelled.
+
+        :param n_workers: number of workers to wait for
+        :type n_workers: int
+        :param timeout: timeout in seconds, defaults to the timeout of the
+            connection
+        :type timeout: float, optional
+        :raises TimeoutError: if the workers are not ready in time
+        :raises concurrent.futures.CancelledError: if the connection is
+            cancelled
+
+        """
+        if timeout is None:
+            timeout = self._timeout
+        client = self.connect()
+        start = time.monotonic()
+        deadline = start + timeout
+        LOG.info("Waiting for %d Dask worker(s)", n_workers)
+        while True:
+            self._check_cancelled()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    "{} Dask worker(s) not ready after {} s".format(n_workers, timeout)
+                )
+            try:
+                client.wait_for_workers(
+                    n_workers=n_workers, timeout=min(WORKER_WAIT_INTERVAL, remaining)
+                )
+                break
+            except (TimeoutError, asyncio.TimeoutError):
+                pass
+        self._time_to_ready += time.monotonic() - start
+        self._record_time_to_ready()
+        LOG.info("Dask workers ready after %.3f s", self._time_to_ready)
+
+    def compute(self, collection):
+        """
+        Compute a collection and return the result to the workflow.
+
+        The whole result is held in the memory of the workflow, so this should
+        only be used for small results.
+
+        :param collection: Dask collection
+        :returns: result
+
+        """
+        client = self.connect()
+        future = client.compute(collection)
+        self._track([future])
+        try:
+            return future.result()
+        finally:
+            self._track([])
+
+    def stream(self, collection, sink):
+        """
+        Compute a collection and pass each part to a sink as it completes.
+
+        The collection is submitted as futures, one per part (e.g. chunk or
+        partition), and the parts are passed to the sink in the order they
+        complete. Each part is released from the cluster once it has been
+        passed to the sink, so the memory used by the workflow only depends
+        on the size of a part, not on the size of the result.
+
+        :param collection: Dask collection
+        :param sink: function called with the key and the value of each part
+        :type sink: function
+        :returns: number of parts
+        :rtype: int
+
+        """
+        client = self.connect()
+        futures = distributed.futures_of(client.persist(collection))
+        self._track(futures)
+        n_parts = 0
+        try:
+            for future in distributed.as_completed(futures):
+                sink(future.key, future.result())
+                future.release()
+                n_parts += 1
+        finally:
+            self._track([])
+        return n_parts
+
+    def publish(self, collection, name):
+        """
+        Compute a collection and keep the result on the cluster.
+
+        The collection is persisted and published as a named dataset, so
+        that it can be retrieved by other clients of the scheduler. It is not
+        transferred to the workflow.
+
+        :param collection: Dask collection
+        :param name: name of the dataset
+        :type name: str
+
+        """
+        client = self.connect()
+        persisted = client.persist(collection)
+        self._track(distributed.futures_of(persisted))
+        try:
+            distributed.wait(persisted)
+        finally:
+            self._track([])
+        self._check_cancelled()
+        client.publish_dataset(persisted, name=name)
+
+    def cancel(self):
+        """
+        Cancel the running computation on the cluster.
+
+        The outstanding futures are cancelled, which releases their tasks
+        and makes the computation raise a cancelled error. Waiting for the
+        scheduler or the workers, and computations started afterwards, raise
+        it straight away.
+        """
+        with self._lock:
+            self._cancelled.set()
+            futures, self._futures = self._futures, []
+        if futures and self._client is not None:
+            LOG.info("Cancelling %d Dask future(s)", len(futures))
+            self._client.cancel(futures, force=True)
+
+    def get_backlog(self):
+        """
+        Get the number of tasks waiting or running on the scheduler.
+
+        :rtype: int
+
+        """
+        client = self.connect()
+        return client.run_on_scheduler(_count_backlog)
+
+    def get_client(self):
+        """
+        Get the Dask client.
+
+        :returns: client, or None if not connected
+        :rtype: distributed.Client
+
+        """
+        return self._client
+
+    def get_time_to_ready(self):
+        """
+        Get the time taken for the scheduler (and workers) to be ready.
+
+        :returns: time in seconds, or None if not connected
+        :rtype: float
+
+        """
+        return self._time_to_ready
+
+    def close(self):
+        """Close the client."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _track(self, futures):
+        """
+        Keep the futures of the running computation.
+
+        :param futures: futures
+        :raises concurrent.futures.CancelledError: if the connection has been
+            cancelled
+
+        """
+        with self._lock:
+            cancelled = self._cancelled.is_set()
+            self._futures = [] if cancelled else list(futures)
+        if cancelled and futures:
+            self._client.cancel(futures, force=True)
+            raise concurrent.futures.CancelledError("Computation cancelled")
+
+    def _check_cancelled(self):
+        """
+        Check that the connection has not been cancelled.
+
+        :raises concurrent.futures.CancelledError: if it has been cancelled
+
+        """
+        if self._cancelled.is_set():
+            raise concurrent.futures.CancelledError(
+                "Connection to {} cancelled".format(self._address)
+            )
+
+    def _record_time_to_ready(self):
+        """Record the time to ready in the metrics registry."""
+        METRICS.set(
+            "dask_time_to_ready_seconds",
+            self._time_to_ready,
+            {"address": self._address},
+        )
+
+
+def _count_backlog(dask_scheduler):
+    """
+    Count the tasks waiting or running on the scheduler.
+
+    This is run on the scheduler, see :func:`DaskConnection.get_backlog`.
+
+    :param dask_scheduler: scheduler
+    :type dask_scheduler: distributed.Scheduler
+    :rtype: int
+
+    """
+    return sum(
+        1 for task in dask_scheduler.tasks.values() if task.state in BACKLOG_STATES
+    )
@@ -5,12 +5,11 @@
 # pylint: disable=no-self-use
 
 import os
-import sys
 import logging
-import threading
-import distributed
 import ska_sdp_config
 
+from .dask_adaptive import AdaptiveMonitor
+from .dask_connection import DaskConnection
 from .ee_base_deploy import EEDeploy
 
 LOG = logging.getLogger("ska_sdp_workflow")
@@ -21,15 +20,33 @@ class DaskDeploy(EEDeploy):
     Deploy a Dask execution engine.
 
     The function when called with the arguments should return a Dask graph. The
-    graph is then executed by calling the compute method:
+    graph is then computed by the client connected to the deployed scheduler:
 
     .. code-block:: python
 
         result = func(*f_args)
-        result.compute()
+        client.compute(result, sync=True)
 
-    This happens in a separate thread so the constructor can return
-    immediately.
+    This happens in a thread of the executor so the constructor can return
+    immediately. The client is created once the scheduler is ready, see
+    :class:`DaskConnection`. Optionally, the computation is only submitted
+    once all the workers have connected.
+
+    By default the whole result is returned to the workflow. For large
+    results, either a sink can be given, which is called with the key and
+    value of each part of the result as it completes (see
+    :func:`DaskConnection.stream`), or the result can be published on the
+    cluster as a named dataset (see :func:`DaskConnection.publish`).
+
+    If a scaler is given, the number of workers is adapted to the task
+    backlog of the scheduler while the result is computed, see
+    :class:`AdaptiveMonitor`. The initial number of workers is bounded by
+    the limits of the scaler.
+
+    If the deployment is cancelled, the outstanding futures of the
+    computation are cancelled on the cluster (see
+    :func:`DaskConnection.cancel`), so the cluster can be removed without
+    waiting for the computation to finish.
 
     This should not be created directly, use the :func:`Phase.ee_deploy_dask`
     method instead.
@@ -46,23 +63,75 @@ class DaskDeploy(EEDeploy):
     :type func: function
     :param f_args: function arguments
     :type f_args: tuple
+    :param state_writer: processing block state writer
+    :type state_writer: :class:`PBStateWriter`, optional
+    :param wait_for_workers: wait for all workers before computing
+    :type wait_for_workers: bool, optional
+    :param sink: function called with the key and value of each part
+    :type sink: function, optional
+    :param publish: name of the dataset to publish the result as
+    :type publish: str, optional
+    :param scaler: scaler to adapt the number of workers
+    :type scaler: :class:`AdaptiveScaler`, optional
+    :param executor: executor running the engine
+    :type executor: :class:`EngineExecutor`, optional
     """
 
-    def __init__(self, pb_id, config, deploy_name, n_workers, func, f_args):
-        super().__init__(pb_id, config)
-        thread = threading.Thread(
-            target=self._deploy,
-            args=(
-                deploy_name,
-                n_workers,
-                func,
-                f_args,
-            ),
-            daemon=True,
+    def __init__(
+        self,
+        pb_id,
+        config,
+        deploy_name,
+        n_workers,
+        func,
+        f_args,
+        state_writer=None,
+        wait_for_workers=False,
+        sink=None,
+        publish=None,
+        scaler=None,
+        executor=None,
+    ):
+        super().__init__(pb_id, config, state_writer=state_writer)
+        self._connection = None
+        self._sink = sink
+        self._publish = publish
+        self._scaler = scaler
+        self._monitor = None
+        if scaler is not None:
+            n_workers = scaler.clamp(n_workers)
+        self._start(
+            executor,
+            self._deploy,
+            deploy_name,
+            n_workers,
+            func,
+            f_args,
+            wait_for_workers,
         )
-        thread.start()
 
-    def _deploy(self, deploy_name, n_workers, func, f_args):
+    def get_connection(self):
+        """
+        Get the connection to the Dask scheduler.
+
+        :returns: connection, or None if the deployment has not been made
+        :rtype: :class:`DaskConnection`
+
+        """
+        return self._connection
+
+    def get_monitor(self):
+        """
+        Get the monitor adapting the number of workers.
+
+        :returns: monitor, or None if the deployment is not adaptive or the
+            computation is not running
+        :rtype: :class:`AdaptiveMonitor`
+
+        """
+        return self._monitor
+
+    def _deploy(self, deploy_name, n_workers, func, f_args, wait_for_workers):
         """
         Make the deployment and execute the function.
 
@@ -72,6 +141,8 @@ class DaskDeploy(EEDeploy):
         :param func: function to process
         :param f_args: function arguments
         :param n_workers: number of dask workers
+        :param wait_for_workers: wait for all workers before computing
+        :returns: computed result, or None if it is streamed or published
 
         """
 
@@ -101,31 +172,76 @@ class DaskDeploy(EEDeploy):
             {"chart": "dask", "values": values},
         )
 
+        self._check_cancelled()
         for txn in self._config.txn():
             txn.create_deployment(deploy)
 
         LOG.info("Waiting for Dask...")
-        client = None
-
-        for _ in range(200):
+        self._connection = DaskConnection(
+            self._deploy_id + "-scheduler." + os.environ["SDP_HELM_NAMESPACE"] + ":8786"
+        )
+        if self._cancelled:
+            self._connection.cancel()
+        # The client is closed even if the computation fails
+        with self._connection:
             try:
-                client = distributed.Client(
-                    self._deploy_id
-                    + "-scheduler."
-                    + os.environ["SDP_HELM_NAMESPACE"]
-                    + ":8786"
-                )
+                self._connection.connect()
+                if wait_for_workers:
+                    self._connection.wait_for_workers(n_workers)
             except Exception as ex:
-                LOG.error(ex)
-        if client is None:
-            LOG.error("Could not connect to Dask!")
-            sys.exit(1)
-        LOG.info("Connected to Dask")
+                LOG.error("Could not connect to Dask! %s", ex)
+                raise
+
+            if self._scaler is not None:
+                self._monitor = AdaptiveMonitor(
+                    self._config,
+                    self._deploy_id,
+                    self._connection,
+                    self._scaler,
+                    n_workers,
+                )
+                self._monitor.start()
 
-        # Computing result
-        result = func(*f_args)
-        compute_result = result.compute()
-        LOG.info("Computed Result %s", compute_result)
+            # Computing result
+            compute_result = None
+            try:
+                compute_result = self._compute(func, f_args)
+            finally:
+                if self._monitor is not None:
+                    self._monitor.stop()
+                    self._monitor = None
 
         # Update Deployment Status
         self.update_deploy_status("FINISHED")
+        return compute_result
+
+    def _stop(self):
+        """Cancel the computation on the cluster and stop adapting it."""
+        connection = self._connection
+        if connection is not None:
+            connection.cancel()
+        monitor = self._monitor
+        if monitor is not None:
+            monitor.stop(timeout=0.0)
+
+    def _compute(self, func, f_args):
+        """
+        Compute the result of the function.
+
+        :param func: function to process
+        :param f_args: function arguments
+        :returns: computed result, or None if it is streamed or published
+
+        """
+        result = func(*f_args)
+        if self._sink is not None:
+            n_parts = self._connection.stream(result, self._sink)
+            LOG.info("Streamed %d result part(s) to sink", n_parts)
+            return None
+        if self._publish is not None:
+            self._connection.publish(result, self._publish)
+            LOG.info("Published result as dataset %s", self._publish)
+            return None
+        compute_result = self._connection.compute(result)
+        LOG.info("Computed result of type %s", type(compute_result).__name__)
+        return compute_result
@@ -0,0 +1,101 @@
+"""Deployment group module for SDP workflow."""
+
+import logging
+
+from .ee_base_deploy import wait_until
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+
+class DeploymentGroup:
+    """
+    Group of execution engine deployments.
+
+    The deployments in the group can be waited for and removed together,
+    each in a single transaction loop. The group can be iterated over to get
+    the deployments.
+
+    This should not be created directly, use the
+    :func:`Phase.ee_deploy_helm_bulk` method instead.
+
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param deploys: deployments
+    :type deploys: list of :class:`EEDeploy`
+    """
+
+    def __init__(self, pb_id, config, deploys):
+        self._pb_id = pb_id
+        self._config = config
+        self._deploys = list(deploys)
+
+    def __iter__(self):
+        return iter(self._deploys)
+
+    def __len__(self):
+        return len(self._deploys)
+
+    def get_ids(self):
+        """
+        Get the deployment IDs.
+
+        :rtype: list of str
+
+        """
+        return [deploy.get_id() for deploy in self._deploys]
+
+    def is_ready(self, txn):
+        """
+        Check if all the deployments are ready.
+
+        :param txn: configuration transaction
+        :type txn: ska_sdp_config.Transaction
+        :rtype: bool
+
+        """
+        return all(deploy.is_ready(txn) for deploy in self._deploys)
+
+    def is_finished(self, txn):
+        """
+        Check if all the deployments are finished.
+
+        :param txn: configuration transaction
+        :type txn: ska_sdp_config.Transaction
+        :rtype: bool
+
+        """
+        state = txn.get_processing_block_state(self._pb_id)
+        deployments = state.get("deployments") or {}
+        return all(
+            deployments.get(deploy_id) == "FINISHED" for deploy_id in self.get_ids()
+        )
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Wait for all the deployments to be ready.
+
+        :param timeout: timeout in seconds
+        :type timeout: float, optional
+        :returns: time for the last deployment to be ready, in seconds
+        :rtype: float
+        :raises TimeoutError: if the deployments are not ready in time
+
+        """
+        LOG.info("Waiting for %d deployment(s) to be ready", len(self._deploys))
+        if not wait_until(self._config, self.is_ready, timeout):
+            raise TimeoutError("Deployments not ready after {} s".format(timeout))
+        return max(
+            (deploy.get_time_to_ready() for deploy in self._deploys), default=0.0
+        )
+
+    def remove(self):
+        """
+        Remove all the deployments in a single transaction.
+        """
+        for txn in self._config.txn():
+            existing = set(txn.list_deployments())
+            for deploy_id in self.get_ids():
+                if deploy_id in existing:
+                    txn.delete_deployment(txn.get_deployment(deploy_id))
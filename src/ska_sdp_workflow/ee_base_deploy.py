@@ -1,35 +1,120 @@
 """Execution engine deployment."""
+# pylint: disable=broad-except
+
+import concurrent.futures
+import logging
+import threading
+import time
+
+from .executor import get_default_executor
+from .state_writer import PBStateWriter
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# Interval for polling the configuration DB when the backend does not support
+# waiting for changes (e.g. the memory backend)
+POLL_INTERVAL = 0.1
+
+
+class DeploymentFailedError(Exception):
+    """Raised when waiting for a deployment which has failed."""
+
+
+def wait_until(config, check, timeout=None):
+    """
+    Wait until a condition on the configuration DB is true.
+
+    The condition is checked in a transaction loop which wakes up when any
+    of the keys it reads changes. If the backend does not support waiting
+    for changes, the condition is polled.
+
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param check: function called with the transaction, returning a bool
+    :type check: function
+    :param timeout: timeout in seconds
+    :type timeout: float, optional
+    :returns: True if the condition is true, False if the timeout expired
+    :rtype: bool
+
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        remaining = None
+        for txn in config.txn():
+            if check(txn):
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+            txn.loop(wait=True, timeout=remaining)
+
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+
+        # The transaction loop returned without waiting for a change
+        time.sleep(POLL_INTERVAL)
 
 
 class EEDeploy:
     """
     Base class for execution engine deployment.
 
+    Engines which run in the workflow (e.g. the Dask client or the fake
+    engine) run in a thread of an executor, and the deployment is a handle to
+    it: :func:`result`, :func:`exception` and :func:`done` behave like the
+    methods of a future. If the engine raises an exception, the deployment
+    is marked as FAILED straight away. Deployments which do not run in the
+    workflow (e.g. Helm) are always done.
+
+    The engine threads are daemon threads (see :class:`EngineExecutor`), so
+    the workflow can exit without waiting for a running engine. A running
+    engine is asked to stop with :func:`cancel`. Once it has been cancelled,
+    the deployment status can only be set to CANCELLED, so an engine which
+    returns after it has been abandoned does not overwrite it.
+
     :param pb_id: processing block ID
     :type pb_id: str
     :param config: SDP configuration client
     :type config: ska_sdp_config.Client
+    :param state_writer: processing block state writer
+    :type state_writer: :class:`PBStateWriter`, optional
     """
 
-    def __init__(self, pb_id, config):
+    def __init__(self, pb_id, config, state_writer=None):
         self._pb_id = pb_id
         self._config = config
         self._deploy_id = None
+        self._future = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+        if state_writer is None:
+            state_writer = PBStateWriter(config, pb_id)
+        self._state_writer = state_writer
 
     def update_deploy_status(self, status):
         """
         Update deployment status.
 
+        The status is written by the processing block state writer, so it may
+        be merged with other pending updates of the processing block state.
+        If the deployment has been cancelled, only the CANCELLED status is
+        written.
+
         :param status: status
         :type status: str
 
         """
-        for txn in self._config.txn():
-            state = txn.get_processing_block_state(self._pb_id)
-            deployments = state.get("deployments")
-            deployments[self._deploy_id] = status
-            state["deployments"] = deployments
-            txn.update_processing_block_state(self._pb_id, state)
+        with self._lock:
+            if self._cancelled and status != "CANCELLED":
+                LOG.info(
+                    "Deployment %s cancelled, not setting status %s",
+                    self._deploy_id,
+                    status,
+                )
+                return
+            self._state_writer.set_deployment_status(self._deploy_id, status)
 
     def get_id(self):
         """
@@ -41,6 +126,74 @@ class EEDeploy:
         """
         return self._deploy_id
 
+    def result(self, timeout=None):
+        """
+        Wait for the engine to finish and get its result.
+
+        :param timeout: timeout in seconds
+        :type timeout: float, optional
+        :returns: result of the engine, or None if it does not run in the
+            workflow
+        :raises Exception: the exception raised by the engine
+        :raises concurrent.futures.TimeoutError: if the engine does not
+            finish in time
+
+        """
+        if self._future is None:
+            return None
+        return self._future.result(timeout)
+
+    def exception(self, timeout=None):
+        """
+        Wait for the engine to finish and get the exception it raised.
+
+        :param timeout: timeout in seconds
+        :type timeout: float, optional
+        :returns: exception, or None if the engine succeeded or it does not
+            run in the workflow
+        :raises concurrent.futures.TimeoutError: if the engine does not
+            finish in time
+
+        """
+        if self._future is None:
+            return None
+        return self._future.exception(timeout)
+
+    def done(self):
+        """
+        Check if the engine has finished, successfully or not.
+
+        :rtype: bool
+
+        """
+        return self._future is None or self._future.done()
+
+    def cancel(self):
+        """
+        Ask the engine to stop.
+
+        An engine which has not started yet does not start. A running engine
+        stops as soon as it can, depending on the kind of engine: Dask
+        computations are cancelled on the cluster, and the calls of a local
+        process pool which have not started are dropped. The deployment is
+        then marked as CANCELLED. This does not wait for the engine to stop,
+        use :func:`exception` with a timeout for that.
+        """
+        with self._lock:
+            self._cancelled = True
+        if self._future is not None:
+            self._future.cancel()
+        self._stop()
+
+    def is_cancelled(self):
+        """
+        Check if the engine has been asked to stop.
+
+        :rtype: bool
+
+        """
+        return self._cancelled
+
     def remove(self, deploy_id):
         """
         Remove the execution engine.
@@ -57,17 +210,97 @@ class EEDeploy:
         """
         Check if the deployment is finished.
 
+        If the deployment has been marked as FAILED, this raises an exception
+        instead of returning False, so that a workflow waiting for it in
+        :func:`Phase.wait_loop` does not wait forever.
+
         :param txn: configuration transaction
         :type txn: ska_sdp_config.Transaction
         :rtype: bool
+        :raises DeploymentFailedError: if the deployment has failed
 
         """
         state = txn.get_processing_block_state(self._pb_id)
         deployments = state.get("deployments")
         if self._deploy_id in deployments:
+            if deployments[self._deploy_id] == "FAILED":
+                raise DeploymentFailedError(
+                    "Deployment {} failed".format(self._deploy_id)
+                )
             if deployments[self._deploy_id] == "FINISHED":
                 deployment_lists = txn.list_deployments()
                 if self._deploy_id in deployment_lists:
                     self.remove(self._deploy_id)
                 return True
         return False
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _start(self, executor, func, *args):
+        """
+        Start running the engine in a thread of the executor.
+
+        If no executor is given, the engine runs in the default executor
+        shared by the deployments not created by a phase.
+
+        :param executor: executor
+        :param func: function running the engine
+        :param args: arguments
+
+        """
+        if executor is None:
+            executor = get_default_executor()
+        self._future = executor.submit(self._run, func, *args)
+
+    def _stop(self):
+        """
+        Stop the running engine.
+
+        This is called by :func:`cancel`. Subclasses which can interrupt
+        their engine override it.
+        """
+
+    def _check_cancelled(self):
+        """
+        Stop the engine if it has been cancelled.
+
+        This is called by the engine between its steps.
+
+        :raises concurrent.futures.CancelledError: if it has been cancelled
+
+        """
+        if self._cancelled:
+            raise concurrent.futures.CancelledError(
+                "Deployment {} cancelled".format(self._deploy_id)
+            )
+
+    def _run(self, func, *args):
+        """
+        Run the engine, marking the deployment as FAILED if it fails.
+
+        If the engine stops because it has been cancelled, the deployment is
+        marked as CANCELLED instead.
+
+        This is called in the thread of the executor.
+
+        :param func: function running the engine
+        :param args: arguments
+        :returns: result of the function
+
+        """
+        try:
+            return func(*args)
+        except BaseException as ex:
+            with self._lock:
+                cancelled = self._cancelled
+            if cancelled:
+                LOG.info("Deployment %s cancelled", self._deploy_id)
+            else:
+                LOG.error("Deployment %s failed: %s", self._deploy_id, ex)
+            if self._deploy_id is not None:
+                # If it is cancelled meanwhile, FAILED is not written
+                self.update_deploy_status("CANCELLED" if cancelled else "FAILED")
+                self._state_writer.flush()
+            raise
@@ -0,0 +1,155 @@
+"""Execution engine executor module for SDP workflow."""
+# pylint: disable=broad-except
+# pylint: disable=global-statement
+# pylint: disable=consider-using-with
+
+import concurrent.futures
+import queue
+import threading
+
+# Default maximum number of execution engines running at the same time in
+# the threads of an executor
+MAX_ENGINES = 8
+
+# Executor used by deployments which are not created by a phase
+_DEFAULT_EXECUTOR = None
+_DEFAULT_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_default_executor():
+    """
+    Get the executor shared by the deployments not created by a phase.
+
+    It is created on first use and never shut down.
+
+    :rtype: :class:`EngineExecutor`
+
+    """
+    global _DEFAULT_EXECUTOR
+    with _DEFAULT_EXECUTOR_LOCK:
+        if _DEFAULT_EXECUTOR is None:
+            _DEFAULT_EXECUTOR = EngineExecutor()
+        return _DEFAULT_EXECUTOR
+
+
+class EngineExecutor:
+    """
+    Bounded executor running execution engines in a fixed set of threads.
+
+    The engines are queued and run by at most the maximum number of worker
+    threads, which are started as they are needed and then reused, so the
+    number of threads does not grow with the number of engines submitted.
+    Each engine is tracked by a future. An engine which has not started yet
+    can be abandoned by cancelling its future.
+
+    The threads are daemon threads, so the workflow process does not wait
+    for the engines when it exits (e.g. after the phase has been cancelled
+    while a Dask computation is still running).
+
+    A phase owns an executor, which is shut down when the phase exits.
+
+    :param max_engines: maximum number of engines running at the same time
+    :type max_engines: int, optional
+    """
+
+    def __init__(self, max_engines=MAX_ENGINES):
+        self._max_engines = max_engines
+        self._queue = queue.SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._shutdown = False
+
+    def submit(self, func, *args):
+        """
+        Queue a function to run in a worker thread.
+
+        :param func: function
+        :type func: function
+        :param args: arguments
+        :returns: future of the result of the function
+        :rtype: concurrent.futures.Future
+        :raises RuntimeError: if the executor has been shut down
+
+        """
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot start an engine after shutdown")
+            self._queue.put((future, func, args))
+            if not self._idle.acquire(blocking=False):
+                self._add_thread()
+        return future
+
+    def shutdown(self, wait=True):
+        """
+        Shut down the executor.
+
+        No engines can be started afterwards. The running and queued engines
+        are not interrupted.
+
+        :param wait: wait for the engines to finish
+        :type wait: bool, optional
+
+        """
+        with self._lock:
+            if not self._shutdown:
+                self._shutdown = True
+                for _ in self._threads:
+                    self._queue.put(None)
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def get_num_threads(self):
+        """
+        Get the number of worker threads started.
+
+        :rtype: int
+
+        """
+        with self._lock:
+            return len(self._threads)
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _add_thread(self):
+        """
+        Start a worker thread if fewer than the maximum are running.
+
+        This is called with the lock held.
+
+        """
+        if len(self._threads) >= self._max_engines:
+            return
+        thread = threading.Thread(
+            target=self._work,
+            name="engine-executor-{}".format(len(self._threads)),
+            daemon=True,
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _work(self):
+        """
+        Run the queued functions until the executor is shut down.
+
+        This is called in a worker thread.
+
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = func(*args)
+                except BaseException as ex:
+                    future.set_exception(ex)
+                else:
+                    future.set_result(result)
+            self._idle.release()
@@ -2,7 +2,6 @@
 # pylint: disable=too-many-arguments
 
 import logging
-import threading
 
 from .ee_base_deploy import EEDeploy
 
@@ -13,8 +12,9 @@ class FakeDeploy(EEDeploy):
     """
     Deploy a fake execution engine.
 
-    The function is called with the arguments in a separate thread so the
-    constructor can return immediately.
+    The function is called with the arguments in a thread of the executor
+    so the constructor can return immediately. Its return value is the
+    result of the deployment.
 
     This should not be created directly, use the :func:`Phase.ee_deploy_test`
     method instead.
@@ -29,6 +29,10 @@ class FakeDeploy(EEDeploy):
     :type func: function
     :param f_args: function arguments
     :type f_args: tuple
+    :param state_writer: processing block state writer
+    :type state_writer: :class:`PBStateWriter`, optional
+    :param executor: executor running the engine
+    :type executor: :class:`EngineExecutor`, optional
 
     """
 
@@ -39,18 +43,12 @@ class FakeDeploy(EEDeploy):
         deploy_name,
         func=None,
         f_args=None,
+        state_writer=None,
+        executor=None,
     ):
-        super().__init__(pb_id, config)
-        thread = threading.Thread(
-            target=self._deploy,
-            args=(
-                deploy_name,
-                func,
-                f_args,
-            ),
-            daemon=True,
-        )
-        thread.start()
+        super().__init__(pb_id, config, state_writer=state_writer)
+        self._deploy_id = "proc-{}-{}".format(pb_id, deploy_name)
+        self._start(executor, self._deploy, deploy_name, func, f_args)
 
     def _deploy(self, deploy_name, func=None, f_args=None):
         """
@@ -61,13 +59,14 @@ class FakeDeploy(EEDeploy):
         :param deploy_name: deployment name
         :param func: function to process
         :param f_args: function arguments
+        :returns: result of the function
 
         """
         LOG.info("Deploying %s Workflow...", deploy_name)
-        self._deploy_id = "proc-{}-{}".format(self._pb_id, deploy_name)
         self.update_deploy_status("RUNNING")
 
         LOG.info("Starting processing for %fs", *f_args)
-        func(*f_args)
+        result = func(*f_args)
         LOG.info("Finished processing")
         self.update_deploy_status("FINISHED")
+        return result
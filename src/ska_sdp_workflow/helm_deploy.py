@@ -1,17 +1,65 @@
 """Helm Deploy class module for SDP Workflow."""
+# pylint: disable=too-many-arguments
 
 import logging
+import time
 import ska_sdp_config
 
-from .ee_base_deploy import EEDeploy
+from .ee_base_deploy import EEDeploy, wait_until
+from .instrumentation import METRICS
 
 LOG = logging.getLogger("ska_sdp_workflow")
 
+# Key in the processing block state where the readiness of the deployments is
+# recorded, e.g. {"proc-pb-...-receive": true}
+READY_KEY = "deployments_ready"
+
+# Key of the chart values giving the processing block and deployment IDs to
+# the engine, so it can report its readiness with set_deployment_ready
+READY_VALUES_KEY = "sdp_readiness"
+
+
+def set_deployment_ready(config, pb_id, deploy_id, ready=True):
+    """
+    Report the readiness of a Helm deployment.
+
+    No SDP component records the readiness of the Helm deployments, so the
+    engine deployed by the chart has to report it, e.g. once its receive
+    processes are listening. The processing block and deployment IDs are
+    given to the chart in the ``sdp_readiness`` values when readiness is
+    tracked. The readiness is written in the ``deployments_ready`` field of
+    the processing block state, in a transaction which only changes the
+    entry of the deployment.
+
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param deploy_id: deployment ID
+    :type deploy_id: str
+    :param ready: readiness of the deployment
+    :type ready: bool, optional
+
+    """
+    for txn in config.txn():
+        state = txn.get_processing_block_state(pb_id)
+        state[READY_KEY] = dict(state.get(READY_KEY) or {}, **{deploy_id: ready})
+        txn.update_processing_block_state(pb_id, state)
+
 
 class HelmDeploy(EEDeploy):
     """
     Deploy Helm execution engine.
 
+    The readiness of the deployment is only tracked if it is requested with
+    ``track_ready``, since it has to be reported by the engine itself with
+    :func:`set_deployment_ready`. The processing block and deployment IDs
+    are then added to the values of the chart under ``sdp_readiness``. The
+    deployment is ready when the entry for its ID is set to true in the
+    ``deployments_ready`` field of the processing block state. The workflow
+    can wait for this with :func:`wait_until_ready`, for example before
+    publishing the receive addresses.
+
     This should not be created directly, use the :func:`Phase.ee_deploy_helm`
     method instead.
 
@@ -23,31 +71,166 @@ class HelmDeploy(EEDeploy):
     :type deploy_name: str
     :param values: values to pass to Helm chart
     :type values: dict, optional
+    :param state_writer: processing block state writer
+    :type state_writer: :class:`PBStateWriter`, optional
+    :param create: create the deployment, if False the caller must create it
+        and set its status (see :func:`Phase.ee_deploy_helm_bulk`)
+    :type create: bool, optional
+    :param track_ready: track the readiness reported by the engine
+    :type track_ready: bool, optional
     """
 
-    def __init__(self, pb_id, config, deploy_name, values=None):
-        super().__init__(pb_id, config)
-        self._deploy(deploy_name, values)
+    def __init__(
+        self,
+        pb_id,
+        config,
+        deploy_name,
+        values=None,
+        state_writer=None,
+        create=True,
+        track_ready=False,
+    ):
+        super().__init__(pb_id, config, state_writer=state_writer)
+        self._track_ready = track_ready
+        self._deploy_time = None
+        self._time_to_ready = None
+        self._deployment = None
+        self._deploy(deploy_name, values, create)
+
+    def is_ready(self, txn):
+        """
+        Check if the deployment is ready.
+
+        :param txn: configuration transaction
+        :type txn: ska_sdp_config.Transaction
+        :rtype: bool
+        :raises RuntimeError: if the readiness is not tracked
+
+        """
+        self._check_tracked()
+        state = txn.get_processing_block_state(self._pb_id)
+        ready = (state or {}).get(READY_KEY) or {}
+        if not ready.get(self._deploy_id):
+            return False
+        if self._time_to_ready is None:
+            self._time_to_ready = time.monotonic() - self._deploy_time
+            METRICS.observe(
+                "deployment_time_to_ready_seconds",
+                self._time_to_ready,
+                {"kind": "helm"},
+            )
+            LOG.info(
+                "Deployment %s ready after %.3f s", self._deploy_id, self._time_to_ready
+            )
+        return True
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Wait for the deployment to be ready.
+
+        The transaction loop wakes up when the processing block state changes,
+        so there is no polling with a backend which supports waiting for
+        changes.
+
+        :param timeout: timeout in seconds
+        :type timeout: float, optional
+        :returns: time to ready in seconds
+        :rtype: float
+        :raises TimeoutError: if the deployment is not ready in time
+        :raises RuntimeError: if the readiness is not tracked
+
+        """
+        self._check_tracked()
+        LOG.info("Waiting for deployment %s to be ready", self._deploy_id)
+        if not wait_until(self._config, self.is_ready, timeout):
+            raise TimeoutError(
+                "Deployment {} not ready after {} s".format(self._deploy_id, timeout)
+            )
+        return self._time_to_ready
+
+    def get_time_to_ready(self):
+        """
+        Get the time taken for the deployment to be ready.
+
+        This is measured from the creation of the deployment.
+
+        :returns: time in seconds, or None if it is not known to be ready
+        :rtype: float
+
+        """
+        return self._time_to_ready
+
+    def get_deployment(self):
+        """
+        Get the deployment to create in the configuration DB.
+
+        :rtype: ska_sdp_config.Deployment
+
+        """
+        return self._deployment
+
+    def set_created(self):
+        """
+        Record that the deployment has been created.
+
+        This is called by the creator of the deployment if it was not created
+        by the constructor.
+        """
+        self._deploy_time = time.monotonic()
+
+    def is_tracking_ready(self):
+        """
+        Check if the readiness of the deployment is tracked.
+
+        :rtype: bool
+
+        """
+        return self._track_ready
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _check_tracked(self):
+        """
+        Check that the readiness of the deployment is tracked.
+
+        :raises RuntimeError: if it is not
 
-    def _deploy(self, deploy_name, values=None):
+        """
+        if not self._track_ready:
+            raise RuntimeError(
+                "Readiness of deployment {} is not tracked, deploy it with "
+                "track_ready=True".format(self._deploy_id)
+            )
+
+    def _deploy(self, deploy_name, values=None, create=True):
         """
         Deploy the Helm chart.
 
         :param deploy_name: deployment name
         :param values: optional dict of values
+        :param create: create the deployment
 
         """
-        LOG.info("Deploying Helm chart: %s", deploy_name)
         self._deploy_id = "proc-{}-{}".format(self._pb_id, deploy_name)
-        self.update_deploy_status("RUNNING")
 
         chart = {
             "chart": deploy_name,  # Helm chart deploy from the repo
         }
 
+        if self._track_ready:
+            readiness = {"pb_id": self._pb_id, "deploy_id": self._deploy_id}
+            values = dict(values or {}, **{READY_VALUES_KEY: readiness})
         if values is not None:
             chart["values"] = values
 
-        deploy = ska_sdp_config.Deployment(self._deploy_id, "helm", chart)
+        self._deployment = ska_sdp_config.Deployment(self._deploy_id, "helm", chart)
+        if not create:
+            return
+
+        LOG.info("Deploying Helm chart: %s", deploy_name)
+        self.update_deploy_status("RUNNING")
         for txn in self._config.txn():
-            txn.create_deployment(deploy)
+            txn.create_deployment(self._deployment)
+        self.set_created()
@@ -0,0 +1,223 @@
+"""Workflow host module for SDP workflow."""
+# pylint: disable=too-many-arguments
+
+import concurrent.futures
+import logging
+import threading
+
+from . import instrumentation, workflow
+from .instrumentation import METRICS
+from .lease_monitor import LeaseMonitor
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# Default maximum number of processing blocks driven at the same time
+MAX_PROCESSING_BLOCKS = 16
+
+# Default time to wait for the processing blocks when closing in seconds
+CLOSE_TIMEOUT = 60.0
+
+
+class WorkflowHost:
+    """
+    Claim and drive many processing blocks in one process.
+
+    The processing blocks share one configuration DB client, and so one
+    connection and one lease. Their ownership is watched by a single
+    :class:`LeaseMonitor` thread, and their caches do not watch the
+    configuration DB, so the number of threads watching it does not grow
+    with the number of processing blocks.
+
+    Each processing block is driven by a workflow function, which is called
+    with the claimed :class:`ProcessingBlock` in a thread of the host. The
+    processing block is exited when the function returns. The numbers of
+    processing blocks claimed and completed are counted in the metrics.
+
+    The host can be used as a context manager, which closes it on exit.
+    Closing waits for the running processing blocks up to a timeout, so a
+    workflow function which is stuck does not hang the host.
+
+    :param max_pbs: maximum number of processing blocks driven at the same
+        time
+    :type max_pbs: int, optional
+    :param state_flush_interval: flush interval of the state writers in
+        seconds
+    :type state_flush_interval: float, optional
+    :param cache_max_staleness: maximum age of cached entries in seconds
+    :type cache_max_staleness: float, optional
+    :param monitor_lease: run the lease monitor, defaults to True with the
+        etcd backend
+    :type monitor_lease: bool, optional
+    """
+
+    def __init__(
+        self,
+        max_pbs=MAX_PROCESSING_BLOCKS,
+        state_flush_interval=0.0,
+        cache_max_staleness=1.0,
+        monitor_lease=None,
+    ):
+        workflow.configure_logging()
+        instrumentation.start_metrics_server()
+
+        LOG.info("Opening shared connection to config DB")
+        self._config = workflow.new_config_db()
+
+        self._lease_monitor = LeaseMonitor(self._config)
+        if monitor_lease is None:
+            monitor_lease = workflow.FEATURE_CONFIG_DB.is_active()
+        if monitor_lease:
+            self._lease_monitor.start()
+
+        self._pb_args = {
+            "state_flush_interval": state_flush_interval,
+            "cache_max_staleness": cache_max_staleness,
+        }
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_pbs, thread_name_prefix="workflow-host"
+        )
+        self._lock = threading.Lock()
+        self._futures = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def claim(self, pb_id):
+        """
+        Claim a processing block with the shared client.
+
+        :param pb_id: processing block ID
+        :type pb_id: str
+        :rtype: :class:`ProcessingBlock`
+
+        """
+        pb = workflow.ProcessingBlock(
+            pb_id,
+            config=self._config,
+            lease_monitor=self._lease_monitor,
+            **self._pb_args
+        )
+        METRICS.inc("host_pbs_claimed_total")
+        return pb
+
+    def submit(self, pb_id, func, *args):
+        """
+        Claim a processing block and drive it with a workflow function.
+
+        :param pb_id: processing block ID
+        :type pb_id: str
+        :param func: workflow function, called with the processing block and
+            the arguments
+        :type func: function
+        :param args: arguments
+        :returns: future of the result of the function
+        :rtype: concurrent.futures.Future
+
+        """
+        future = self._pool.submit(self._drive, pb_id, func, args)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def run(self, pb_ids, func, *args):
+        """
+        Drive processing blocks and wait for them.
+
+        See :func:`submit`.
+
+        :param pb_ids: processing block IDs
+        :type pb_ids: list of str
+        :param func: workflow function, called with each processing block and
+            the arguments
+        :type func: function
+        :param args: arguments
+        :returns: results of the function, in the order of the processing
+            blocks
+        :rtype: list
+        :raises Exception: the first exception raised by the function
+
+        """
+        futures = [self.submit(pb_id, func, *args) for pb_id in pb_ids]
+        return [future.result() for future in futures]
+
+    def get_config(self):
+        """
+        Get the shared configuration DB client.
+
+        :rtype: ska_sdp_config.Config
+
+        """
+        return self._config
+
+    def get_lease_monitor(self):
+        """
+        Get the shared lease monitor.
+
+        :rtype: :class:`LeaseMonitor`
+
+        """
+        return self._lease_monitor
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """
+        Wait for the processing blocks and close the connection.
+
+        The processing blocks which have not started are cancelled. The ones
+        which do not finish before the timeout are abandoned, and the
+        connection is closed under them.
+
+        :param timeout: time to wait for the processing blocks in seconds
+        :type timeout: float, optional
+
+        """
+        with self._lock:
+            futures = list(self._futures)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        _, running = concurrent.futures.wait(futures, timeout)
+        if running:
+            LOG.warning(
+                "%d processing block(s) still running after %s s", len(running), timeout
+            )
+        self._lease_monitor.stop()
+
+        LOG.info("Closing shared connection to config DB")
+        self._config.close()
+
+        instrumentation.dump_metrics()
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _discard(self, future):
+        """
+        Forget the future of a processing block which is done.
+
+        :param future: future
+
+        """
+        with self._lock:
+            self._futures.discard(future)
+
+    def _drive(self, pb_id, func, args):
+        """
+        Claim a processing block and call the workflow function.
+
+        This is called in a thread of the host.
+
+        :param pb_id: processing block ID
+        :param func: workflow function
+        :param args: arguments
+        :returns: result of the function
+
+        """
+        pb = self.claim(pb_id)
+        try:
+            return func(pb, *args)
+        finally:
+            pb.exit()
+            METRICS.inc("host_pbs_completed_total")
@@ -0,0 +1,493 @@
+"""Configuration DB instrumentation module for SDP workflow."""
+# pylint: disable=too-few-public-methods
+# pylint: disable=import-outside-toplevel
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from .feature_toggle import FeatureToggle
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# Counting the bytes written requires serialising the values a second time,
+# so it is off by default
+FEATURE_COUNT_BYTES = FeatureToggle("config_bytes_metrics", False)
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Environment variables to export the metrics over HTTP or to a file
+METRICS_PORT_ENV = "SDP_WORKFLOW_METRICS_PORT"
+METRICS_FILE_ENV = "SDP_WORKFLOW_METRICS_FILE"
+
+# Prefixes of the transaction methods which read and write the config DB
+READ_PREFIXES = ("get_", "list_", "is_")
+WRITE_PREFIXES = ("create_", "update_", "delete_", "take_")
+
+
+class MetricsRegistry:
+    """
+    In-memory registry of metrics.
+
+    Metrics are counters, gauges and histograms identified by a name and a
+    dictionary of labels. They can be exported in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, labels=None, value=1):
+        """
+        Increment a counter.
+
+        :param name: name of the metric
+        :type name: str
+        :param labels: labels of the metric
+        :type labels: dict, optional
+        :param value: value to add
+        :type value: float, optional
+
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        """
+        Set a gauge.
+
+        :param name: name of the metric
+        :type name: str
+        :param value: value
+        :type value: float
+        :param labels: labels of the metric
+        :type labels: dict, optional
+
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, labels=None):
+        """
+        Add an observation to a histogram.
+
+        :param name: name of the metric
+        :type name: str
+        :param value: observed value
+        :type value: float
+        :param labels: labels of the metric
+        :type labels: dict, optional
+
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+                self._histograms[key] = hist
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def get(self, name, labels=None):
+        """
+        Get the value of a metric.
+
+        :param name: name of the metric
+        :type name: str
+        :param labels: labels of the metric
+        :type labels: dict, optional
+        :returns: value of a counter or gauge, or a dictionary with the
+            cumulative bucket counts, sum and count of a histogram, or None if
+            the metric does not exist
+
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            if key in self._gauges:
+                return self._gauges[key]
+            if key in self._histograms:
+                return _copy_histogram(self._histograms[key])
+        return None
+
+    def total(self, name):
+        """
+        Get the sum of a counter over all its labels.
+
+        :param name: name of the metric
+        :type name: str
+        :rtype: float
+
+        """
+        with self._lock:
+            return sum(
+                value for (key, _), value in self._counters.items() if key == name
+            )
+
+    def snapshot(self):
+        """
+        Get a copy of all the metrics.
+
+        :returns: counters, gauges and histograms, each as a list of
+            dictionaries with the name, labels and value
+        :rtype: dict
+
+        """
+        with self._lock:
+            return {
+                "counters": _entries(self._counters),
+                "gauges": _entries(self._gauges),
+                "histograms": _entries(
+                    {
+                        key: _copy_histogram(hist)
+                        for key, hist in self._histograms.items()
+                    }
+                ),
+            }
+
+    def to_prometheus(self):
+        """
+        Export the metrics in the Prometheus text format.
+
+        :rtype: str
+
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for kind, entries in (
+            ("counter", snapshot["counters"]),
+            ("gauge", snapshot["gauges"]),
+        ):
+            for name in sorted({entry["name"] for entry in entries}):
+                lines.append("# TYPE {} {}".format(name, kind))
+                for entry in entries:
+                    if entry["name"] == name:
+                        lines.append(
+                            "{}{} {}".format(
+                                name, _format_labels(entry["labels"]), entry["value"]
+                            )
+                        )
+        entries = snapshot["histograms"]
+        for name in sorted({entry["name"] for entry in entries}):
+            lines.append("# TYPE {} histogram".format(name))
+            for entry in entries:
+                if entry["name"] != name:
+                    continue
+                hist = entry["value"]
+                for bound, count in zip(
+                    LATENCY_BUCKETS + ("+Inf",), hist["buckets"] + [hist["count"]]
+                ):
+                    labels = dict(entry["labels"], le=str(bound))
+                    lines.append(
+                        "{}_bucket{} {}".format(name, _format_labels(labels), count)
+                    )
+                labels = _format_labels(entry["labels"])
+                lines.append("{}_sum{} {}".format(name, labels, hist["sum"]))
+                lines.append("{}_count{} {}".format(name, labels, hist["count"]))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Write the metrics to a file.
+
+        The metrics are written in JSON if the file name ends with ``.json``,
+        otherwise in the Prometheus text format.
+
+        :param path: path of the file
+        :type path: str
+
+        """
+        LOG.info("Writing metrics to %s", path)
+        with open(path, "w", encoding="utf-8") as file:
+            if path.endswith(".json"):
+                json.dump(self.snapshot(), file, indent=2)
+            else:
+                file.write(self.to_prometheus())
+
+    def reset(self):
+        """Remove all the metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+# Registry used by the library
+METRICS = MetricsRegistry()
+
+
+class InstrumentedConfig:
+    """
+    Instrumented SDP configuration client.
+
+    This wraps a configuration client and records, for each API method that
+    opens a transaction loop:
+
+    - ``config_transactions_total``: number of transaction loops
+    - ``config_transaction_retries_total``: number of repeats of the loops,
+      either because the commit failed or because of ``txn.loop()``
+    - ``config_reads_total`` and ``config_writes_total``: number of reads and
+      writes made in the transactions
+    - ``config_bytes_written_total``: size of the values written (only if the
+      CONFIG_BYTES_METRICS feature is active)
+    - ``config_transaction_seconds``: histogram of the duration of the
+      transaction loops, including any waiting
+
+    The API method is identified by the name of the function calling
+    :func:`txn`. All other attributes are passed through to the client.
+
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param registry: registry for the metrics, defaults to :data:`METRICS`
+    :type registry: :class:`MetricsRegistry`, optional
+    """
+
+    def __init__(self, config, registry=None):
+        self._config = config
+        self._registry = METRICS if registry is None else registry
+
+    def txn(self, *args, **kwargs):
+        """
+        Transaction loop.
+
+        The arguments are passed to the ``txn`` method of the client.
+        """
+        labels = {"api": _caller_name(sys._getframe(1))}  # pylint: disable=protected-access
+        count_bytes = FEATURE_COUNT_BYTES.is_active()
+        counts = {"reads": 0, "writes": 0, "bytes": 0}
+        attempts = 0
+        start = time.perf_counter()
+        try:
+            for txn in self._config.txn(*args, **kwargs):
+                attempts += 1
+                yield InstrumentedTransaction(txn, counts, count_bytes)
+        finally:
+            registry = self._registry
+            registry.inc("config_transactions_total", labels)
+            registry.inc(
+                "config_transaction_retries_total", labels, max(attempts - 1, 0)
+            )
+            registry.inc("config_reads_total", labels, counts["reads"])
+            registry.inc("config_writes_total", labels, counts["writes"])
+            if count_bytes:
+                registry.inc("config_bytes_written_total", labels, counts["bytes"])
+            registry.observe(
+                "config_transaction_seconds", time.perf_counter() - start, labels
+            )
+
+    def get_registry(self):
+        """
+        Get the registry of the metrics.
+
+        :rtype: :class:`MetricsRegistry`
+
+        """
+        return self._registry
+
+    def __getattr__(self, name):
+        return getattr(self._config, name)
+
+
+class InstrumentedTransaction:
+    """
+    Instrumented configuration transaction.
+
+    This should not be created directly, it is yielded by
+    :func:`InstrumentedConfig.txn`.
+
+    :param txn: SDP configuration transaction
+    :type txn: ska_sdp_config.Transaction
+    :param counts: counts of reads, writes and bytes written to update
+    :type counts: dict
+    :param count_bytes: count the bytes written
+    :type count_bytes: bool
+    """
+
+    def __init__(self, txn, counts, count_bytes):
+        self._txn = txn
+        self._counts = counts
+        self._count_bytes = count_bytes
+
+    def __getattr__(self, name):
+        attr = getattr(self._txn, name)
+        if name.startswith(READ_PREFIXES):
+            counts = self._counts
+
+            def read(*args, **kwargs):
+                counts["reads"] += 1
+                return attr(*args, **kwargs)
+
+            wrapper = read
+        elif name.startswith(WRITE_PREFIXES):
+            counts = self._counts
+            count_bytes = self._count_bytes
+
+            def write(*args, **kwargs):
+                counts["writes"] += 1
+                if count_bytes:
+                    counts["bytes"] += sum(_size(arg) for arg in args)
+                return attr(*args, **kwargs)
+
+            wrapper = write
+        else:
+            return attr
+
+        # Cache the wrapper so later calls do not go through __getattr__
+        setattr(self, name, wrapper)
+        return wrapper
+
+
+def serve_metrics(port, registry=None):
+    """
+    Serve the metrics in the Prometheus text format over HTTP.
+
+    The server runs in a daemon thread.
+
+    :param port: port to listen on
+    :type port: int
+    :param registry: registry of the metrics, defaults to :data:`METRICS`
+    :type registry: :class:`MetricsRegistry`, optional
+    :returns: the HTTP server
+    :rtype: http.server.HTTPServer
+
+    """
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    registry = METRICS if registry is None else registry
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Handler returning the metrics."""
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """Return the metrics."""
+            body = registry.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            """Do not log requests."""
+
+    server = HTTPServer(("", port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    LOG.info("Serving metrics on port %d", server.server_address[1])
+    return server
+
+
+def start_metrics_server():
+    """
+    Start serving the metrics if the port is set in the environment.
+
+    The port is read from the SDP_WORKFLOW_METRICS_PORT environment variable.
+    The server is only started once per process.
+    """
+    global _SERVER  # pylint: disable=global-statement
+    port = os.environ.get(METRICS_PORT_ENV)
+    with _SERVER_LOCK:
+        if port and _SERVER is None:
+            _SERVER = serve_metrics(int(port))
+
+
+def dump_metrics():
+    """
+    Write the metrics to a file if the path is set in the environment.
+
+    The path is read from the SDP_WORKFLOW_METRICS_FILE environment variable.
+    """
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        METRICS.dump(path)
+
+
+_SERVER = None
+_SERVER_LOCK = threading.Lock()
+
+
+# -------------------------------------
+# Private functions
+# -------------------------------------
+
+
+def _caller_name(frame):
+    """Get the qualified name of the function of a frame."""
+    code = frame.f_code
+    name = getattr(code, "co_qualname", None)
+    if name is None:
+        obj = frame.f_locals.get("self")
+        name = code.co_name
+        if obj is not None:
+            name = type(obj).__name__ + "." + name
+    return name
+
+
+def _label_key(labels):
+    """Convert labels to a hashable key."""
+    if not labels:
+        return ()
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels):
+    """Format labels in the Prometheus text format."""
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(key, value) for key, value in sorted(labels.items())
+        )
+        + "}"
+    )
+
+
+def _entries(metrics):
+    """Convert a dictionary of metrics to a list of entries."""
+    return [
+        {"name": name, "labels": dict(labels), "value": value}
+        for (name, labels), value in sorted(metrics.items())
+    ]
+
+
+def _copy_histogram(hist):
+    """Copy a histogram."""
+    return {
+        "buckets": list(hist["buckets"]),
+        "sum": hist["sum"],
+        "count": hist["count"],
+    }
+
+
+def _size(value):
+    """Get the size of a value serialised as JSON."""
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    return len(json.dumps(value, default=str))
@@ -0,0 +1,256 @@
+"""Lease and ownership monitor module for SDP workflow."""
+# pylint: disable=too-many-instance-attributes
+# pylint: disable=broad-except
+
+import logging
+import threading
+
+from .ee_base_deploy import wait_until
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# Default time to wait for the monitor thread to stop in seconds
+STOP_TIMEOUT = 5.0
+
+
+class LeaseMonitor:
+    """
+    Watch the ownership of processing blocks in the background.
+
+    The monitor thread waits for changes of the owner keys of the processing
+    blocks in a single transaction loop, so with the etcd backend it wakes up
+    as soon as a key is deleted, e.g. when the lease of the client expires.
+    At each interval it also checks the remaining time to live of the lease,
+    if the lease reports it. The processing blocks claimed by a
+    :class:`WorkflowHost` share its lease and are all watched by its monitor.
+
+    When the ownership of a processing block is lost, its callbacks are
+    called once, in the monitor thread, and then its lost event is set, so
+    whoever waits for the event sees the effects of the callbacks (e.g. the
+    engines of a phase cancelled). The event can be used as a cancellation
+    token by engines which need to stop promptly.
+    While the monitor is running, a phase gets the ownership from it instead
+    of reading the owner key in every transaction. A monitor of a single
+    processing block (given to the constructor) ends when its ownership is
+    lost. A shared monitor keeps running until it is stopped, since more
+    processing blocks may be added to it.
+
+    The methods which take a processing block ID default to the processing
+    block given to the constructor.
+
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param pb_id: processing block ID
+    :type pb_id: str, optional
+    :param interval: interval between checks of the lease in seconds
+    :type interval: float, optional
+    """
+
+    def __init__(self, config, pb_id=None, interval=1.0):
+        self._config = config
+        self._pb_id = pb_id
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._lost = {}
+        self._stop = threading.Event()
+        self._thread = None
+        if pb_id is not None:
+            self.add_processing_block(pb_id)
+
+    def start(self):
+        """Start the monitor thread."""
+        name = (
+            "lease-monitor" if self._pb_id is None else "lease-monitor-" + self._pb_id
+        )
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        Stop the monitor thread.
+
+        The thread is a daemon thread, so if it does not stop in time (e.g.
+        while a transaction is blocked), it is abandoned.
+
+        :param timeout: time to wait for the thread in seconds
+        :type timeout: float, optional
+
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                LOG.warning("Lease monitor did not stop in %s s", timeout)
+            self._thread = None
+
+    def is_watching(self):
+        """
+        Check if the monitor thread is running.
+
+        :rtype: bool
+
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_processing_block(self, pb_id):
+        """
+        Watch the ownership of a processing block.
+
+        :param pb_id: processing block ID
+        :type pb_id: str
+
+        """
+        with self._lock:
+            self._lost.setdefault(pb_id, threading.Event())
+            self._callbacks.setdefault(pb_id, [])
+
+    def remove_processing_block(self, pb_id):
+        """
+        Stop watching the ownership of a processing block.
+
+        :param pb_id: processing block ID
+        :type pb_id: str
+
+        """
+        with self._lock:
+            self._lost.pop(pb_id, None)
+            self._callbacks.pop(pb_id, None)
+
+    def is_lost(self, pb_id=None):
+        """
+        Check if the ownership of a processing block has been lost.
+
+        :param pb_id: processing block ID
+        :type pb_id: str, optional
+        :rtype: bool
+
+        """
+        return self.get_lost_event(pb_id).is_set()
+
+    def get_lost_event(self, pb_id=None):
+        """
+        Get the event which is set when the ownership is lost.
+
+        :param pb_id: processing block ID
+        :type pb_id: str, optional
+        :rtype: threading.Event
+
+        """
+        with self._lock:
+            return self._lost[self._pb_id if pb_id is None else pb_id]
+
+    def add_callback(self, callback, pb_id=None):
+        """
+        Add a function to call when the ownership is lost.
+
+        If it has already been lost, the function is called straight away.
+
+        :param callback: function without arguments
+        :type callback: function
+        :param pb_id: processing block ID
+        :type pb_id: str, optional
+
+        """
+        pb_id = self._pb_id if pb_id is None else pb_id
+        with self._lock:
+            callbacks = self._callbacks[pb_id]
+            if callbacks is not None:
+                callbacks.append(callback)
+        if callbacks is None:
+            callback()
+
+    def remove_callback(self, callback, pb_id=None):
+        """
+        Remove a function added with :func:`add_callback`.
+
+        :param callback: function
+        :type callback: function
+        :param pb_id: processing block ID
+        :type pb_id: str, optional
+
+        """
+        pb_id = self._pb_id if pb_id is None else pb_id
+        with self._lock:
+            callbacks = self._callbacks.get(pb_id) or []
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _run(self):
+        """
+        Watch the ownership until the monitor is stopped.
+
+        A monitor of a single processing block also ends when its ownership
+        is lost.
+        """
+        while not self._stop.is_set():
+            lost = []
+
+            def check(txn):
+                lost[:] = [
+                    pb_id
+                    for pb_id in self._get_owned()
+                    if not txn.is_processing_block_owner(pb_id)
+                ]
+                return bool(lost) or self._stop.is_set()
+
+            try:
+                wait_until(self._config, check, self._interval)
+                if not self._is_alive():
+                    lost = self._get_owned()
+            except Exception as ex:
+                LOG.error("Could not check ownership: %s", ex)
+                self._stop.wait(self._interval)
+                continue
+            if self._stop.is_set():
+                return
+            for pb_id in lost:
+                self._lose(pb_id)
+            if lost and self._pb_id is not None and not self._get_owned():
+                return
+
+    def _get_owned(self):
+        """
+        Get the processing blocks whose ownership has not been lost.
+
+        :returns: processing block IDs
+
+        """
+        with self._lock:
+            return [pb_id for pb_id, lost in self._lost.items() if not lost.is_set()]
+
+    def _is_alive(self):
+        """
+        Check the remaining time to live of the lease.
+
+        :returns: False if the lease has expired, True if it has not or it
+            does not report its time to live
+
+        """
+        ttl = getattr(self._config.client_lease, "remaining_ttl", None)
+        return ttl is None or ttl > 0
+
+    def _lose(self, pb_id):
+        """
+        Call the callbacks of a processing block and set its lost event.
+
+        :param pb_id: processing block ID
+
+        """
+        LOG.error("Lost ownership of processing block %s", pb_id)
+        with self._lock:
+            if pb_id not in self._lost:
+                return
+            # Callbacks added from now on are called straight away
+            callbacks, self._callbacks[pb_id] = self._callbacks[pb_id], None
+            event = self._lost[pb_id]
+        for callback in callbacks or []:
+            try:
+                callback()
+            except Exception as ex:
+                LOG.error("Ownership callback failed: %s", ex)
+        event.set()
@@ -0,0 +1,128 @@
+"""Workflow parameters module for SDP workflow."""
+# pylint: disable=import-outside-toplevel
+
+import collections
+import threading
+
+# Number of compiled validators kept in the cache
+VALIDATOR_CACHE_SIZE = 32
+
+# Compiled validators with their schemas, keyed by the identity of the schema
+_VALIDATORS = collections.OrderedDict()
+_VALIDATORS_LOCK = threading.Lock()
+
+
+def get_validator(schema):
+    """
+    Get the compiled validator of a JSON schema.
+
+    The schema is checked and compiled the first time it is used. The
+    validators of the most recently used schemas are cached, keyed by the
+    identity of the schema object, so looking up a validator does not depend
+    on the size of the schema. The schema must not be modified in place
+    after it has been used, and callers can also keep the returned validator.
+
+    :param schema: JSON schema
+    :type schema: dict
+    :returns: validator
+    :rtype: jsonschema.protocols.Validator
+
+    """
+    key = id(schema)
+    with _VALIDATORS_LOCK:
+        entry = _VALIDATORS.get(key)
+        if entry is not None:
+            _VALIDATORS.move_to_end(key)
+            return entry[1]
+
+    validator = _compile(schema)
+    with _VALIDATORS_LOCK:
+        # The schema is kept in the cache so that its identity is not reused
+        _VALIDATORS[key] = (schema, validator)
+        _VALIDATORS.move_to_end(key)
+        while len(_VALIDATORS) > VALIDATOR_CACHE_SIZE:
+            _VALIDATORS.popitem(last=False)
+    return validator
+
+
+def validate(parameters, schema):
+    """
+    Validate parameters against a JSON schema.
+
+    :param parameters: parameters
+    :type parameters: dict
+    :param schema: JSON schema
+    :type schema: dict
+    :raises jsonschema.ValidationError: if the parameters are not valid
+
+    """
+    get_validator(schema).validate(parameters)
+
+
+def unflatten(parameters):
+    """
+    Convert a flattened dictionary to a nested dictionary.
+
+    The keys of the flattened dictionary are split on dots, e.g.
+    ``{"a.b": 1}`` is converted to ``{"a": {"b": 1}}``.
+
+    :param parameters: flattened parameters
+    :type parameters: dict
+    :returns: nested parameters
+    :rtype: dict
+
+    """
+    result = {}
+    for key, value in parameters.items():
+        *parents, leaf = key.split(".")
+        node = result
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return result
+
+
+def flatten(parameters):
+    """
+    Convert a nested dictionary to a flattened dictionary.
+
+    This is the inverse of :func:`unflatten`. Empty dictionaries are kept as
+    values.
+
+    :param parameters: nested parameters
+    :type parameters: dict
+    :returns: flattened parameters
+    :rtype: dict
+
+    """
+    result = {}
+    stack = [("", parameters)]
+    while stack:
+        prefix, node = stack.pop()
+        for key, value in node.items():
+            name = prefix + key
+            if isinstance(value, dict) and value:
+                stack.append((name + ".", value))
+            else:
+                result[name] = value
+    return result
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _compile(schema):
+    """
+    Check and compile a JSON schema.
+
+    :param schema: JSON schema
+    :returns: validator
+
+    """
+    import jsonschema
+
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
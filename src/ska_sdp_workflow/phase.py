@@ -1,20 +1,50 @@
 """Phase class module for SDP workflow."""
 # pylint: disable=too-many-instance-attributes
 # pylint: disable=too-many-arguments
+# pylint: disable=import-outside-toplevel
 
+import concurrent.futures
 import logging
+import time
 
-from .dask_deploy import DaskDeploy
-from .helm_deploy import HelmDeploy
-from .fake_deploy import FakeDeploy
+from .config_cache import DEPLOYMENTS, PB_STATE
+from .ee_base_deploy import wait_until
+from .executor import MAX_ENGINES, EngineExecutor
+from .instrumentation import METRICS
+from .phase_events import PB_STATUS, SBI_STATUS, EventStream
+from .state_writer import PBStateWriter
 
 LOG = logging.getLogger("ska_sdp_workflow")
 
+# Default time allowed for the engines to stop when the phase is cancelled,
+# in seconds
+CANCEL_DEADLINE = 30.0
+
+# Minimum interval between identical log messages of the state checks, in
+# seconds
+CHECK_LOG_INTERVAL = 10.0
+
+
+class ProcessingCancelledError(Exception):
+    """Raised when the processing block or the SBI has been cancelled."""
+
 
 class Phase:
     """
     Workflow phase.
 
+    The execution engines which run in the workflow are run by an executor
+    owned by the phase, which limits the number running at the same time.
+
+    If the processing block or the SBI is cancelled, the checks of the phase
+    raise :class:`ProcessingCancelledError`. When it leaves the ``with``
+    block, the phase cancels its engines and removes their deployments, see
+    :func:`cancel`.
+
+    If a lease monitor is running, the ownership of the processing block is
+    taken from it instead of being read in every transaction, and the engines
+    are cancelled as soon as the ownership is lost.
+
     This should not be created directly, use the
     :func:`ProcessingBlock.create_phase()` method instead.
 
@@ -30,9 +60,34 @@ class Phase:
     :type sbi_id: str
     :param workflow_type: workflow type
     :type workflow_type: str
+    :param state_writer: processing block state writer
+    :type state_writer: :class:`PBStateWriter`, optional
+    :param cache: cache of the configuration DB entries
+    :type cache: :class:`ConfigCache`, optional
+    :param max_engines: maximum number of execution engines running in the
+        workflow at the same time
+    :type max_engines: int, optional
+    :param cancel_deadline: time allowed for the engines to stop when the
+        phase is cancelled, in seconds
+    :type cancel_deadline: float, optional
+    :param lease_monitor: monitor of the ownership of the processing block
+    :type lease_monitor: :class:`LeaseMonitor`, optional
     """
 
-    def __init__(self, name, list_requests, config, pb_id, sbi_id, workflow_type):
+    def __init__(
+        self,
+        name,
+        list_requests,
+        config,
+        pb_id,
+        sbi_id,
+        workflow_type,
+        state_writer=None,
+        cache=None,
+        max_engines=MAX_ENGINES,
+        cancel_deadline=CANCEL_DEADLINE,
+        lease_monitor=None,
+    ):
         self._name = name
         self._requests = list_requests
         self._config = config
@@ -40,9 +95,23 @@ class Phase:
         self._sbi_id = sbi_id
         self._workflow_type = workflow_type
         self._deploy_id_list = []
-        self._deploy = None
+        self._deploys = []
         self._status = None
         self._deployment_status = None
+        self._enter_txn_count = None
+        self._teardown_time = None
+        self._cancel_deadline = cancel_deadline
+        self._cancel_detected = None
+        self._cancel_time = None
+        self._check_logged = None
+        self._check_message = None
+        self._check_log_skipped = 0
+        if state_writer is None:
+            state_writer = PBStateWriter(config, pb_id)
+        self._state_writer = state_writer
+        self._cache = cache
+        self._lease_monitor = lease_monitor
+        self._executor = EngineExecutor(max_engines)
 
     def __enter__(self):
         """
@@ -50,45 +119,34 @@ class Phase:
 
         While waiting, it checks if the PB is cancelled or finished, and for
         real-time workflows it checks if the SBI is cancelled or finished.
-        """
-
-        for txn in self._config.txn():
-            self.check_state(txn)
 
-        # Set state to indicate workflow is waiting for resources
-        LOG.info("Setting status to WAITING")
-        for txn in self._config.txn():
-            self.check_state(txn)
-            state = txn.get_processing_block_state(self._pb_id)
-            state["status"] = "WAITING"
-            txn.update_processing_block_state(self._pb_id, state)
+        If the resources are not yet available, the status is set to WAITING
+        and committed in its own transaction, so that it is visible while the
+        phase waits. The phase then waits for ``resources_available`` in
+        read-only transactions, which wake up when the keys they read change
+        (PB state, PB owner and, for real-time workflows, the SBI). When the
+        resources are available, the deployments key is added and the status
+        is set to RUNNING in the same transaction.
+        """
+        self._enter_txn_count = 0
+        if self._lease_monitor is not None:
+            self._lease_monitor.add_callback(self._ownership_lost, self._pb_id)
 
-        # Wait for resources_available to be true
         LOG.info("Waiting for resources to be available")
-        for txn in self._config.txn():
-            self.check_state(txn)
-            state = txn.get_processing_block_state(self._pb_id)
-            r_a = state.get("resources_available")
-            if r_a is not None and r_a:
-                LOG.info("Resources are available")
-                break
-            txn.loop(wait=True)
-
-        # Add deployments key to processing block state
-        for txn in self._config.txn():
-            self.check_state(txn)
-            state = txn.get_processing_block_state(self._pb_id)
-            if "deployments" not in state:
-                state["deployments"] = {}
-                txn.update_processing_block_state(self._pb_id, state)
-
-        # Set state to indicate processing has started
-        LOG.info("Setting status to RUNNING")
-        for txn in self._config.txn():
-            self.check_state(txn)
-            state = txn.get_processing_block_state(self._pb_id)
-            state["status"] = "RUNNING"
-            txn.update_processing_block_state(self._pb_id, state)
+        running = False
+        while not running:
+            for txn in self._config.txn():
+                self._enter_txn_count += 1
+                running = self._start(txn)
+            if not running:
+                wait_until(self._config, self._resources_available)
+
+        LOG.debug("Phase started in %d transaction(s)", self._enter_txn_count)
+        METRICS.set(
+            "phase_enter_transactions",
+            self._enter_txn_count,
+            {"pb_id": self._pb_id, "phase": self._name},
+        )
 
     def check_state(self, txn):
         """
@@ -97,25 +155,57 @@ class Phase:
         Check if the PB is finished or cancelled, and for real-time workflows
         check if the SBI is finished or cancelled.
 
+        The PB state, the ownership and the SBI are each read once from the
+        transaction. If the lease monitor is running, the ownership is taken
+        from it instead. A log message which is identical to the last one is
+        only repeated once per :data:`CHECK_LOG_INTERVAL`, so a change of
+        status is always logged.
+
         :param txn: SDP configuration transaction
         :type txn: ska_sdp_config.Transaction
+        :returns: processing block state
+        :rtype: dict
 
         """
-        LOG.info("Checking PB state")
         pb_state = txn.get_processing_block_state(self._pb_id)
+        owner = self._is_owner(txn)
+        sbi_status = None
+        if self._workflow_type == "realtime":
+            sbi_status = txn.get_scheduling_block(self._sbi_id).get("status")
+
         pb_status = pb_state.get("status")
-        if pb_status in ["FINISHED", "CANCELLED"]:
+        METRICS.inc(
+            "phase_state_checks_total", {"pb_id": self._pb_id, "phase": self._name}
+        )
+        self._log_check("PB status %s, SBI status %s", pb_status, sbi_status)
+
+        if pb_status == "CANCELLED":
+            raise self._cancelled("PB is {}".format(pb_state))
+        if pb_status == "FINISHED":
             raise Exception("PB is {}".format(pb_state))
 
-        if not txn.is_processing_block_owner(self._pb_id):
+        if not owner:
             raise Exception("Lost ownership of the processing block")
 
-        if self._workflow_type == "realtime":
-            LOG.info("Checking SBI state")
-            sbi = txn.get_scheduling_block(self._sbi_id)
-            sbi_status = sbi.get("status")
-            if sbi_status in ["FINISHED", "CANCELLED"]:
-                raise Exception("PB is {}".format(sbi_status))
+        if sbi_status == "CANCELLED":
+            raise self._cancelled("PB is {}".format(sbi_status))
+        if sbi_status == "FINISHED":
+            raise Exception("PB is {}".format(sbi_status))
+
+        return pb_state
+
+    def get_enter_txn_count(self):
+        """
+        Get the number of transactions used to start the phase.
+
+        This includes retries and wake-ups of the transaction loop while
+        waiting for resources.
+
+        :returns: number of transactions, or None if the phase is not started
+        :rtype: int
+
+        """
+        return self._enter_txn_count
 
     def ee_deploy_test(self, deploy_name, func=None, f_args=None):
         """
@@ -133,11 +223,60 @@ class Phase:
         :rtype: :class:`FakeDeploy`
 
         """
-        return FakeDeploy(
-            self._pb_id, self._config, deploy_name, func=func, f_args=f_args
+        from .fake_deploy import FakeDeploy
+
+        deploy = FakeDeploy(
+            self._pb_id,
+            self._config,
+            deploy_name,
+            func=func,
+            f_args=f_args,
+            state_writer=self._state_writer,
+            executor=self._executor,
+        )
+        self._deploys.append(deploy)
+        return deploy
+
+    def ee_deploy_local(self, deploy_name, func, batch, max_workers=None, chunksize=1):
+        """
+        Deploy a local process pool execution engine.
+
+        The function is called with each of the argument tuples of the batch
+        in a pool of processes on the workflow node. This can be used for
+        small batch workflows which do not need a Helm or Dask deployment.
+
+        :param deploy_name: deployment name
+        :type deploy_name: str
+        :param func: function to execute, defined at the top level of a module
+        :type func: function
+        :param batch: arguments of each call
+        :type batch: iterable of tuple
+        :param max_workers: number of worker processes, defaults to the number
+            of CPUs
+        :type max_workers: int, optional
+        :param chunksize: number of calls sent to a worker at a time
+        :type chunksize: int, optional
+        :return: local process pool execution engine deployment
+        :rtype: :class:`ProcessDeploy`
+
+        """
+        from .process_deploy import ProcessDeploy
+
+        deploy = ProcessDeploy(
+            self._pb_id,
+            self._config,
+            deploy_name,
+            func,
+            batch,
+            max_workers=max_workers,
+            chunksize=chunksize,
+            state_writer=self._state_writer,
+            executor=self._executor,
         )
+        self._deploys.append(deploy)
+        return deploy
 
-    def ee_deploy_helm(self, deploy_name, values=None):
+    def ee_deploy_helm(self, deploy_name, values=None, track_ready=False):
         """
         Deploy a Helm execution engine.
 
@@ -147,19 +286,100 @@ class Phase:
         :type deploy_name: str
         :param values: values to pass to Helm chart
         :type values: dict, optional
+        :param track_ready: track the readiness reported by the engine, see
+            :class:`HelmDeploy`
+        :type track_ready: bool, optional
         :return: Helm execution engine deployment
         :rtype: :class:`HelmDeploy`
 
         """
-        self._deploy = HelmDeploy(self._pb_id, self._config, deploy_name, values)
-        deploy_id = self._deploy.get_id()
-        self._deploy_id_list.append(deploy_id)
-        return self._deploy
+        from .helm_deploy import HelmDeploy
+
+        deploy = HelmDeploy(
+            self._pb_id,
+            self._config,
+            deploy_name,
+            values,
+            state_writer=self._state_writer,
+            track_ready=track_ready,
+        )
+        self._deploy_id_list.append(deploy.get_id())
+        self._deploys.append(deploy)
+        self._invalidate(DEPLOYMENTS)
+        return deploy
+
+    def ee_deploy_helm_bulk(self, charts, track_ready=False):
+        """
+        Deploy several Helm execution engines together.
+
+        The RUNNING statuses of the deployments are written to the processing
+        block state and the deployments are created in a single transaction.
+
+        :param charts: values to pass to each Helm chart, by chart name
+        :type charts: dict
+        :param track_ready: track the readiness reported by the engines, see
+            :class:`HelmDeploy`
+        :type track_ready: bool, optional
+        :return: group of Helm execution engine deployments
+        :rtype: :class:`DeploymentGroup`
 
-    def ee_deploy_dask(self, name, n_workers, func, f_args):
+        """
+        from .deploy_group import DeploymentGroup
+        from .helm_deploy import HelmDeploy
+
+        deploys = [
+            HelmDeploy(
+                self._pb_id,
+                self._config,
+                deploy_name,
+                values,
+                state_writer=self._state_writer,
+                create=False,
+                track_ready=track_ready,
+            )
+            for deploy_name, values in charts.items()
+        ]
+        LOG.info("Deploying %d Helm chart(s)", len(deploys))
+
+        # Write any pending state updates first, so they are not overwritten
+        self._state_writer.flush()
+        for txn in self._config.txn():
+            state = txn.get_processing_block_state(self._pb_id)
+            deployments = dict(state.get("deployments") or {})
+            for deploy in deploys:
+                deployments[deploy.get_id()] = "RUNNING"
+            state["deployments"] = deployments
+            txn.update_processing_block_state(self._pb_id, state)
+            for deploy in deploys:
+                txn.create_deployment(deploy.get_deployment())
+
+        for deploy in deploys:
+            deploy.set_created()
+            self._deploy_id_list.append(deploy.get_id())
+            self._deploys.append(deploy)
+        self._invalidate(DEPLOYMENTS, PB_STATE)
+        return DeploymentGroup(self._pb_id, self._config, deploys)
+
+    def ee_deploy_dask(
+        self,
+        name,
+        n_workers,
+        func,
+        f_args,
+        wait_for_workers=False,
+        sink=None,
+        publish=None,
+        min_workers=None,
+        max_workers=None,
+    ):
         """
         Deploy a Dask execution engine.
 
+        If a maximum number of workers is given, the deployment is adaptive:
+        the number of workers follows the task backlog of the scheduler
+        between the minimum and the maximum, so that workers which are not
+        needed are released for other processing blocks.
+
         :param name: deployment name
         :type name: str
         :param n_workers: number of Dask workers
@@ -168,42 +388,222 @@ class Phase:
         :type func: function
         :param f_args: function arguments
         :type f_args: tuple
+        :param wait_for_workers: wait for all workers before computing
+        :type wait_for_workers: bool, optional
+        :param sink: function called with the key and value of each part of
+            the result as it completes
+        :type sink: function, optional
+        :param publish: name of the dataset to publish the result as
+        :type publish: str, optional
+        :param min_workers: minimum number of workers when adaptive
+        :type min_workers: int, optional
+        :param max_workers: maximum number of workers, enables adaptive
+            scaling
+        :type max_workers: int, optional
         :return: Dask execution engine deployment
         :rtype: :class:`DaskDeploy`
 
         """
-        return DaskDeploy(self._pb_id, self._config, name, n_workers, func, f_args)
+        # Dask is only imported if it is used
+        from .dask_deploy import DaskDeploy
+        from .dask_adaptive import AdaptiveScaler
+
+        scaler = None
+        if max_workers is not None:
+            scaler = AdaptiveScaler(
+                1 if min_workers is None else min_workers, max_workers
+            )
+
+        deploy = DaskDeploy(
+            self._pb_id,
+            self._config,
+            name,
+            n_workers,
+            func,
+            f_args,
+            state_writer=self._state_writer,
+            wait_for_workers=wait_for_workers,
+            sink=sink,
+            publish=publish,
+            scaler=scaler,
+            executor=self._executor,
+        )
+        self._deploys.append(deploy)
+        self._invalidate(DEPLOYMENTS)
+        return deploy
 
     def ee_remove(self):
         """
         Remove execution engines deployments.
+
+        All the finished or failed deployments of the phase are removed in a
+        single transaction. The time taken is recorded as the teardown time.
+
+        :returns: IDs of the deployments removed
+        :rtype: list of str
+
         """
-        for txn in self._config.txn():
-            state = txn.get_processing_block_state(self._pb_id)
-            deployments = state.get("deployments")
-            for deploy_id in self._deploy_id_list:
-                if deployments[deploy_id] == "FINISHED":
-                    deployment_list = txn.list_deployments()
-                    if deploy_id in deployment_list:
-                        self._deploy.remove(deploy_id)
+        start = time.monotonic()
+        removed, _ = self._remove(self._deploy_id_list, ("FINISHED", "FAILED"))
+        self._teardown_time = time.monotonic() - start
+
+        LOG.info(
+            "Removed %d deployment(s) in %.3f s", len(removed), self._teardown_time
+        )
+        METRICS.observe(
+            "phase_teardown_seconds",
+            self._teardown_time,
+            {"pb_id": self._pb_id, "phase": self._name},
+        )
+        return removed
+
+    @staticmethod
+    def remove_many(phases, max_workers=None):
+        """
+        Remove the deployments of several phases in parallel.
+
+        Each phase is torn down in its own transaction (see
+        :func:`ee_remove`), and the transactions run concurrently.
+
+        :param phases: phases
+        :type phases: list of :class:`Phase`
+        :param max_workers: maximum number of threads, defaults to one per phase
+        :type max_workers: int, optional
+        :returns: IDs of the deployments removed, for each phase
+        :rtype: list of list of str
+
+        """
+        phases = list(phases)
+        if not phases:
+            return []
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers or len(phases)
+        ) as executor:
+            return list(executor.map(lambda phase: phase.ee_remove(), phases))
+
+    def get_teardown_time(self):
+        """
+        Get the time taken by the last removal of the deployments.
+
+        :returns: time in seconds, or None if they have not been removed
+        :rtype: float
+
+        """
+        return self._teardown_time
+
+    def cancel(self, deadline=None):
+        """
+        Cancel the execution engines and remove their deployments.
+
+        All the engines of the phase are asked to stop (see
+        :func:`EEDeploy.cancel`), and they are waited for until the deadline.
+        The engines which have not stopped by then are abandoned. The
+        deployments which have not finished are marked as CANCELLED, and all
+        the deployments of the phase are removed in a single transaction.
+
+        This is called on exit when the processing block or the SBI has been
+        cancelled. The time from the detection of the cancellation to the
+        removal of the deployments is recorded as the cancel time.
+
+        :param deadline: time allowed for the engines to stop in seconds,
+            defaults to the cancel deadline of the phase
+        :type deadline: float, optional
+        :returns: IDs of the deployments removed
+        :rtype: list of str
+
+        """
+        if deadline is None:
+            deadline = self._cancel_deadline
+        start = time.monotonic()
+        if self._cancel_detected is None:
+            self._cancel_detected = start
+
+        LOG.info("Cancelling %d execution engine(s)", len(self._deploys))
+        for deploy in self._deploys:
+            deploy.cancel()
+        for deploy in self._deploys:
+            remaining = max(0.0, start + deadline - time.monotonic())
+            try:
+                deploy.exception(timeout=remaining)
+            except concurrent.futures.TimeoutError:
+                LOG.warning("Deployment %s did not stop in time", deploy.get_id())
+            except concurrent.futures.CancelledError:
+                pass
+
+        # Write the statuses set by the engines which stopped
+        self._state_writer.flush()
+        deploy_ids = list(self._deploy_id_list)
+        for deploy in self._deploys:
+            if deploy.get_id() is not None and deploy.get_id() not in deploy_ids:
+                deploy_ids.append(deploy.get_id())
+        removed, deployments = self._remove(deploy_ids)
+        statuses = {
+            deploy_id: "CANCELLED"
+            for deploy_id in deploy_ids
+            if deployments.get(deploy_id) not in ("FINISHED", "FAILED")
+        }
+        if statuses:
+            self._state_writer.set_deployment_statuses(statuses)
+            self._state_writer.flush()
+        self._cancel_time = time.monotonic() - self._cancel_detected
+
+        LOG.info(
+            "Cancelled %d engine(s) and removed %d deployment(s) in %.3f s",
+            len(self._deploys),
+            len(removed),
+            self._cancel_time,
+        )
+        METRICS.observe(
+            "phase_cancel_seconds",
+            self._cancel_time,
+            {"pb_id": self._pb_id, "phase": self._name},
+        )
+        return removed
+
+    def get_cancel_time(self):
+        """
+        Get the time taken to cancel the phase.
+
+        This is measured from the detection of the cancellation to the
+        removal of the deployments.
+
+        :returns: time in seconds, or None if the phase has not been cancelled
+        :rtype: float
 
-    def is_sbi_finished(self, txn):
+        """
+        return self._cancel_time
+
+    def is_sbi_finished(self, txn=None):
         """
         Check if the SBI is finished or cancelled.
 
+        If the transaction is not given, the SBI is read from the cache, which
+        does not need a round trip to the configuration DB if the cache is
+        watching it. Inside a transaction loop which waits for changes, the
+        transaction should be given so that the loop wakes up when the SBI
+        changes.
+
         :param txn: config db transaction
-        :type txn: ska_sdp_config.Transaction
+        :type txn: ska_sdp_config.Transaction, optional
         :rtype: bool
 
         """
-        sbi = txn.get_scheduling_block(self._sbi_id)
+        if txn is not None:
+            sbi = txn.get_scheduling_block(self._sbi_id)
+        elif self._cache is not None:
+            sbi = self._cache.get_scheduling_block()
+        else:
+            for txn_sbi in self._config.txn():
+                sbi = txn_sbi.get_scheduling_block(self._sbi_id)
         status = sbi.get("status")
         if status in ["FINISHED", "CANCELLED"]:
             self._status = status
             if status == "CANCELLED":
-                raise Exception("SBI is {}".format(status))
+                raise self._cancelled("SBI is {}".format(status))
             if self._deploy_id_list:
-                self._deploy.update_deploy_status(status)
+                self._state_writer.set_deployment_statuses(
+                    {deploy_id: status for deploy_id in self._deploy_id_list}
+                )
             return True
         return False
 
@@ -211,7 +611,9 @@ class Phase:
         """
         Update processing block state.
 
-        If the status is not provided, it is marked as finished.
+        If the status is not provided, it is marked as finished. The status is
+        written together with any pending updates of the processing block
+        state in a single transaction.
 
         :param status: status
         :type status: str, optional
@@ -220,31 +622,82 @@ class Phase:
         if status is not None:
             self._status = status
 
-        for txn in self._config.txn():
-            # Set state to indicate processing has ended
-            state = txn.get_processing_block_state(self._pb_id)
-            if self._status is None:
-                state["status"] = "FINISHED"
-            else:
-                LOG.info("Setting PB status to %s", self._status)
-                state["status"] = self._status
-            txn.update_processing_block_state(self._pb_id, state)
+        # Set state to indicate processing has ended
+        if self._status is None:
+            self._state_writer.set_status("FINISHED")
+        else:
+            LOG.info("Setting PB status to %s", self._status)
+            self._state_writer.set_status(self._status)
+        self._state_writer.flush()
 
     def wait_loop(self):
         """
         Wait loop to check the status of the processing block.
         """
         for txn in self._config.txn():
-            state = txn.get_processing_block_state(self._pb_id)
-            pb_status = state.get("status")
-            if pb_status in ["FINISHED", "CANCELLED"]:
-                if pb_status == "CANCELLED":
-                    raise Exception("PB is {}".format(pb_status))
+            self._check_running(txn)
+            yield txn
 
-            if not txn.is_processing_block_owner(self._pb_id):
-                raise Exception("Lost ownership of the processing block")
+    def events(self, kinds=None, deploy_ids=None, debounce=0.0):
+        """
+        Wait for changes of the processing block.
+
+        This is a higher-level version of :func:`wait_loop`. It yields typed
+        events for the changes of the PB status, the SBI status and the
+        deployment statuses, and when the ownership of the processing block
+        is lost. Changes are coalesced over the debounce time, and only the
+        entries needed for the kinds of event requested are watched (see
+        :class:`EventStream`).
+
+        If the processing block or the SBI is cancelled, this raises
+        :class:`ProcessingCancelledError` instead of yielding an event.
+
+        :param kinds: kinds of event, defaults to all of them
+        :type kinds: list of str, optional
+        :param deploy_ids: IDs of the deployments whose status is watched,
+            defaults to all of them
+        :type deploy_ids: list of str, optional
+        :param debounce: time to wait for more changes in seconds
+        :type debounce: float, optional
+        :returns: iterator of events
+        :rtype: iterator of :class:`PhaseEvent`
 
-            yield txn
+        """
+        stream = EventStream(
+            self._config,
+            self._pb_id,
+            self._sbi_id,
+            kinds=kinds,
+            deploy_ids=deploy_ids,
+            debounce=debounce,
+        )
+        return self._events(stream)
+
+    def wait_for(self, *deploys, timeout=None):
+        """
+        Wait for deployments to finish.
+
+        All the deployments are watched in a single transaction loop, which
+        also checks the status of the processing block like
+        :func:`wait_loop`.
+
+        :param deploys: deployments
+        :type deploys: :class:`EEDeploy`
+        :param timeout: timeout in seconds
+        :type timeout: float, optional
+        :raises TimeoutError: if the deployments do not finish in time
+
+        """
+        pending = list(deploys)
+
+        def check(txn):
+            nonlocal pending
+            self._check_running(txn)
+            pending = [deploy for deploy in pending if not deploy.is_finished(txn)]
+            return not pending
+
+        if not wait_until(self._config, check, timeout):
+            raise TimeoutError("Deployments did not finish in time")
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """
@@ -252,7 +705,13 @@ class Phase:
         or cancelled. For both kinds of workflow, it updates the processing
         block state.
         """
-        if self._workflow_type == "realtime":
+        # Write pending deployment statuses before cleaning up
+        self._state_writer.flush()
+
+        if exc_type is not None and issubclass(exc_type, ProcessingCancelledError):
+            self._status = "CANCELLED"
+            self.cancel()
+        elif self._workflow_type == "realtime":
 
             # Clean up deployment.
             LOG.info("Clean up deployments")
@@ -261,4 +720,179 @@ class Phase:
 
         self.update_pb_state()
 
+        # The engines still running are not waited for
+        self._executor.shutdown(wait=False)
+        if self._lease_monitor is not None:
+            self._lease_monitor.remove_callback(self._ownership_lost, self._pb_id)
+
         LOG.info("Deployments All Done")
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _invalidate(self, *names):
+        """
+        Invalidate entries of the cache, if there is one.
+
+        :param names: names of the entries
+
+        """
+        if self._cache is not None:
+            self._cache.invalidate(*names)
+
+    def _cancelled(self, message):
+        """
+        Record that the processing has been cancelled.
+
+        The time of the first detection is kept to measure the cancel time.
+
+        :param message: message of the exception
+        :returns: exception to raise
+
+        """
+        if self._cancel_detected is None:
+            self._cancel_detected = time.monotonic()
+        return ProcessingCancelledError(message)
+
+    def _events(self, stream):
+        """
+        Yield the events of a stream, raising if the processing is cancelled.
+
+        :param stream: event stream
+        :returns: iterator of events
+
+        """
+        for event in stream:
+            cancelled = event.get_kind() in (PB_STATUS, SBI_STATUS)
+            if cancelled and event.get_value() == "CANCELLED":
+                name = "PB" if event.get_kind() == PB_STATUS else "SBI"
+                raise self._cancelled("{} is CANCELLED".format(name))
+            yield event
+
+    def _log_check(self, message, *args):
+        """
+        Log the result of a state check.
+
+        A message identical to the last one logged is dropped until the
+        interval has passed, and the number of messages dropped is then added
+        to it. A different message is always logged.
+
+        :param message: message
+        :param args: arguments of the message
+
+        """
+        now = time.monotonic()
+        if (message, args) != self._check_message:
+            self._check_message = (message, args)
+            self._check_log_skipped = 0
+        elif now - self._check_logged < CHECK_LOG_INTERVAL:
+            self._check_log_skipped += 1
+            return
+        elif self._check_log_skipped:
+            message += " (%d identical message(s) suppressed)"
+            args += (self._check_log_skipped,)
+            self._check_log_skipped = 0
+        LOG.info(message, *args)
+        self._check_logged = now
+
+    def _remove(self, deploy_ids, statuses=None):
+        """
+        Remove deployments of the phase in a single transaction.
+
+        :param deploy_ids: IDs of the deployments
+        :param statuses: statuses of the deployments to remove, defaults to
+            all of them
+        :returns: IDs of the deployments removed, and the deployment statuses
+            in the processing block state
+
+        """
+        for txn in self._config.txn():
+            removed = []
+            state = txn.get_processing_block_state(self._pb_id)
+            deployments = state.get("deployments") or {}
+            existing = set(txn.list_deployments())
+            for deploy_id in deploy_ids:
+                selected = statuses is None or deployments.get(deploy_id) in statuses
+                if selected and deploy_id in existing:
+                    txn.delete_deployment(txn.get_deployment(deploy_id))
+                    removed.append(deploy_id)
+        self._invalidate(DEPLOYMENTS)
+        return removed, deployments
+
+    def _check_running(self, txn):
+        """
+        Check the processing block is not cancelled and is still owned.
+
+        :param txn: SDP configuration transaction
+
+        """
+        state = txn.get_processing_block_state(self._pb_id)
+        pb_status = state.get("status")
+        if pb_status == "CANCELLED":
+            raise self._cancelled("PB is {}".format(pb_status))
+
+        if not self._is_owner(txn):
+            raise Exception("Lost ownership of the processing block")
+
+    def _is_owner(self, txn):
+        """
+        Check if the processing block is still owned.
+
+        If the lease monitor is running, this does not read the owner key.
+
+        :param txn: SDP configuration transaction
+        :returns: True if it is owned
+
+        """
+        monitor = self._lease_monitor
+        if monitor is not None and monitor.is_watching():
+            return not monitor.is_lost(self._pb_id)
+        return txn.is_processing_block_owner(self._pb_id)
+
+    def _ownership_lost(self):
+        """
+        Cancel the engines when the ownership is lost.
+
+        This is called by the lease monitor.
+
+        """
+        LOG.error("Cancelling %d engine(s) of phase %s", len(self._deploys), self._name)
+        for deploy in list(self._deploys):
+            deploy.cancel()
+
+    def _start(self, txn):
+        """
+        Make the state transition on entering the phase.
+
+        :param txn: SDP configuration transaction
+        :returns: True if the status is set to RUNNING, False if it is set to
+            WAITING
+
+        """
+        state = self.check_state(txn)
+        r_a = state.get("resources_available")
+        if r_a is not None and r_a:
+            LOG.info("Setting status to RUNNING")
+            state.setdefault("deployments", {})
+            state["status"] = "RUNNING"
+            txn.update_processing_block_state(self._pb_id, state)
+            return True
+
+        if state.get("status") != "WAITING":
+            LOG.info("Setting status to WAITING")
+            state["status"] = "WAITING"
+            txn.update_processing_block_state(self._pb_id, state)
+        return False
+
+    def _resources_available(self, txn):
+        """
+        Check if the resources are available, without writing to the state.
+
+        :param txn: SDP configuration transaction
+        :rtype: bool
+
+        """
+        self._enter_txn_count += 1
+        r_a = self.check_state(txn).get("resources_available")
+        return r_a is not None and r_a
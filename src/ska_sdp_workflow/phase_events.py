@@ -0,0 +1,236 @@
+"""Phase event stream module for SDP workflow."""
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-instance-attributes
+
+import logging
+import time
+
+from .ee_base_deploy import wait_until
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# Kinds of event
+PB_STATUS = "pb_status"
+SBI_STATUS = "sbi_status"
+DEPLOYMENT_STATUS = "deployment_status"
+OWNERSHIP_LOST = "ownership_lost"
+KINDS = (PB_STATUS, SBI_STATUS, DEPLOYMENT_STATUS, OWNERSHIP_LOST)
+
+
+class PhaseEvent:
+    """
+    Change in the configuration DB seen by a phase.
+
+    :param kind: kind of event
+    :type kind: str
+    :param value: new value
+    :param previous: previous value
+    :param key: ID of the deployment for deployment status events
+    :type key: str, optional
+    """
+
+    def __init__(self, kind, value, previous=None, key=None):
+        self._kind = kind
+        self._value = value
+        self._previous = previous
+        self._key = key
+
+    def __eq__(self, other):
+        if not isinstance(other, PhaseEvent):
+            return NotImplemented
+        return (self._kind, self._key, self._value, self._previous) == (
+            other.get_kind(),
+            other.get_key(),
+            other.get_value(),
+            other.get_previous(),
+        )
+
+    def __repr__(self):
+        return "PhaseEvent({!r}, {!r}, previous={!r}, key={!r})".format(
+            self._kind, self._value, self._previous, self._key
+        )
+
+    def get_kind(self):
+        """
+        Get the kind of event.
+
+        :rtype: str
+
+        """
+        return self._kind
+
+    def get_value(self):
+        """
+        Get the new value.
+
+        This is the status for status events, and True for ownership lost
+        events.
+
+        """
+        return self._value
+
+    def get_previous(self):
+        """
+        Get the value before the change.
+
+        """
+        return self._previous
+
+    def get_key(self):
+        """
+        Get the ID of the deployment.
+
+        :returns: deployment ID, or None if the event is not about a
+            deployment
+        :rtype: str
+
+        """
+        return self._key
+
+
+class EventStream:
+    """
+    Stream of coalesced change events of a processing block.
+
+    Each step reads, in a single transaction, only the entries needed for
+    the kinds of event requested, so the transaction loop waiting for
+    changes does not wake up for the other entries. The values read are
+    compared with the previous ones to make the events.
+
+    Once a change is seen, the stream waits for the debounce time and reads
+    the entries again, so a burst of changes gives at most one event per
+    value, from the value before the burst to the value after it. A value
+    which changes and changes back during the burst gives no event.
+
+    The events are the changes after the stream is created. After an
+    ownership lost event, the stream ends.
+
+    This should not be created directly, use the :func:`Phase.events`
+    method instead.
+
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param sbi_id: scheduling block instance ID
+    :type sbi_id: str
+    :param kinds: kinds of event, defaults to all of them
+    :type kinds: list of str, optional
+    :param deploy_ids: IDs of the deployments whose status is watched,
+        defaults to all of them
+    :type deploy_ids: list of str, optional
+    :param debounce: time to wait for more changes in seconds
+    :type debounce: float, optional
+    """
+
+    def __init__(
+        self, config, pb_id, sbi_id, kinds=None, deploy_ids=None, debounce=0.0
+    ):
+        kinds = KINDS if kinds is None else tuple(kinds)
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise ValueError("Unknown event kinds {}".format(sorted(unknown)))
+        self._config = config
+        self._pb_id = pb_id
+        self._sbi_id = sbi_id
+        self._kinds = kinds
+        self._deploy_ids = None if deploy_ids is None else list(deploy_ids)
+        self._debounce = debounce
+        self._ended = False
+        for txn in self._config.txn():
+            self._values = self._read(txn)
+
+    def __iter__(self):
+        """Yield the events until the stream ends."""
+        while not self._ended:
+            yield from self.next_events()
+
+    def next_events(self, timeout=None):
+        """
+        Wait for the next changes.
+
+        :param timeout: timeout in seconds
+        :type timeout: float, optional
+        :returns: events, or an empty list if the timeout expired or the
+            stream has ended
+        :rtype: list of :class:`PhaseEvent`
+
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        events = []
+        while not events and not self._ended:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+            values = None
+
+            def check(txn):
+                nonlocal values
+                values = self._read(txn)
+                return values != self._values
+
+            if not wait_until(self._config, check, remaining):
+                break
+            if self._debounce > 0:
+                time.sleep(self._debounce)
+                for txn in self._config.txn():
+                    values = self._read(txn)
+
+            events = self._compare(values)
+            self._values = values
+        return events
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _read(self, txn):
+        """
+        Read the values needed for the kinds of event.
+
+        :param txn: SDP configuration transaction
+        :returns: values keyed by kind of event and deployment ID
+
+        """
+        values = {}
+        if PB_STATUS in self._kinds or DEPLOYMENT_STATUS in self._kinds:
+            state = txn.get_processing_block_state(self._pb_id) or {}
+            if PB_STATUS in self._kinds:
+                values[PB_STATUS, None] = state.get("status")
+            if DEPLOYMENT_STATUS in self._kinds:
+                deployments = state.get("deployments") or {}
+                deploy_ids = self._deploy_ids
+                if deploy_ids is None:
+                    deploy_ids = deployments
+                for deploy_id in deploy_ids:
+                    values[DEPLOYMENT_STATUS, deploy_id] = deployments.get(deploy_id)
+        if SBI_STATUS in self._kinds and self._sbi_id is not None:
+            sbi = txn.get_scheduling_block(self._sbi_id)
+            values[SBI_STATUS, None] = sbi.get("status")
+        if OWNERSHIP_LOST in self._kinds:
+            values[OWNERSHIP_LOST, None] = not txn.is_processing_block_owner(
+                self._pb_id
+            )
+        return values
+
+    def _compare(self, values):
+        """
+        Make the events for the values which changed.
+
+        :param values: new values
+        :returns: events
+
+        """
+        events = []
+        for (kind, key), value in values.items():
+            previous = self._values.get((kind, key))
+            if value == previous or (kind == OWNERSHIP_LOST and not value):
+                continue
+            events.append(PhaseEvent(kind, value, previous=previous, key=key))
+            if kind == OWNERSHIP_LOST:
+                self._ended = True
+        LOG.debug("%d event(s) for PB %s", len(events), self._pb_id)
+        return events
@@ -0,0 +1,135 @@
+"""Local process pool deployment."""
+# pylint: disable=too-many-arguments
+
+import itertools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .ee_base_deploy import EEDeploy
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+
+class ProcessDeploy(EEDeploy):
+    """
+    Deploy a local process pool execution engine.
+
+    The function is called once with each of the argument tuples of the
+    batch, in a pool of worker processes on the workflow node, so CPU-bound
+    functions can use more than one core. The calls are sent to the workers
+    in chunks of the given size, which reduces the overhead for batches of
+    many short calls. The function and its arguments must be picklable, i.e.
+    the function must be defined at the top level of a module.
+
+    The worker processes are started with the spawn method, as forking a
+    process with configuration DB connections and watcher threads can
+    deadlock the children. If a call raises an exception, the deployment is
+    marked as FAILED (see :class:`EEDeploy`). If the deployment is cancelled,
+    the calls which have not started are dropped.
+
+    The batch runs in a thread of the executor so the constructor can return
+    immediately. No Helm or Dask deployment is made.
+
+    This should not be created directly, use the :func:`Phase.ee_deploy_local`
+    method instead.
+
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Client
+    :param deploy_name: deployment name
+    :type deploy_name: str
+    :param func: function to execute
+    :type func: function
+    :param batch: arguments of each call
+    :type batch: iterable of tuple
+    :param max_workers: number of worker processes, defaults to the number
+        of CPUs
+    :type max_workers: int, optional
+    :param chunksize: number of calls sent to a worker at a time
+    :type chunksize: int, optional
+    :param state_writer: processing block state writer
+    :type state_writer: :class:`PBStateWriter`, optional
+    :param executor: executor running the engine
+    :type executor: :class:`EngineExecutor`, optional
+    """
+
+    def __init__(
+        self,
+        pb_id,
+        config,
+        deploy_name,
+        func,
+        batch,
+        max_workers=None,
+        chunksize=1,
+        state_writer=None,
+        executor=None,
+    ):
+        super().__init__(pb_id, config, state_writer=state_writer)
+        self._deploy_id = "proc-{}-{}".format(pb_id, deploy_name)
+        self._results = None
+        self._pool = None
+        self._start(executor, self._deploy, func, batch, max_workers, chunksize)
+
+    def get_results(self):
+        """
+        Get the results of the calls.
+
+        :returns: results in the order of the batch, or None if the batch
+            has not finished
+        :rtype: list
+
+        """
+        return self._results
+
+    def _deploy(self, func, batch, max_workers, chunksize):
+        """
+        Execute the batch.
+
+        This is called by the execution thread.
+
+        :param func: function to process
+        :param batch: arguments of each call
+        :param max_workers: number of worker processes
+        :param chunksize: number of calls sent to a worker at a time
+        :returns: results of the calls
+
+        """
+        LOG.info("Deploying %s on local process pool...", self._deploy_id)
+        self.update_deploy_status("RUNNING")
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            self._pool = pool
+            self._check_cancelled()
+            results = list(
+                pool.map(_apply, itertools.repeat(func), batch, chunksize=chunksize)
+            )
+        self._pool = None
+        LOG.info("Finished %d call(s)", len(results))
+        self._results = results
+        self.update_deploy_status("FINISHED")
+        return results
+
+    def _stop(self):
+        """Drop the calls which have not started."""
+        pool = self._pool
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _apply(func, args):
+    """
+    Call a function with a tuple of arguments.
+
+    This is run in the worker processes.
+
+    :param func: function
+    :param args: arguments
+    :returns: result
+
+    """
+    return func(*args)
@@ -0,0 +1,305 @@
+"""Compact receive address encoding for SDP workflows.
+
+The receive addresses of a scan type hold one host entry and one or more
+port entries per process step, and every host entry repeats the DNS name of
+the receive process. The DNS names of the processes only differ by their
+ordinal (e.g. ``proc-...-receive-3.receive.sdp.svc.cluster.local``), so in
+the compact encoding each name is split into a template, which is stored
+once, and the ordinal. Consecutive entries whose values all change by the
+same amount from one entry to the next are then stored as a single run:
+
+.. code-block:: python
+
+    {
+        "encoding": "ranges",
+        "templates": [["proc-...-receive-", ".receive.sdp.svc.cluster.local"]],
+        "host": [[count, start, template, ordinal, start_step, 0, 1], ...],
+        "port": [[count, start, port, increment, start_step, 0, 0], ...],
+    }
+
+Each run is ``[count, *first, *step]``, where ``first`` is the first entry
+and ``step`` is the difference between consecutive entries. A name without
+an ordinal is stored as a template with an empty suffix and an ordinal of
+-1. Consumers convert the compact encoding back to the full one with
+:func:`decode`.
+
+Receive addresses which are too large for the processing block state are
+written in chunks, each to its own key below the processing block (see
+:func:`write_chunk`). The processing block state then only holds the number
+of chunks of each scan type, ``{"chunks": count}``, and consumers read the
+chunks back with :func:`read_chunks`.
+"""
+
+import json
+import re
+
+ENCODING = "ranges"
+CHUNKS = "chunks"
+
+# DNS name of a receive process: the ordinal is the last number between a
+# hyphen and a dot, without leading zeros
+_NAME_PATTERN = re.compile(r"^(.*-)(0|[1-9][0-9]*)(\..*)$")
+
+
+def encode(receive_addresses):
+    """
+    Encode receive addresses compactly.
+
+    Values which are not the receive addresses of a scan type (such as the
+    interface) are copied unchanged.
+
+    :param receive_addresses: receive addresses by scan type
+    :type receive_addresses: dict
+    :returns: compact receive addresses
+    :rtype: dict
+
+    """
+    return {
+        key: encode_scan_type(value) if _is_scan_type(value) else value
+        for key, value in receive_addresses.items()
+    }
+
+
+def decode(receive_addresses):
+    """
+    Decode compact receive addresses.
+
+    Scan types which are not compact are copied unchanged, so this can be
+    applied to receive addresses in either encoding.
+
+    :param receive_addresses: compact receive addresses by scan type
+    :type receive_addresses: dict
+    :returns: receive addresses
+    :rtype: dict
+
+    """
+    return {
+        key: decode_scan_type(value) if is_compact(value) else value
+        for key, value in receive_addresses.items()
+    }
+
+
+def is_compact(value):
+    """
+    Check if the receive addresses of a scan type are compact.
+
+    :param value: receive addresses of a scan type
+    :rtype: bool
+
+    """
+    return isinstance(value, dict) and value.get("encoding") == ENCODING
+
+
+def encode_scan_type(value):
+    """
+    Encode the receive addresses of a scan type compactly.
+
+    :param value: host and port entries
+    :type value: dict
+    :returns: compact host and port entries
+    :rtype: dict
+
+    """
+    templates = []
+    index = {}
+    hosts = []
+    for start, name in value.get("host", []):
+        match = _NAME_PATTERN.match(name)
+        if match:
+            template = (match.group(1), match.group(3))
+            ordinal = int(match.group(2))
+        else:
+            template = (name, "")
+            ordinal = -1
+        if template not in index:
+            index[template] = len(templates)
+            templates.append(list(template))
+        hosts.append((start, index[template], ordinal))
+
+    return {
+        "encoding": ENCODING,
+        "templates": templates,
+        "host": encode_runs(hosts),
+        "port": encode_runs(value.get("port", [])),
+    }
+
+
+def decode_scan_type(value):
+    """
+    Decode the compact receive addresses of a scan type.
+
+    :param value: compact host and port entries
+    :type value: dict
+    :returns: host and port entries
+    :rtype: dict
+
+    """
+    templates = value["templates"]
+    hosts = []
+    for start, i, ordinal in decode_runs(value["host"]):
+        prefix, suffix = templates[i]
+        if ordinal < 0:
+            hosts.append([start, prefix])
+        else:
+            hosts.append([start, prefix + str(ordinal) + suffix])
+    return {"host": hosts, "port": decode_runs(value["port"])}
+
+
+def chunk_path(pb_id, scan_type_id, index):
+    """
+    Get the path of a chunk of receive addresses in the configuration DB.
+
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param scan_type_id: scan type ID
+    :type scan_type_id: str
+    :param index: index of the chunk in the scan type
+    :type index: int
+    :rtype: str
+
+    """
+    return "/pb/{}/receive_addresses/{}/{}".format(pb_id, scan_type_id, index)
+
+
+def write_chunk(txn, pb_id, scan_type_id, index, entry):
+    """
+    Write a chunk of the receive addresses of a scan type to its own key.
+
+    :param txn: configuration transaction
+    :type txn: ska_sdp_config.Transaction
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param scan_type_id: scan type ID
+    :type scan_type_id: str
+    :param index: index of the chunk in the scan type
+    :type index: int
+    :param entry: host and port entries, in either encoding
+    :type entry: dict
+
+    """
+    path = chunk_path(pb_id, scan_type_id, index)
+    value = json.dumps(entry)
+    if txn.raw.get(path) is None:
+        txn.raw.create(path, value)
+    else:
+        txn.raw.update(path, value)
+
+
+def is_chunked(value):
+    """
+    Check if the receive addresses of a scan type are written in chunks.
+
+    :param value: receive addresses of a scan type
+    :rtype: bool
+
+    """
+    return isinstance(value, dict) and CHUNKS in value
+
+
+def read_chunks(txn, pb_id, receive_addresses):
+    """
+    Read the chunks of receive addresses.
+
+    The chunks of each scan type are decoded and concatenated. Scan types
+    which are not written in chunks are copied unchanged.
+
+    :param txn: configuration transaction
+    :type txn: ska_sdp_config.Transaction
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param receive_addresses: receive addresses by scan type, from the
+        processing block state
+    :type receive_addresses: dict
+    :returns: receive addresses
+    :rtype: dict
+
+    """
+    result = {}
+    for key, value in receive_addresses.items():
+        if not is_chunked(value):
+            result[key] = value
+            continue
+        entry = {"host": [], "port": []}
+        for index in range(value[CHUNKS]):
+            chunk = json.loads(txn.raw.get(chunk_path(pb_id, key, index)))
+            if is_compact(chunk):
+                chunk = decode_scan_type(chunk)
+            entry["host"].extend(chunk["host"])
+            entry["port"].extend(chunk["port"])
+        result[key] = entry
+    return result
+
+
+def encode_runs(entries):
+    """
+    Encode a list of integer entries as runs.
+
+    A run is a sequence of consecutive entries of the same length in which
+    each value changes by the same step from one entry to the next.
+
+    :param entries: entries
+    :type entries: list of list of int
+    :returns: runs, each one ``[count, *first, *step]``
+    :rtype: list of list of int
+
+    """
+    runs = []
+    first = previous = step = None
+    count = 0
+    for entry in entries:
+        entry = tuple(entry)
+        if count == 1 and len(entry) == len(first):
+            step = tuple(e - p for e, p in zip(entry, previous))
+        elif count == 0 or step is None or not _follows(entry, previous, step):
+            if count:
+                runs.append(_run(count, first, step))
+            first, step, count = entry, None, 0
+        previous = entry
+        count += 1
+    if count:
+        runs.append(_run(count, first, step))
+    return runs
+
+
+def decode_runs(runs):
+    """
+    Decode runs into a list of entries.
+
+    :param runs: runs, each one ``[count, *first, *step]``
+    :type runs: list of list of int
+    :returns: entries
+    :rtype: list of list of int
+
+    """
+    entries = []
+    for run in runs:
+        count = run[0]
+        width = (len(run) - 1) // 2
+        first = run[1 : 1 + width]
+        step = run[1 + width :]
+        entries.extend([f + i * s for f, s in zip(first, step)] for i in range(count))
+    return entries
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _is_scan_type(value):
+    """Check if a value holds the host and port entries of a scan type."""
+    return isinstance(value, dict) and ("host" in value or "port" in value)
+
+
+def _follows(entry, previous, step):
+    """Check if an entry follows the previous one with the given step."""
+    return len(entry) == len(previous) and all(
+        e - p == s for e, p, s in zip(entry, previous, step)
+    )
+
+
+def _run(count, first, step):
+    """Make a run."""
+    if step is None:
+        step = (0,) * len(first)
+    return [count, *first, *step]
@@ -0,0 +1,256 @@
+"""Receive process and port planner for SDP workflows."""
+
+# pylint: disable=too-many-locals
+# pylint: disable=too-many-arguments
+
+import numpy
+
+EQUIVALENT = "equivalent"
+ARRAYS = "arrays"
+
+
+class RecvPlan:
+    """
+    Receive process and port plan for a single scan type.
+
+    The plan holds one entry per process step, that is, per block of at most
+    ``max_channels_per_process`` channels. The entries are stored as NumPy
+    arrays and are only converted to lists when requested.
+
+    This should not be created directly, use the :func:`plan_scan_type`
+    function instead.
+
+    :param start: first channel of each process step
+    :type start: numpy.ndarray
+    :param host_index: receive process index of each process step
+    :type host_index: numpy.ndarray
+    :param num_process: number of receive processes
+    :type num_process: int
+    """
+
+    def __init__(self, start, host_index, num_process):
+        self.start = start
+        self.host_index = host_index
+        self.num_process = num_process
+
+    def __len__(self):
+        return len(self.start)
+
+    def hosts(self):
+        """
+        Get the host entries.
+
+        Each entry is ``[start, "-<index>."]``, which is completed with the DNS
+        name of the receive process when the receive addresses are generated.
+
+        :returns: host entries
+        :rtype: list
+
+        """
+        return [
+            [start, "-{}.".format(index)]
+            for start, index in zip(self.start.tolist(), self.host_index.tolist())
+        ]
+
+    def ports(self, port_start, channels_per_port):
+        """
+        Get the port entries.
+
+        :param port_start: starting port the receiver will be listening in
+        :type port_start: int
+        :param channels_per_port: number of channels to be sent to each port
+        :type channels_per_port: int
+        :returns: port entries
+        :rtype: list
+
+        """
+        starts = self.start.tolist()
+        if channels_per_port > 1:
+            return [
+                [start, port_start + j, 1, j]
+                for start in starts
+                for j in range(channels_per_port)
+            ]
+        return [[start, port_start, 1] for start in starts]
+
+    def to_dict(self, port_start, channels_per_port):
+        """
+        Convert the plan to the host and port dictionary of a scan type.
+
+        :param port_start: starting port the receiver will be listening in
+        :type port_start: int
+        :param channels_per_port: number of channels to be sent to each port
+        :type channels_per_port: int
+        :returns: host and port entries
+        :rtype: dict
+
+        """
+        return {
+            "host": self.hosts(),
+            "port": self.ports(port_start, channels_per_port),
+        }
+
+
+def plan_scan_type(channels, max_channels_per_process):
+    """
+    Plan the receive processes for the channel blocks of one scan type.
+
+    Each channel block is split into process steps of at most
+    ``max_channels_per_process`` channels. The process index of a step is
+    incremented whenever the running channel count reaches the maximum number
+    of channels per process, in the same way as the original loop-based
+    implementation. The number of processes is derived in closed form from the
+    number of increments.
+
+    :param channels: channel blocks of the scan type
+    :type channels: list of dict
+    :param max_channels_per_process: maximum number of channels per process
+    :type max_channels_per_process: int
+    :returns: receive plan
+    :rtype: :class:`RecvPlan`
+
+    """
+    if max_channels_per_process <= 0:
+        raise ValueError("max_channels_per_process must be positive")
+
+    blocks = [chan for chan in channels if chan.get("count") > 0]
+    count = numpy.array([chan.get("count") for chan in blocks], dtype=numpy.int64)
+    first = numpy.array([chan.get("start") for chan in blocks], dtype=numpy.int64)
+
+    # Number of process steps in each channel block
+    n_steps = -(-count // max_channels_per_process)
+    total_steps = int(n_steps.sum())
+    if total_steps == 0:
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        return RecvPlan(empty, empty, 0)
+
+    # Channel block and position within the block of every step
+    block = numpy.repeat(numpy.arange(len(blocks)), n_steps)
+    step = numpy.arange(total_steps) - numpy.repeat(
+        numpy.cumsum(n_steps) - n_steps, n_steps
+    )
+    start = first[block] + step * max_channels_per_process
+
+    # Running channel count at the end of each block. The first block is
+    # counted twice on entry and is never reset, the others are reset on
+    # their first step.
+    end_count = (n_steps - 1) * count
+    end_count[0] = (n_steps[0] + 1) * count[0]
+
+    # A step increments the process index if it is not the first step of a
+    # block (the block is then larger than the maximum), or if the running
+    # count on entry to the block reaches the maximum. The very first step
+    # never increments.
+    entry_count = numpy.zeros(len(blocks), dtype=numpy.int64)
+    entry_count[1:] = end_count[:-1] + 2 * count[1:]
+    increment = (step > 0) | (entry_count[block] >= max_channels_per_process)
+    increment[0] = False
+
+    host_index = numpy.cumsum(increment)
+    n_inc = int(host_index[-1])
+    num_process = 1 + n_inc * (n_inc + 1) // 2
+
+    return RecvPlan(start, host_index, num_process)
+
+
+def iter_receive_addresses(
+    scan_types,
+    max_channels_per_process,
+    port_start,
+    channels_per_port,
+    host_name,
+    max_entries=None,
+):
+    """
+    Generate the receive addresses scan type by scan type.
+
+    Only the plan of the current scan type is held in memory, so the
+    addresses of the first scan type are available before the others are
+    computed. If a maximum number of entries is given, the addresses of a
+    scan type are also split into blocks of consecutive process steps, with
+    at most that many host and port entries (but at least one step) each.
+    Concatenating the host and port entries of the blocks of a scan type, in
+    order, gives its addresses.
+
+    :param scan_types: scan types from SBI
+    :type scan_types: iterable of dict
+    :param max_channels_per_process: maximum number of channels per process
+    :type max_channels_per_process: int
+    :param port_start: starting port the receiver will be listening in
+    :type port_start: int
+    :param channels_per_port: number of channels to be sent to each port
+    :type channels_per_port: int
+    :param host_name: format string of the host name with the process index,
+        e.g. ``"proc-...-receive-{}.receive.sdp.svc.cluster.local"``
+    :type host_name: str
+    :param max_entries: maximum number of host and port entries in a block
+    :type max_entries: int, optional
+    :returns: generator of scan type ID, host and port entries, and number of
+        processes
+    :rtype: generator of tuple(str, dict, int)
+
+    """
+    # Number of port entries of each process step
+    ports_per_step = max(channels_per_port, 1)
+    for scan_type in scan_types:
+        plan = plan_scan_type(scan_type.get("channels"), max_channels_per_process)
+        n_steps = len(plan)
+        if max_entries is not None:
+            n_steps = max(1, max_entries // (1 + ports_per_step))
+        for first in range(0, max(len(plan), 1), max(n_steps, 1)):
+            block = RecvPlan(
+                plan.start[first : first + n_steps],
+                plan.host_index[first : first + n_steps],
+                plan.num_process,
+            )
+            hosts = [
+                [start, host_name.format(index)]
+                for start, index in zip(block.start.tolist(), block.host_index.tolist())
+            ]
+            entry = {"host": hosts, "port": block.ports(port_start, channels_per_port)}
+            yield scan_type.get("id"), entry, plan.num_process
+
+
+def configure_recv_processes_ports(
+    scan_types, max_channels_per_process, port_start, channels_per_port, mode=EQUIVALENT
+):
+    """
+    Calculate how many receive process(es) and ports are required.
+
+    In ``"equivalent"`` mode (the default) the configured hosts and ports are
+    returned as lists, exactly as produced by the original loop-based
+    implementation of :func:`ProcessingBlock.configure_recv_processes_ports`.
+    In ``"arrays"`` mode the plan of each scan type is returned as a
+    :class:`RecvPlan` instead, which avoids building one list per process step.
+
+    :param scan_types: scan types from SBI
+    :type scan_types: list of dict
+    :param max_channels_per_process: maximum number of channels per process
+    :type max_channels_per_process: int
+    :param port_start: starting port the receiver will be listening in
+    :type port_start: int
+    :param channels_per_port: number of channels to be sent to each port
+    :type channels_per_port: int
+    :param mode: ``"equivalent"`` or ``"arrays"``
+    :type mode: str, optional
+    :returns: configured host and port, and total number of processes
+    :rtype: tuple(dict, int)
+
+    """
+    if mode not in (EQUIVALENT, ARRAYS):
+        raise ValueError("Unknown planning mode {}".format(mode))
+
+    configured_host_port = {}
+    total_process = 0
+
+    for scan_type in scan_types:
+        plan = plan_scan_type(scan_type.get("channels"), max_channels_per_process)
+        total_process = max(total_process, plan.num_process)
+        if mode == ARRAYS:
+            configured_host_port[scan_type.get("id")] = plan
+        else:
+            configured_host_port[scan_type.get("id")] = plan.to_dict(
+                port_start, channels_per_port
+            )
+
+    return configured_host_port, total_process
@@ -0,0 +1,272 @@
+"""Workflow startup profiling module for SDP workflow."""
+# pylint: disable=import-outside-toplevel
+# pylint: disable=broad-except
+# pylint: disable=comparison-with-callable
+# pylint: disable=cyclic-import
+
+import builtins
+import contextlib
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+# Environment variable enabling the startup profiler. If it is set to a path,
+# the report is also written to it as JSON, set it to 1 to only log it.
+PROFILE_ENV = "SDP_WORKFLOW_STARTUP_PROFILE"
+
+# Modules imported in the background by fast_start
+ENGINE_MODULES = (
+    "ska_sdp_workflow.dask_deploy",
+    "ska_sdp_workflow.recv_planner",
+    "ska_telmodel.sdp.version",
+)
+
+# Number of imports logged in the report
+LOG_IMPORTS = 10
+
+
+class StartupProfiler:
+    """
+    Record the timings of the workflow startup.
+
+    When the profiler is running, the time taken by the first import of each
+    module (including the modules it imports) is recorded, as well as the
+    stages of claiming the processing block (configuring logging, opening
+    the configuration DB connection and claiming it). The times are relative
+    to the start of the process, if the operating system reports it (i.e.
+    on Linux), otherwise to the start of the profiler.
+
+    The profiler is started when the package is imported if
+    SDP_WORKFLOW_STARTUP_PROFILE is set, and it is finished when the first
+    processing block is claimed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._offset = 0.0
+        self._imports = {}
+        self._stages = []
+        self._import = None
+        self._path = None
+
+    def start(self, path=None):
+        """
+        Start recording the imports.
+
+        :param path: path of the JSON file for the report
+        :type path: str, optional
+
+        """
+        with self._lock:
+            if self._import is not None:
+                return
+            self._start = time.perf_counter()
+            self._offset = _process_age() or 0.0
+            self._path = path
+            self._import = builtins.__import__
+            builtins.__import__ = self._timed_import
+
+    def is_active(self):
+        """
+        Check if the profiler is running.
+
+        :rtype: bool
+
+        """
+        return self._import is not None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Record the time taken by a stage of the startup.
+
+        This does nothing if the profiler is not running.
+
+        :param name: name of the stage
+        :type name: str
+
+        """
+        if not self.is_active():
+            yield
+            return
+        start = self._now()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stages.append(
+                    {"stage": name, "start": start, "duration": self._now() - start}
+                )
+
+    def get_report(self):
+        """
+        Get the timings recorded.
+
+        :returns: time since the start of the process, stages in order and
+            imports by name, in seconds
+        :rtype: dict
+
+        """
+        with self._lock:
+            return {
+                "elapsed": self._now(),
+                "stages": list(self._stages),
+                "imports": dict(self._imports),
+            }
+
+    def finish(self):
+        """
+        Stop the profiler and report the timings.
+
+        The report is logged, and written to the JSON file if a path was
+        given. This does nothing if the profiler is not running.
+        """
+        with self._lock:
+            if self._import is None:
+                return
+            if builtins.__import__ == self._timed_import:
+                builtins.__import__ = self._import
+            self._import = None
+        report = self.get_report()
+
+        LOG.info(
+            "Processing block claimed %.3f s after process start", report["elapsed"]
+        )
+        for stage in report["stages"]:
+            LOG.info(
+                "Startup stage %s at %.3f s took %.3f s",
+                stage["stage"],
+                stage["start"],
+                stage["duration"],
+            )
+        imports = sorted(report["imports"].items(), key=lambda item: -item[1])
+        for name, duration in imports[:LOG_IMPORTS]:
+            LOG.info("Import of %s took %.3f s", name, duration)
+
+        if self._path:
+            with open(self._path, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _now(self):
+        """
+        Get the time since the start of the process.
+
+        :returns: time in seconds
+
+        """
+        return self._offset + time.perf_counter() - self._start
+
+    def _timed_import(self, name, *args, **kwargs):
+        """
+        Import a module, recording the time of its first import.
+
+        This replaces the built-in import function while the profiler is
+        running. Relative imports are not recorded.
+
+        """
+        level = kwargs.get("level", args[3] if len(args) > 3 else 0)
+        original = self._import or builtins.__import__
+        if level or name in sys.modules or original == self._timed_import:
+            return original(name, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return original(name, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self._imports.setdefault(name, duration)
+
+
+# Profiler of the process
+PROFILER = StartupProfiler()
+
+
+def start_from_env():
+    """Start the profiler if it is enabled in the environment."""
+    value = os.environ.get(PROFILE_ENV)
+    if value:
+        PROFILER.start(None if value == "1" else value)
+
+
+def fast_start(pb_id=None, modules=ENGINE_MODULES, wait=False, **kwargs):
+    """
+    Claim the processing block while importing the engine modules.
+
+    The modules are imported in a background thread while the configuration
+    DB connection is opened and the processing block is claimed, which mostly
+    waits for the configuration DB. The modules used by the workflow are then
+    already imported, or being imported, when it deploys its engines. Modules
+    which cannot be imported are skipped.
+
+    :param pb_id: processing block ID
+    :type pb_id: str, optional
+    :param modules: names of the modules to import
+    :type modules: list of str, optional
+    :param wait: wait for the imports before returning
+    :type wait: bool, optional
+    :param kwargs: other arguments of :class:`ProcessingBlock`
+    :returns: the claimed processing block
+    :rtype: :class:`ProcessingBlock`
+
+    """
+    thread = threading.Thread(
+        target=_import_modules, args=(modules,), name="fast-start", daemon=True
+    )
+    thread.start()
+
+    from .workflow import ProcessingBlock
+
+    pb = ProcessingBlock(pb_id, **kwargs)
+    if wait:
+        thread.join()
+    return pb
+
+
+# -------------------------------------
+# Private functions
+# -------------------------------------
+
+
+def _import_modules(modules):
+    """
+    Import modules, skipping the ones which cannot be imported.
+
+    :param modules: names of the modules
+
+    """
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as ex:
+            LOG.debug("Could not import %s in the background: %s", name, ex)
+
+
+def _process_age():
+    """
+    Get the time since the start of the process.
+
+    :returns: time in seconds, or None if the operating system does not
+        report it
+
+    """
+    try:
+        with open("/proc/self/stat", encoding="utf-8") as file:
+            fields = file.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", encoding="utf-8") as file:
+            uptime = float(file.read().split()[0])
+        # The start time is the 20th field after the command name
+        start = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+    return uptime - start
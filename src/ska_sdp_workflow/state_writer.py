@@ -0,0 +1,203 @@
+"""Processing block state writer module for SDP Workflow."""
+# pylint: disable=too-many-instance-attributes
+
+import logging
+import threading
+
+from .config_cache import PB_STATE
+
+LOG = logging.getLogger("ska_sdp_workflow")
+
+
+class PBStateWriter:
+    """
+    Write-behind buffer for processing block state updates.
+
+    Updates to the deployment statuses, the status and other fields of the
+    processing block state are merged while they are pending, and written to
+    the configuration DB in a single transaction when the buffer is flushed.
+    The buffer is flushed automatically after the flush interval has passed
+    since the first pending update. With a flush interval of zero (the
+    default), every update is written immediately.
+
+    :param config: SDP configuration client
+    :type config: ska_sdp_config.Config
+    :param pb_id: processing block ID
+    :type pb_id: str
+    :param flush_interval: time to hold updates before writing them, in seconds
+    :type flush_interval: float, optional
+    :param cache: cache to invalidate when the state is written
+    :type cache: :class:`ConfigCache`, optional
+    """
+
+    def __init__(self, config, pb_id, flush_interval=0.0, cache=None):
+        self._config = config
+        self._pb_id = pb_id
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._fields = {}
+        self._merged = {}
+        self._deployments = {}
+        self._timer = None
+        self._cache = cache
+
+    def set_deployment_status(self, deploy_id, status):
+        """
+        Set the status of a deployment.
+
+        :param deploy_id: deployment ID
+        :type deploy_id: str
+        :param status: status
+        :type status: str
+
+        """
+        self.set_deployment_statuses({deploy_id: status})
+
+    def set_deployment_statuses(self, statuses):
+        """
+        Set the statuses of several deployments.
+
+        :param statuses: status by deployment ID
+        :type statuses: dict
+
+        """
+        with self._lock:
+            self._deployments.update(statuses)
+        self._schedule()
+
+    def set_status(self, status):
+        """
+        Set the processing block status.
+
+        :param status: status
+        :type status: str
+
+        """
+        self.set_field("status", status)
+
+    def set_receive_addresses(self, receive_addresses):
+        """
+        Set the receive addresses.
+
+        :param receive_addresses: receive addresses
+        :type receive_addresses: dict
+
+        """
+        self.set_field("receive_addresses", receive_addresses)
+
+    def set_field(self, key, value):
+        """
+        Set a field of the processing block state.
+
+        :param key: name of the field
+        :type key: str
+        :param value: value of the field
+
+        """
+        with self._lock:
+            self._fields[key] = value
+        self._schedule()
+
+    def merge_field(self, key, values):
+        """
+        Merge values into a dictionary field of the processing block state.
+
+        The values are added to the field, replacing the existing values with
+        the same keys. This allows a large field to be written in parts.
+
+        :param key: name of the field
+        :type key: str
+        :param values: values to merge
+        :type values: dict
+
+        """
+        with self._lock:
+            self._merged.setdefault(key, {}).update(values)
+        self._schedule()
+
+    def is_pending(self):
+        """
+        Check if there are updates waiting to be written.
+
+        :rtype: bool
+
+        """
+        with self._lock:
+            return bool(self._fields or self._merged or self._deployments)
+
+    def flush(self):
+        """
+        Write the pending updates in a single transaction.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                fields, self._fields = self._fields, {}
+                merged, self._merged = self._merged, {}
+                deployments, self._deployments = self._deployments, {}
+
+            if not fields and not merged and not deployments:
+                return
+
+            LOG.debug(
+                "Writing %d field(s) and %d deployment status(es) to PB state",
+                len(fields) + len(merged),
+                len(deployments),
+            )
+            try:
+                for txn in self._config.txn():
+                    state = txn.get_processing_block_state(self._pb_id)
+                    state.update(fields)
+                    for key, values in merged.items():
+                        state[key] = dict(state.get(key) or {}, **values)
+                    if deployments:
+                        statuses = dict(state.get("deployments") or {})
+                        statuses.update(deployments)
+                        state["deployments"] = statuses
+                    txn.update_processing_block_state(self._pb_id, state)
+            except Exception:
+                self._restore(fields, merged, deployments)
+                raise
+            finally:
+                if self._cache is not None:
+                    self._cache.invalidate(PB_STATE)
+
+    def close(self):
+        """
+        Flush the pending updates and stop the flush timer.
+        """
+        self.flush()
+
+    # -------------------------------------
+    # Private methods
+    # -------------------------------------
+
+    def _schedule(self):
+        """Flush now, or start the flush timer if it is not running."""
+        if self._flush_interval <= 0:
+            self.flush()
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self._flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _restore(self, fields, merged, deployments):
+        """Put back updates which could not be written.
+
+        Updates made since the failed flush take precedence.
+
+        """
+        with self._lock:
+            for key, value in fields.items():
+                self._fields.setdefault(key, value)
+            for key, values in merged.items():
+                pending = self._merged.setdefault(key, {})
+                for name, value in values.items():
+                    pending.setdefault(name, value)
+            for key, value in deployments.items():
+                self._deployments.setdefault(key, value)
@@ -3,49 +3,123 @@
 # pylint: disable=no-self-use
 # pylint: disable=too-many-instance-attributes
 # pylint: disable=too-many-locals
+# pylint: disable=too-many-arguments
+# pylint: disable=import-outside-toplevel
+# pylint: disable=global-statement
 
 import logging
 import os
 import sys
-import ska_ser_logging
 import ska_sdp_config
 
-from ska_telmodel.sdp.version import SDP_RECVADDRS_PREFIX
-
-from .phase import Phase
+from . import instrumentation, parameters, recv_addresses, startup
+from .phase import CANCEL_DEADLINE, Phase
 from .buffer_request import BufferRequest
+from .config_cache import ConfigCache, DEPLOYMENTS, SBI
+from .executor import MAX_ENGINES
 from .feature_toggle import FeatureToggle
+from .lease_monitor import LeaseMonitor
+from .state_writer import PBStateWriter
 
 
 FEATURE_CONFIG_DB = FeatureToggle("config_db", True)
 SCHEMA_VERSION = "0.2"
 
-# Initialise logging
-ska_ser_logging.configure_logging()
 LOG = logging.getLogger("ska_sdp_workflow")
 LOG.setLevel(logging.DEBUG)
 
+# Logging is initialised when the first processing block is claimed
+_LOGGING_CONFIGURED = False
+
+
+def configure_logging():
+    """Initialise logging, if it has not been done already."""
+    global _LOGGING_CONFIGURED
+    if not _LOGGING_CONFIGURED:
+        import ska_ser_logging
+
+        ska_ser_logging.configure_logging()
+        _LOGGING_CONFIGURED = True
+
 
 def new_config_db():
-    """Return an SDP configuration client (factory function)."""
+    """Return an SDP configuration client (factory function).
+
+    The client is instrumented to record metrics of the transactions, see
+    :class:`instrumentation.InstrumentedConfig`.
+
+    """
     backend = "etcd3" if FEATURE_CONFIG_DB.is_active() else "memory"
     LOG.info("Using config DB %s backend", backend)
     config_db = ska_sdp_config.Config(backend=backend)
-    return config_db
+    return instrumentation.InstrumentedConfig(config_db)
 
 
 class ProcessingBlock:
     """
     Claim the processing block.
 
+    Updates of the processing block state are written by a
+    :class:`PBStateWriter`, which holds them for the given flush interval so
+    that concurrent updates are merged into a single transaction.
+
+    The processing block, the scheduling block instance, the processing block
+    state and the list of deployments are read through a
+    :class:`ConfigCache`. With the etcd backend, the cache is kept fresh by
+    watching the configuration DB.
+
+    The ownership of the processing block is watched by a
+    :class:`LeaseMonitor`, which cancels the engines of the phases as soon as
+    it is lost. By default, it runs with the etcd backend.
+
+    The startup of the workflow up to the claim of the processing block can
+    be profiled, see :class:`StartupProfiler`, and :func:`fast_start` claims
+    it while importing the engine modules.
+
+    A :class:`WorkflowHost` claims many processing blocks in one process.
+    They share its configuration DB client and its lease monitor, and their
+    caches do not watch the configuration DB.
+
     :param pb_id: processing block ID
     :type pb_id: str, optional
+    :param state_flush_interval: flush interval of the state writer in seconds
+    :type state_flush_interval: float, optional
+    :param cache_max_staleness: maximum age of cached entries in seconds
+    :type cache_max_staleness: float, optional
+    :param monitor_lease: run the lease monitor, defaults to True with the
+        etcd backend
+    :type monitor_lease: bool, optional
+    :param config: shared SDP configuration client, which is not closed on
+        exit
+    :type config: ska_sdp_config.Config, optional
+    :param lease_monitor: shared lease monitor, which is not stopped on exit
+    :type lease_monitor: :class:`LeaseMonitor`, optional
     """
 
-    def __init__(self, pb_id=None):
+    def __init__(
+        self,
+        pb_id=None,
+        state_flush_interval=0.0,
+        cache_max_staleness=1.0,
+        monitor_lease=None,
+        config=None,
+        lease_monitor=None,
+    ):
+        # Initialise logging
+        with startup.PROFILER.stage("configure_logging"):
+            configure_logging()
+
+        # Export metrics if requested
+        instrumentation.start_metrics_server()
+
         # Get connection to config DB
-        LOG.info("Opening connection to config DB")
-        self._config = new_config_db()
+        self._shared = config is not None
+        if self._shared:
+            self._config = config
+        else:
+            LOG.info("Opening connection to config DB")
+            with startup.PROFILER.stage("open_config_db"):
+                self._config = new_config_db()
 
         # Processing block ID
         if pb_id is None:
@@ -55,10 +129,12 @@ class ProcessingBlock:
         LOG.debug("Processing Block ID %s", self._pb_id)
 
         # Claim processing block
-        for txn in self._config.txn():
-            txn.take_processing_block(self._pb_id, self._config.client_lease)
-            pb = txn.get_processing_block(self._pb_id)
+        with startup.PROFILER.stage("claim"):
+            for txn in self._config.txn():
+                txn.take_processing_block(self._pb_id, self._config.client_lease)
+                pb = txn.get_processing_block(self._pb_id)
         LOG.info("Claimed processing block")
+        startup.PROFILER.finish()
 
         # Processing Block
         self._pb = pb
@@ -66,6 +142,32 @@ class ProcessingBlock:
         # Scheduling Block Instance ID
         self._sbi_id = pb.sbi_id
 
+        # Cache of the config DB entries
+        self._cache = ConfigCache(
+            self._config,
+            self._pb_id,
+            self._sbi_id,
+            max_staleness=cache_max_staleness,
+            watch=FEATURE_CONFIG_DB.is_active() and not self._shared,
+        )
+
+        # Monitor of the ownership of the processing block
+        if lease_monitor is not None:
+            self._lease_monitor = lease_monitor
+            self._lease_monitor.add_processing_block(self._pb_id)
+        else:
+            self._lease_monitor = LeaseMonitor(self._config, self._pb_id)
+            if monitor_lease is None:
+                monitor_lease = FEATURE_CONFIG_DB.is_active()
+            if monitor_lease:
+                self._lease_monitor.start()
+        self._shared_monitor = lease_monitor is not None
+
+        # Processing block state writer
+        self._state_writer = PBStateWriter(
+            self._config, self._pb_id, state_flush_interval, cache=self._cache
+        )
+
         # DNS name
         self._service_name = "receive"
         self._chart_name = None
@@ -80,15 +182,21 @@ class ProcessingBlock:
         service_name=None,
         namespace=None,
         configured_host_port=None,
+        compact=False,
     ):
         """
         Generate receive addresses and update the processing block state.
 
+        If compact is set, the receive addresses are written in the compact
+        encoding of :mod:`recv_addresses`, which consumers convert back with
+        :func:`recv_addresses.decode`.
+
         :param scan_types: Scan types
         :param chart_name: Name of the statefulset
         :param service_name: Name of the headless service
         :param namespace: namespace where its going to be deployed
         :param configured_host_port: constructed host and port
+        :param compact: write the receive addresses in the compact encoding
 
         """
         # Generate receive addresses
@@ -96,54 +204,129 @@ class ProcessingBlock:
         receive_addresses = self._update_receive_addresses(
             chart_name, service_name, namespace, configured_host_port
         )
+        if compact:
+            receive_addresses = recv_addresses.encode(receive_addresses)
 
         # Update receive addresses in processing block state
         LOG.info("Updating receive addresses in processing block state")
-        for txn in self._config.txn():
-            state = txn.get_processing_block_state(self._pb_id)
-            state["receive_addresses"] = receive_addresses
-            txn.update_processing_block_state(self._pb_id, state)
+        self._state_writer.set_receive_addresses(receive_addresses)
+        self._state_writer.flush()
 
-        # Write pb_id in pb_receive_addresses in SBI
-        LOG.info("Writing PB ID to pb_receive_addresses in SBI")
-        for txn in self._config.txn():
-            sbi = txn.get_scheduling_block(self._sbi_id)
-            sbi["pb_receive_addresses"] = self._pb_id
-            txn.update_scheduling_block(self._sbi_id, sbi)
+        self._publish_receive_addresses()
+
+    def stream_receive_addresses(
+        self,
+        scan_types,
+        max_channels_per_process,
+        port_start,
+        channels_per_port,
+        chart_name=None,
+        service_name=None,
+        namespace=None,
+        chunk_size=10000,
+        compact=False,
+    ):
+        """
+        Generate receive addresses and write them in chunks.
+
+        This combines :func:`configure_recv_processes_ports` and
+        :func:`receive_addresses`. The addresses are generated scan type by
+        scan type, and the addresses of each scan type are split into chunks
+        of at most ``chunk_size`` host and port entries. Each chunk is written
+        to its own key in its own transaction (see
+        :func:`recv_addresses.write_chunk`), so the size of a transaction
+        does not depend on the number of scan types or channels. Once all the
+        chunks of a scan type are written, their number is merged into the
+        receive addresses in the processing block state. Consumers read the
+        addresses back with :func:`recv_addresses.read_chunks`.
+
+        :param scan_types: scan types from SBI
+        :param max_channels_per_process: maximum number of channels per process
+        :param port_start: starting port the receiver will be listening in
+        :param channels_per_port: number of channels to be sent to each port
+        :param chart_name: Name of the statefulset
+        :param service_name: Name of the headless service
+        :param namespace: namespace where its going to be deployed
+        :param chunk_size: maximum number of host and port entries in a chunk
+        :param compact: write the chunks in the compact encoding
+        :returns: number of receive processes
+        :rtype: int
+
+        """
+        from . import recv_planner
+
+        # Host name format with a placeholder for the index of the process
+        self._configure_host_names(chart_name, service_name, namespace)
+        host_name = self._get_dns_name("-{}.")
+
+        LOG.info("Generating receive addresses in chunks")
+        self._state_writer.set_receive_addresses(
+            {"interface": self._get_receive_addresses_interface()}
+        )
+        self._state_writer.flush()
+
+        num_process = 0
+        chunks = {}
+        for scan_type_id, entry, n_process in recv_planner.iter_receive_addresses(
+            scan_types,
+            max_channels_per_process,
+            port_start,
+            channels_per_port,
+            host_name,
+            max_entries=chunk_size,
+        ):
+            num_process = max(num_process, n_process)
+            if chunks and scan_type_id not in chunks:
+                # The previous scan type is complete
+                self._write_receive_addresses(chunks)
+                chunks = {}
+            if compact:
+                entry = recv_addresses.encode_scan_type(entry)
+            index = chunks.get(scan_type_id, 0)
+            for txn in self._config.txn():
+                recv_addresses.write_chunk(txn, self._pb_id, scan_type_id, index, entry)
+            chunks[scan_type_id] = index + 1
+        if chunks:
+            self._write_receive_addresses(chunks)
+
+        self._publish_receive_addresses()
+        return num_process
 
     def get_parameters(self, schema=None):
         """
         Get workflow parameters from processing block.
 
-        The schema checking is not currently implemented.
+        The schema is compiled the first time it is used, and the compiled
+        validator is reused for later calls with the same schema object.
 
-        :param schema: schema to validate the parameters
+        :param schema: JSON schema to validate the parameters
+        :type schema: dict, optional
         :returns: processing block parameters
         :rtype: dict
+        :raises jsonschema.ValidationError: if the parameters are not valid
 
         """
-        parameters = self._pb.parameters
+        pb_parameters = self._pb.parameters
         if schema is not None:
             LOG.info("Validating parameters against schema")
+            parameters.validate(pb_parameters, schema)
 
-        return parameters
+        return pb_parameters
 
     def get_scan_types(self):
         """
         Get scan types from the scheduling block instance.
 
-        This is only supported for real-time workflows
+        This is only supported for real-time workflows. The SBI is read
+        through the cache.
 
         :returns: scan types
         :rtype: list
 
         """
         LOG.info("Retrieving channel link map from SBI")
-        for txn in self._config.txn():
-            sbi = txn.get_scheduling_block(self._sbi_id)
-            scan_types = sbi.get("scan_types")
-
-        return scan_types
+        sbi = self._cache.get_scheduling_block()
+        return sbi.get("scan_types")
 
     def request_buffer(self, size, tags):
         """
@@ -162,7 +345,9 @@ class ProcessingBlock:
         """
         return BufferRequest(size, tags)
 
-    def create_phase(self, name, requests):
+    def create_phase(
+        self, name, requests, max_engines=MAX_ENGINES, cancel_deadline=CANCEL_DEADLINE
+    ):
         """
         Create a workflow phase for deploying execution engines.
 
@@ -175,6 +360,12 @@ class ProcessingBlock:
         :type name: str
         :param requests: resource requests
         :type requests: list of :class:`BufferRequest`
+        :param max_engines: maximum number of execution engines running in
+            the workflow at the same time
+        :type max_engines: int, optional
+        :param cancel_deadline: time allowed for the execution engines to stop
+            when the processing is cancelled, in seconds
+        :type cancel_deadline: float, optional
         :returns: the phase
         :rtype: :class:`Phase`
 
@@ -182,7 +373,17 @@ class ProcessingBlock:
         workflow = self._pb.workflow
         workflow_type = workflow["type"]
         return Phase(
-            name, requests, self._config, self._pb_id, self._sbi_id, workflow_type
+            name,
+            requests,
+            self._config,
+            self._pb_id,
+            self._sbi_id,
+            workflow_type,
+            state_writer=self._state_writer,
+            cache=self._cache,
+            lease_monitor=self._lease_monitor,
+            max_engines=max_engines,
+            cancel_deadline=cancel_deadline,
         )
 
     def configure_recv_processes_ports(
@@ -190,6 +391,10 @@ class ProcessingBlock:
     ):
         """Calculate how many receive process(es) and ports are required.
 
+        The plan is computed with NumPy array operations by
+        :func:`recv_planner.configure_recv_processes_ports` in its equivalence
+        mode.
+
         :param scan_types: scan types from SBI
         :param max_channels_per_process: maximum number of channels per process
         :param port_start: starting port the receiver will be listening in
@@ -198,91 +403,66 @@ class ProcessingBlock:
         :rtype: dict
 
         """
-        # Initial variables
-        port_count = 0
-        configured_host_port = {}
+        from . import recv_planner
 
-        # Number of receive process
-        num_process = 0
+        return recv_planner.configure_recv_processes_ports(
+            scan_types, max_channels_per_process, port_start, channels_per_port
+        )
+
+    def get_cache(self):
+        """
+        Get the cache of the configuration DB entries.
+
+        :rtype: :class:`ConfigCache`
+
+        """
+        return self._cache
+
+    def get_lease_monitor(self):
+        """
+        Get the monitor of the ownership of the processing block.
 
-        # Total process to deployed
-        total_process = 0
-
-        for scan_type in scan_types:
-            # Initial variables
-            hosts = []
-            ports = []
-            prev_count = 0
-            process_per_channel = 0
-            entry = True
-
-            for chan in scan_type.get("channels"):
-                start = chan.get("start")
-                prev_count = prev_count + chan.get("count")
-                for i in range(0, chan.get("count"), max_channels_per_process):
-                    if entry:
-                        prev_count = prev_count + chan.get("count")
-                        num_process = 1
-                        entry = False
-                    else:
-                        prev_count = prev_count + chan.get("count")
-                        if prev_count >= max_channels_per_process:
-                            process_per_channel += 1
-                            num_process += process_per_channel
-                        if i == 0:
-                            prev_count = 0
-
-                    hosts.append(self._construct_host(start, process_per_channel))
-                    if channels_per_port > 1:
-                        for j in range(0, channels_per_port):
-                            ports.append([start, port_start + j, 1, port_count])
-                            port_count += 1
-                    else:
-                        ports.append([start, port_start, 1])
-                    port_count = 0
-                    start = start + max_channels_per_process
-
-            if num_process > total_process:
-                total_process = num_process
-
-            configured_host_port[scan_type.get("id")] = dict(host=hosts, port=ports)
-
-        return configured_host_port, total_process
+        :rtype: :class:`LeaseMonitor`
+
+        """
+        return self._lease_monitor
 
     def exit(self):
-        """Close connection to the configuration."""
+        """
+        Close connection to the configuration.
+
+        A shared configuration DB client and lease monitor are left open.
+        """
+
+        self._state_writer.close()
+        self._cache.close()
+        if self._shared_monitor:
+            self._lease_monitor.remove_processing_block(self._pb_id)
+        else:
+            self._lease_monitor.stop()
+
+        if not self._shared:
+            LOG.info("Closing connection to config DB")
+            self._config.close()
 
-        LOG.info("Closing connection to config DB")
-        self._config.close()
+            instrumentation.dump_metrics()
 
-    def nested_parameters(self, parameters):
+    def nested_parameters(self, flat_parameters):
         """Convert flattened dictionary to nested dictionary.
 
-        :param parameters: parameters to be converted
+        The conversion is iterative, see :func:`parameters.unflatten`, and a
+        new dictionary is returned on each call.
+
+        :param flat_parameters: parameters to be converted
 
         :return: nested parameters
         """
-
-        result = {}
-        for keys, values in parameters.items():
-            self._split_rec(keys, values, result)
-        return result
+        return parameters.unflatten(flat_parameters)
 
     # -------------------------------------
     # Private methods
     # -------------------------------------
 
-    def _construct_host(self, chan_start, num_process):
-        """Construct a template of the host address.
-
-        :param chan_start: start of the channel
-        :param num_process: number of receive process
-        :return: constructed host address
-
-        """
-        host = [chan_start, "-{}.".format(num_process)]
-        return host
-
     def _update_receive_addresses(
         self,
         chart_name=None,
@@ -300,8 +480,32 @@ class ProcessingBlock:
         :return: receive addresses
 
         """
-        receive_addresses = {}
+        self._configure_host_names(chart_name, service_name, namespace)
+        receive_addresses = self._generate_dns_name(configured_host_port)
 
+        # Add schema interface
+        receive_addresses["interface"] = self._get_receive_addresses_interface()
+        return receive_addresses
+
+    @staticmethod
+    def _get_receive_addresses_interface():
+        """Get the schema interface of the receive addresses.
+
+        :return: interface URI
+        """
+        # The telescope model is only needed for the receive addresses
+        from ska_telmodel.sdp.version import SDP_RECVADDRS_PREFIX
+
+        return SDP_RECVADDRS_PREFIX + SCHEMA_VERSION
+
+    def _configure_host_names(self, chart_name=None, service_name=None, namespace=None):
+        """Set the names used to make the DNS names of the receive processes.
+
+        :param chart_name: Name of the statefulset
+        :param service_name: Name of the headless service
+        :param namespace: namespace where its going to be deployed
+
+        """
         if service_name is not None:
             self._service_name = service_name
 
@@ -310,54 +514,76 @@ class ProcessingBlock:
         else:
             self._namespace = os.environ["SDP_HELM_NAMESPACE"]
 
-        receive_addresses = self._generate_dns_name(configured_host_port, chart_name)
+        if chart_name is not None:
+            self._chart_name = chart_name
+        else:
+            # The cached list may not have the deployment yet, so it is read
+            # again if it is not found
+            chart_name = self._find_receive_deployment()
+            if chart_name is None:
+                self._cache.invalidate(DEPLOYMENTS)
+                chart_name = self._find_receive_deployment()
+            if chart_name is not None:
+                self._chart_name = chart_name
+
+    def _get_dns_name(self, host):
+        """Make the DNS name of a receive process.
+
+        :param host: host part of the name, between the chart and service names
+        :return: dns name
 
-        # Add schema interface
-        receive_addresses["interface"] = SDP_RECVADDRS_PREFIX + SCHEMA_VERSION
-        return receive_addresses
+        """
+        return (
+            self._chart_name
+            + host
+            + self._service_name
+            + "."
+            + self._namespace
+            + ".svc.cluster.local"
+        )
+
+    def _write_receive_addresses(self, chunks):
+        """Merge the number of chunks of scan types into the receive addresses.
+
+        :param chunks: number of chunks by scan type
+        """
+        LOG.debug("Writing receive addresses of %d scan type(s)", len(chunks))
+        self._state_writer.merge_field(
+            "receive_addresses",
+            {key: {recv_addresses.CHUNKS: count} for key, count in chunks.items()},
+        )
+        self._state_writer.flush()
+
+    def _publish_receive_addresses(self):
+        """Write pb_id in pb_receive_addresses in SBI."""
+        LOG.info("Writing PB ID to pb_receive_addresses in SBI")
+        for txn in self._config.txn():
+            sbi = txn.get_scheduling_block(self._sbi_id)
+            sbi["pb_receive_addresses"] = self._pb_id
+            txn.update_scheduling_block(self._sbi_id, sbi)
+        self._cache.invalidate(SBI)
 
-    def _generate_dns_name(self, configured_host_port, chart_name=None):
+    def _generate_dns_name(self, configured_host_port):
         """Generate DNS name for the receive processes.
 
-        :param chan_start: start of the channel
-        :param chart_name: Name of the statefulset
         :param configured_host_port: constructed host and port
         :return: dns name
 
         """
-
-        if chart_name is not None:
-            self._chart_name = chart_name
-        else:
-            for txn in self._config.txn():
-                for deploy_id in txn.list_deployments():
-                    if self._pb_id in deploy_id:
-                        if "-receive" in deploy_id:
-                            self._chart_name = deploy_id
-
         for values in configured_host_port.values():
             for host in values["host"]:
-                dns_name = (
-                    self._chart_name
-                    + host[1]
-                    + self._service_name
-                    + "."
-                    + self._namespace
-                    + ".svc.cluster.local"
-                )
-                host[1] = dns_name
+                host[1] = self._get_dns_name(host[1])
 
         return configured_host_port
 
-    def _split_rec(self, keys, values, out):
-        """Splitting keys in dictionary using recursive approach.
+    def _find_receive_deployment(self):
+        """Find the receive deployment of the processing block.
 
-        :param keys: keys from the dictionary
-        :param values: values from the dictionary
-        :param out: output result
+        :return: deployment ID, or None if not found
         """
-        keys, *rest = keys.split(".", 1)
-        if rest:
-            self._split_rec(rest[0], values, out.setdefault(keys, {}))
-        else:
-            out[keys] = values
+        found = None
+        for deploy_id in self._cache.list_deployments():
+            if self._pb_id in deploy_id:
+                if "-receive" in deploy_id:
+                    found = deploy_id
+        return found
@@ -0,0 +1,58 @@
+"""Asyncio workflow API tests."""
+
+import asyncio
+import time
+
+from ska_sdp_workflow import AsyncProcessingBlock
+from .test_workflow import (
+    CONFIG_DB_CLIENT,
+    wipe_config_db,
+    create_sbi_pbi,
+    create_pb_states,
+)
+
+
+def test_async_batch_workflow():
+    """Test running a batch workflow with the asyncio API."""
+
+    # Wipe the config DB
+    wipe_config_db()
+
+    # Create sbi and pb
+    create_sbi_pbi()
+
+    # Create processing block states
+    create_pb_states()
+
+    pb_id = "pb-mvp01-20200425-00002"
+
+    async def workflow():
+        pb = await AsyncProcessingBlock.create(pb_id)
+        work_phase = pb.create_phase("Work", [])
+
+        async with work_phase:
+            deploys = [
+                await work_phase.ee_deploy_test(
+                    "test-{}".format(i), time.sleep, (0.01,)
+                )
+                for i in range(3)
+            ]
+            await work_phase.wait_for(*deploys, timeout=10.0)
+
+            count = 0
+            async for txn in work_phase.wait_loop():
+                pb_state = txn.get_processing_block_state(pb_id)
+                assert pb_state.get("status") == "RUNNING"
+                count += 1
+                break
+            assert count == 1
+
+        return [deploy.get_id() for deploy in deploys]
+
+    deploy_ids = asyncio.run(workflow())
+
+    for txn in CONFIG_DB_CLIENT.txn():
+        pb_state = txn.get_processing_block_state(pb_id)
+        assert pb_state.get("status") == "FINISHED"
+        for deploy_id in deploy_ids:
+            assert pb_state["deployments"][deploy_id] == "FINISHED"
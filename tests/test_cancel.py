@@ -0,0 +1,88 @@
+"""Workflow cancellation tests."""
+
+import concurrent.futures
+import time
+
+import pytest
+
+from ska_sdp_workflow.phase import ProcessingCancelledError
+from .test_workflow import (
+    CONFIG_DB_CLIENT,
+    create_pb_states,
+    create_sbi_pbi,
+    create_work_phase,
+    wipe_config_db,
+)
+
+PB_ID = "pb-mvp01-20200425-00001"
+
+
+def sleep(seconds):
+    """Sleep in a worker process."""
+    time.sleep(seconds)
+    return seconds
+
+
+def set_pb_status(status):
+    """Set the status of the processing block."""
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(PB_ID)
+        state["status"] = status
+        txn.update_processing_block_state(PB_ID, state)
+
+
+def test_cancel_local():
+    """Test cancelling a local process pool when the PB is cancelled."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with pytest.raises(ProcessingCancelledError):
+        with work_phase:
+            deploy = work_phase.ee_deploy_local(
+                "batch", sleep, [(0.2,)] * 100, max_workers=2
+            )
+            set_pb_status("CANCELLED")
+            work_phase.wait_for(deploy, timeout=30.0)
+
+    # The calls which had not started were dropped
+    assert isinstance(deploy.exception(), concurrent.futures.CancelledError)
+    assert deploy.get_results() is None
+    assert work_phase.get_cancel_time() < 10.0
+
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(PB_ID)
+    assert state["status"] == "CANCELLED"
+    assert state["deployments"][deploy.get_id()] == "CANCELLED"
+
+
+def test_cancel_deadline():
+    """Test abandoning the engines which do not stop before the deadline."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with work_phase:
+        helm = work_phase.ee_deploy_helm("test")
+        deploy = work_phase.ee_deploy_test("test-fake", time.sleep, (0.5,))
+        removed = work_phase.cancel(deadline=0.1)
+
+    assert removed == [helm.get_id()]
+    assert work_phase.get_cancel_time() < 0.5
+    assert not deploy.done()
+
+    for txn in CONFIG_DB_CLIENT.txn():
+        assert helm.get_id() not in txn.list_deployments()
+        state = txn.get_processing_block_state(PB_ID)
+    assert state["deployments"][helm.get_id()] == "CANCELLED"
+    assert state["deployments"][deploy.get_id()] == "CANCELLED"
+
+    # The abandoned engine finishes without overwriting the status
+    assert deploy.exception(timeout=5.0) is None
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(PB_ID)
+    assert state["deployments"][deploy.get_id()] == "CANCELLED"
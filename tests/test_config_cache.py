@@ -0,0 +1,80 @@
+"""Configuration DB cache tests."""
+
+import time
+
+from ska_sdp_workflow.config_cache import ConfigCache, SBI
+from .test_workflow import CONFIG_DB_CLIENT, wipe_config_db, create_sbi_pbi
+
+PB_ID = "pb-mvp01-20200425-00000"
+SBI_ID = "sbi-mvp01-20200619-00000"
+
+
+def test_read_through():
+    """Test reading an entry on a miss and serving it from the cache."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    cache = ConfigCache(CONFIG_DB_CLIENT, PB_ID, SBI_ID, max_staleness=60.0)
+
+    sbi = cache.get_scheduling_block()
+    assert sbi["id"] == SBI_ID
+    assert cache.get_processing_block().id == PB_ID
+    assert cache.list_deployments() == []
+
+    # Values are copies, so modifying them does not change the cache
+    sbi["status"] = "FINISHED"
+    assert cache.get_scheduling_block()["status"] == "ACTIVE"
+
+    stats = cache.get_stats()
+    assert stats["sbi"] == {"hits": 1, "misses": 1}
+    assert stats["pb"] == {"hits": 0, "misses": 1}
+    cache.close()
+
+
+def test_invalidate():
+    """Test invalidating entries after writing to the config DB."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    cache = ConfigCache(CONFIG_DB_CLIENT, PB_ID, SBI_ID, max_staleness=60.0)
+    assert cache.get_scheduling_block()["status"] == "ACTIVE"
+
+    for txn in CONFIG_DB_CLIENT.txn():
+        sbi = txn.get_scheduling_block(SBI_ID)
+        sbi["status"] = "FINISHED"
+        txn.update_scheduling_block(SBI_ID, sbi)
+
+    assert cache.get_scheduling_block()["status"] == "ACTIVE"
+    cache.invalidate(SBI)
+    assert cache.get_scheduling_block()["status"] == "FINISHED"
+    assert cache.get_stats()["sbi"] == {"hits": 1, "misses": 2}
+    cache.close()
+
+
+def test_max_staleness():
+    """Test reading an entry again when it is older than the maximum."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    cache = ConfigCache(CONFIG_DB_CLIENT, PB_ID, SBI_ID, max_staleness=0.01)
+
+    cache.get_scheduling_block()
+    time.sleep(0.02)
+    cache.get_scheduling_block()
+    assert cache.get_stats()["sbi"] == {"hits": 0, "misses": 2}
+    cache.close()
+
+
+def test_watch():
+    """Test filling the cache from the watcher."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    cache = ConfigCache(CONFIG_DB_CLIENT, PB_ID, SBI_ID, max_staleness=60.0, watch=True)
+
+    # The memory backend does not wait for changes, so the watcher reads the
+    # entries once and stops
+    cache.close()
+    assert not cache.is_watching()
+    assert cache.get_scheduling_block()["id"] == SBI_ID
+    assert cache.get_stats()["sbi"] == {"hits": 1, "misses": 0}
@@ -0,0 +1,122 @@
+"""Dask adaptive scaling tests."""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import ska_sdp_config
+
+from ska_sdp_workflow.dask_adaptive import AdaptiveMonitor, AdaptiveScaler
+from ska_sdp_workflow.instrumentation import METRICS
+from .test_workflow import CONFIG_DB_CLIENT, wipe_config_db
+
+DEPLOY_ID = "proc-pb-mvp01-20200425-00001-dask"
+
+
+def test_decide():
+    """Test deciding the number of workers from the backlog."""
+
+    scaler = AdaptiveScaler(1, 8, tasks_per_worker=2, scale_down_delay=10.0)
+
+    # Scaling up is immediate and bounded by the maximum
+    assert scaler.decide(1, 5, now=0.0) == 3
+    assert scaler.decide(3, 100, now=1.0) == 8
+
+    # Scaling down waits for the delay
+    assert scaler.decide(8, 0, now=2.0) == 8
+    assert scaler.decide(8, 2, now=11.0) == 8
+    assert scaler.decide(8, 2, now=12.0) == 1
+
+    # A higher backlog resets the delay
+    assert scaler.decide(4, 0, now=20.0) == 4
+    assert scaler.decide(4, 8, now=25.0) == 4
+    assert scaler.decide(4, 0, now=31.0) == 4
+    assert scaler.decide(4, 0, now=41.0) == 1
+
+    with pytest.raises(ValueError):
+        AdaptiveScaler(4, 2)
+
+
+def test_monitor_step():
+    """Test rescaling the deployment in the configuration DB."""
+
+    wipe_config_db()
+    for txn in CONFIG_DB_CLIENT.txn():
+        txn.create_deployment(
+            ska_sdp_config.Deployment(
+                DEPLOY_ID, "helm", {"chart": "dask", "values": {"worker.replicas": 2}}
+            )
+        )
+
+    connection = MagicMock()
+    connection.get_backlog.return_value = 20
+    scaler = AdaptiveScaler(1, 4, scale_down_delay=0.0)
+    monitor = AdaptiveMonitor(CONFIG_DB_CLIENT, DEPLOY_ID, connection, scaler, 2)
+    labels = {"deployment": DEPLOY_ID, "direction": "up"}
+    before = METRICS.get("dask_scaling_decisions_total", labels) or 0
+
+    assert monitor.step()
+    assert monitor.get_workers() == 4
+    assert get_replicas() == 4
+    assert METRICS.get("dask_scaling_decisions_total", labels) == before + 1
+
+    # No change when the backlog still needs the same number of workers
+    assert not monitor.step()
+
+    connection.get_backlog.return_value = 0
+    assert monitor.step()
+    assert get_replicas() == 1
+
+
+def test_monitor_disabled():
+    """Test disabling scaling if deployments cannot be updated."""
+
+    txn = MagicMock(spec=["get_deployment", "delete_deployment", "create_deployment"])
+    config = MagicMock()
+    config.txn.return_value = [txn]
+    connection = MagicMock()
+    connection.get_backlog.return_value = 20
+    scaler = AdaptiveScaler(1, 4)
+    monitor = AdaptiveMonitor(config, DEPLOY_ID, connection, scaler, 2)
+
+    assert not monitor.step()
+    assert monitor.get_workers() == 2
+    txn.delete_deployment.assert_not_called()
+    txn.create_deployment.assert_not_called()
+
+    # The backlog is no longer checked
+    assert not monitor.step()
+    connection.get_backlog.assert_called_once_with()
+
+
+def test_monitor_stop_blocked():
+    """Test that stopping does not wait for a step blocked on the scheduler."""
+
+    event = threading.Event()
+
+    def get_backlog():
+        event.wait(10.0)
+        return 0
+
+    connection = MagicMock()
+    connection.get_backlog.side_effect = get_backlog
+    scaler = AdaptiveScaler(1, 4)
+    monitor = AdaptiveMonitor(
+        CONFIG_DB_CLIENT, DEPLOY_ID, connection, scaler, 2, interval=0.01
+    )
+    monitor.start()
+    while not connection.get_backlog.called:
+        time.sleep(0.01)
+
+    start = time.monotonic()
+    monitor.stop(timeout=0.1)
+    assert time.monotonic() - start < 5.0
+    event.set()
+
+
+def get_replicas():
+    """Get the number of worker replicas of the deployment."""
+    for txn in CONFIG_DB_CLIENT.txn():
+        deploy = txn.get_deployment(DEPLOY_ID)
+    return deploy.args["values"]["worker.replicas"]
@@ -0,0 +1,184 @@
+"""Dask connection tests."""
+
+import concurrent.futures
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from ska_sdp_workflow.dask_connection import DaskConnection
+
+ADDRESS = "proc-pb-test-dask-scheduler.sdp:8786"
+
+
+@patch("ska_sdp_workflow.dask_connection.distributed.Client")
+def test_connect_with_backoff(mock_client):
+    """Test retrying the connection with exponential backoff."""
+
+    client = MagicMock()
+    mock_client.side_effect = [OSError("refused")] * 4 + [client]
+
+    connection = DaskConnection(ADDRESS, initial_delay=0.5, max_delay=2.0)
+    # The backoff waits on the cancellation event
+    event = connection._cancelled  # pylint: disable=protected-access
+    with patch.object(event, "wait") as mock_sleep:
+        assert connection.connect() is client
+    assert connection.get_time_to_ready() is not None
+
+    # Exactly one client is created and reused
+    assert connection.connect() is client
+    assert mock_client.call_count == 5
+
+    delays = [call.args[0] for call in mock_sleep.call_args_list]
+    assert delays == [0.5, 1.0, 2.0, 2.0]
+
+    connection.wait_for_workers(2)
+    client.wait_for_workers.assert_called_once_with(n_workers=2, timeout=1.0)
+
+    connection.close()
+    client.close.assert_called_once_with()
+    assert connection.get_client() is None
+
+
+@patch("ska_sdp_workflow.dask_connection.distributed.Client")
+def test_connect_timeout(mock_client):
+    """Test giving up when the scheduler is not ready in time."""
+
+    mock_client.side_effect = OSError("refused")
+
+    connection = DaskConnection(ADDRESS, timeout=0.05, initial_delay=0.01)
+    with pytest.raises(TimeoutError):
+        connection.connect()
+    assert connection.get_client() is None
+
+
+@patch("ska_sdp_workflow.dask_connection.distributed.Client")
+def test_cancel_waits(mock_client):
+    """Test that cancelling stops waiting for the scheduler and the workers."""
+
+    mock_client.side_effect = OSError("refused")
+    connection = DaskConnection(ADDRESS, initial_delay=10.0)
+    timer = threading.Timer(0.05, connection.cancel)
+    timer.start()
+    start = time.monotonic()
+    with pytest.raises(concurrent.futures.CancelledError):
+        connection.connect()
+    assert time.monotonic() - start < 5.0
+    timer.join()
+
+    client = MagicMock()
+    client.wait_for_workers.side_effect = TimeoutError("no workers")
+    mock_client.side_effect = [client]
+    connection = DaskConnection(ADDRESS)
+    timer = threading.Timer(0.05, connection.cancel)
+    timer.start()
+    with pytest.raises(concurrent.futures.CancelledError):
+        connection.wait_for_workers(2)
+    timer.join()
+
+    # The wait for the workers is bounded by the timeout
+    connection = DaskConnection(ADDRESS, timeout=0.05)
+    mock_client.side_effect = [client]
+    with pytest.raises(TimeoutError):
+        connection.wait_for_workers(2)
+
+
+@patch("ska_sdp_workflow.dask_connection.distributed.as_completed")
+@patch("ska_sdp_workflow.dask_connection.distributed.futures_of")
+@patch("ska_sdp_workflow.dask_connection.distributed.Client")
+def test_stream(mock_client, mock_futures_of, mock_as_completed):
+    """Test passing the parts of a result to a sink as they complete."""
+
+    futures = []
+    for i in range(3):
+        future = MagicMock()
+        future.key = ("part", i)
+        future.result.return_value = i * 10
+        futures.append(future)
+    mock_futures_of.return_value = futures
+    mock_as_completed.side_effect = reversed
+
+    parts = []
+    connection = DaskConnection(ADDRESS)
+    assert connection.stream("collection", lambda *part: parts.append(part)) == 3
+
+    mock_client.return_value.persist.assert_called_once_with("collection")
+    assert parts == [(("part", 2), 20), (("part", 1), 10), (("part", 0), 0)]
+    for future in futures:
+        future.release.assert_called_once_with()
+
+
+@patch("ska_sdp_workflow.dask_connection.distributed.as_completed")
+@patch("ska_sdp_workflow.dask_connection.distributed.futures_of")
+@patch("ska_sdp_workflow.dask_connection.distributed.Client")
+def test_cancel(mock_client, mock_futures_of, mock_as_completed):
+    """Test cancelling the futures of a computation on the cluster."""
+
+    client = mock_client.return_value
+    futures = [MagicMock(), MagicMock()]
+    mock_futures_of.return_value = futures
+    connection = DaskConnection(ADDRESS)
+
+    def cancel_while_running(running):
+        connection.cancel()
+        for future in running:
+            future.result.side_effect = concurrent.futures.CancelledError()
+        return running
+
+    mock_as_completed.side_effect = cancel_while_running
+
+    with pytest.raises(concurrent.futures.CancelledError):
+        connection.stream("collection", lambda *part: None)
+    client.cancel.assert_called_once_with(futures, force=True)
+
+    # Computations started after the cancellation stop straight away
+    with pytest.raises(concurrent.futures.CancelledError):
+        connection.compute("collection")
+    assert client.cancel.call_count == 2
+
+
+@patch("ska_sdp_workflow.dask_connection.distributed.Client")
+def test_close_on_error(mock_client):
+    """Test closing the client when the computation raises."""
+
+    client = mock_client.return_value
+    client.compute.side_effect = RuntimeError("worker died")
+
+    with pytest.raises(RuntimeError):
+        with DaskConnection(ADDRESS) as connection:
+            connection.compute("collection")
+    client.close.assert_called_once_with()
+    assert connection.get_client() is None
+
+
+@patch("ska_sdp_workflow.dask_connection.distributed.Client")
+def test_get_backlog(mock_client):
+    """Test counting the tasks waiting or running on the scheduler."""
+
+    tasks = {
+        key: MagicMock(state=state)
+        for key, state in enumerate(["waiting", "processing", "memory", "queued"])
+    }
+    scheduler = MagicMock(tasks=tasks)
+    mock_client.return_value.run_on_scheduler.side_effect = lambda f: f(scheduler)
+
+    connection = DaskConnection(ADDRESS)
+    assert connection.get_backlog() == 3
+
+
+@patch("ska_sdp_workflow.dask_connection.distributed.wait")
+@patch("ska_sdp_workflow.dask_connection.distributed.futures_of")
+@patch("ska_sdp_workflow.dask_connection.distributed.Client")
+def test_publish(mock_client, mock_futures_of, mock_wait):
+    """Test keeping a result on the cluster as a named dataset."""
+
+    client = mock_client.return_value
+    connection = DaskConnection(ADDRESS)
+    connection.publish("collection", "image")
+
+    persisted = client.persist.return_value
+    mock_futures_of.assert_called_once_with(persisted)
+    mock_wait.assert_called_once_with(persisted)
+    client.publish_dataset.assert_called_once_with(persisted, name="image")
+    client.compute.assert_not_called()
@@ -0,0 +1,117 @@
+"""Execution engine executor tests."""
+
+import threading
+import time
+
+import pytest
+
+from ska_sdp_workflow.ee_base_deploy import DeploymentFailedError
+from ska_sdp_workflow.executor import EngineExecutor
+from .test_workflow import (
+    CONFIG_DB_CLIENT,
+    create_pb_states,
+    create_sbi_pbi,
+    create_work_phase,
+    wipe_config_db,
+)
+
+PB_ID = "pb-mvp01-20200425-00001"
+
+
+def test_max_engines():
+    """Test limiting the number of engines running at the same time."""
+
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def engine(value):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return value
+
+    executor = EngineExecutor(max_engines=2)
+    futures = [executor.submit(engine, i) for i in range(6)]
+    assert [future.result(timeout=5.0) for future in futures] == list(range(6))
+    assert running[1] == 2
+    assert executor.get_num_threads() == 2
+
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        executor.submit(engine, 0)
+
+
+def test_max_threads():
+    """Test that the number of threads does not grow with the engines."""
+
+    event = threading.Event()
+    before = set(threading.enumerate())
+    executor = EngineExecutor(max_engines=3)
+    futures = [executor.submit(event.wait) for _ in range(50)]
+    workers = set(threading.enumerate()) - before
+    assert len(workers) == 3
+    assert executor.get_num_threads() == 3
+    assert futures[-1].cancel()
+
+    event.set()
+    executor.shutdown()
+    assert all(future.result(timeout=5.0) for future in futures[:-1])
+    assert not any(thread.is_alive() for thread in workers)
+
+
+def test_daemon_threads():
+    """Test that the process does not wait for the engines on exit."""
+
+    event = threading.Event()
+    executor = EngineExecutor()
+    future = executor.submit(event.wait)
+    assert any(
+        thread.daemon
+        for thread in threading.enumerate()
+        if thread.name != threading.current_thread().name
+    )
+    assert not future.done()
+    event.set()
+    assert future.result(timeout=5.0)
+
+
+def test_deployment_result():
+    """Test the result of a deployment running in the workflow."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with work_phase:
+        deploy = work_phase.ee_deploy_test("test", lambda t: t * 2, (0.5,))
+        assert deploy.result(timeout=5.0) == 1.0
+        assert deploy.exception() is None
+        assert deploy.done()
+
+
+def test_deployment_failed():
+    """Test marking a deployment as failed when the engine raises."""
+
+    def fail(_):
+        raise ValueError("engine failed")
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with work_phase:
+        deploy = work_phase.ee_deploy_test("test", fail, (0.0,))
+        assert isinstance(deploy.exception(timeout=5.0), ValueError)
+        with pytest.raises(ValueError):
+            deploy.result()
+
+        for txn in CONFIG_DB_CLIENT.txn():
+            state = txn.get_processing_block_state(PB_ID)
+            assert state["deployments"][deploy.get_id()] == "FAILED"
+            with pytest.raises(DeploymentFailedError):
+                deploy.is_finished(txn)
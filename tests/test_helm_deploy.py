@@ -0,0 +1,132 @@
+"""Helm deployment readiness tests."""
+
+import asyncio
+import threading
+
+import pytest
+
+from ska_sdp_workflow.async_phase import AsyncPhase
+from ska_sdp_workflow.helm_deploy import set_deployment_ready
+from ska_sdp_workflow.instrumentation import METRICS
+from .test_workflow import (
+    CONFIG_DB_CLIENT,
+    create_pb_states,
+    create_sbi_pbi,
+    create_work_phase,
+    wipe_config_db,
+)
+
+PB_ID = "pb-mvp01-20200425-00001"
+
+
+def test_wait_until_ready():
+    """Test waiting for the deployment to be marked as ready."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with work_phase:
+        deploy = work_phase.ee_deploy_helm("receive", track_ready=True)
+        assert deploy.get_time_to_ready() is None
+        for txn in CONFIG_DB_CLIENT.txn():
+            values = txn.get_deployment(deploy.get_id()).args["values"]
+            assert values["sdp_readiness"] == {
+                "pb_id": PB_ID,
+                "deploy_id": deploy.get_id(),
+            }
+
+        timer = threading.Timer(0.05, set_ready, args=(deploy.get_id(),))
+        timer.start()
+        time_to_ready = deploy.wait_until_ready(timeout=5.0)
+        timer.join()
+
+        assert time_to_ready == deploy.get_time_to_ready()
+        assert time_to_ready >= 0.05
+        for txn in CONFIG_DB_CLIENT.txn():
+            assert deploy.is_ready(txn)
+
+
+def test_wait_until_ready_timeout():
+    """Test the timeout waiting for the deployment to be ready."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with work_phase:
+        deploy = work_phase.ee_deploy_helm("receive", track_ready=True)
+        with pytest.raises(TimeoutError):
+            deploy.wait_until_ready(timeout=0.05)
+        assert deploy.get_time_to_ready() is None
+
+        # Asyncio version
+        set_ready(deploy.get_id())
+        async_phase = AsyncPhase(work_phase)
+        time_to_ready = asyncio.run(async_phase.wait_until_ready(deploy, timeout=1.0))
+        assert time_to_ready == deploy.get_time_to_ready()
+
+
+def test_readiness_not_tracked():
+    """Test that waiting for an untracked deployment fails straight away."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with work_phase:
+        deploy = work_phase.ee_deploy_helm("receive", {"beam": 0})
+        assert not deploy.is_tracking_ready()
+        with pytest.raises(RuntimeError):
+            deploy.wait_until_ready(timeout=5.0)
+        for txn in CONFIG_DB_CLIENT.txn():
+            assert txn.get_deployment(deploy.get_id()).args["values"] == {"beam": 0}
+            with pytest.raises(RuntimeError):
+                deploy.is_ready(txn)
+
+
+def test_deploy_helm_bulk():
+    """Test deploying several Helm charts in one transaction."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+    charts = {"receive-{}".format(i): {"beam": i} for i in range(4)}
+
+    with work_phase:
+        before = METRICS.total("config_transactions_total")
+        group = work_phase.ee_deploy_helm_bulk(charts, track_ready=True)
+        assert METRICS.total("config_transactions_total") - before == 1
+
+        deploy_ids = ["proc-{}-{}".format(PB_ID, name) for name in charts]
+        assert len(group) == 4
+        assert group.get_ids() == deploy_ids
+        for txn in CONFIG_DB_CLIENT.txn():
+            assert set(txn.list_deployments()) == set(deploy_ids)
+            state = txn.get_processing_block_state(PB_ID)
+            assert state["deployments"] == {i: "RUNNING" for i in deploy_ids}
+            assert txn.get_deployment(deploy_ids[1]).args["values"]["beam"] == 1
+            assert not group.is_ready(txn)
+            assert not group.is_finished(txn)
+
+        for deploy_id in deploy_ids:
+            set_ready(deploy_id)
+        assert group.wait_until_ready(timeout=1.0) >= 0.0
+
+        group.remove()
+        for txn in CONFIG_DB_CLIENT.txn():
+            assert txn.list_deployments() == []
+
+
+# -----------------------------------------------------------------------------
+# Ancillary functions
+# -----------------------------------------------------------------------------
+
+
+def set_ready(deploy_id):
+    """Report a deployment as ready, as the engine would."""
+    set_deployment_ready(CONFIG_DB_CLIENT, PB_ID, deploy_id)
@@ -0,0 +1,93 @@
+"""Workflow host tests."""
+
+import threading
+import time
+from unittest.mock import patch
+
+from ska_sdp_workflow import workflow
+from ska_sdp_workflow.host import WorkflowHost
+from .test_workflow import (
+    CONFIG_DB_CLIENT,
+    create_pb_states,
+    create_sbi_pbi,
+    wipe_config_db,
+)
+
+PB_IDS = ["pb-mvp01-20200425-00001", "pb-mvp01-20200425-00002"]
+
+
+def run_phase(pb, monitor):
+    """Workflow function running an empty phase."""
+    assert pb.get_lease_monitor() is monitor
+    with pb.create_phase("Work", []):
+        pass
+    return pb.get_cache().get_processing_block().id
+
+
+def test_host():
+    """Test driving several processing blocks with one connection."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+
+    with patch.object(
+        workflow, "new_config_db", wraps=workflow.new_config_db
+    ) as mock_new_config_db:
+        with WorkflowHost(max_pbs=2, monitor_lease=True) as host:
+            monitor = host.get_lease_monitor()
+            assert host.run(PB_IDS, run_phase, monitor) == PB_IDS
+            assert monitor.is_watching()
+
+    # The processing blocks do not open their own connections
+    mock_new_config_db.assert_called_once_with()
+    assert not monitor.is_watching()
+
+    for txn in CONFIG_DB_CLIENT.txn():
+        for pb_id in PB_IDS:
+            state = txn.get_processing_block_state(pb_id)
+            assert state["status"] == "FINISHED"
+
+
+def test_host_monitor_and_close():
+    """Test the shared monitor after losing a PB, and closing when stuck."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+
+    host = WorkflowHost(monitor_lease=True)
+    monitor = host.get_lease_monitor()
+    lost = []
+
+    # The monitor keeps running after the ownership of every PB is lost
+    pb = host.claim(PB_IDS[0])
+    monitor.add_callback(lambda: lost.append(PB_IDS[0]), PB_IDS[0])
+    delete_owner(PB_IDS[0])
+    assert monitor.get_lost_event(PB_IDS[0]).wait(5.0)
+    pb.exit()
+    time.sleep(0.2)
+    assert monitor.is_watching()
+
+    # So the callbacks of a PB claimed later are still called
+    pb = host.claim(PB_IDS[1])
+    monitor.add_callback(lambda: lost.append(PB_IDS[1]), PB_IDS[1])
+    delete_owner(PB_IDS[1])
+    assert monitor.get_lost_event(PB_IDS[1]).wait(5.0)
+    pb.exit()
+    assert lost == PB_IDS
+
+    # A stuck workflow function does not hang the host
+    event = threading.Event()
+    future = host.submit(PB_IDS[0], lambda pb: event.wait(10.0))
+    start = time.monotonic()
+    host.close(timeout=0.1)
+    assert time.monotonic() - start < 5.0
+    assert not future.done()
+    assert not monitor.is_watching()
+    event.set()
+
+
+def delete_owner(pb_id):
+    """Delete the owner key of a processing block, as an expired lease does."""
+    CONFIG_DB_CLIENT.backend.delete("/pb/{}/owner".format(pb_id), must_exist=False)
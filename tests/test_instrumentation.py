@@ -0,0 +1,114 @@
+"""Configuration DB instrumentation tests."""
+
+import json
+import urllib.request
+
+from ska_sdp_workflow import instrumentation
+from ska_sdp_workflow.instrumentation import (
+    InstrumentedConfig,
+    MetricsRegistry,
+    serve_metrics,
+)
+from .test_workflow import CONFIG_DB_CLIENT, wipe_config_db, create_sbi_pbi
+
+PB_ID = "pb-mvp01-20200425-00000"
+
+
+def test_registry():
+    """Test counters, gauges and histograms."""
+
+    registry = MetricsRegistry()
+    registry.inc("requests_total", {"api": "a"})
+    registry.inc("requests_total", {"api": "a"}, 2)
+    registry.inc("requests_total", {"api": "b"})
+    registry.set("workers", 4)
+    registry.observe("latency_seconds", 0.003)
+    registry.observe("latency_seconds", 20.0)
+
+    assert registry.get("requests_total", {"api": "a"}) == 3
+    assert registry.total("requests_total") == 4
+    assert registry.get("workers") == 4
+    hist = registry.get("latency_seconds")
+    assert hist["count"] == 2
+    assert hist["buckets"][0] == 0
+    assert hist["buckets"][-1] == 1
+
+    text = registry.to_prometheus()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{api="a"} 3' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+    registry.reset()
+    assert registry.get("workers") is None
+
+
+def test_instrumented_config(tmp_path):
+    """Test counting transactions, reads and writes per API method."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+
+    registry = MetricsRegistry()
+    config = InstrumentedConfig(CONFIG_DB_CLIENT, registry)
+    instrumentation.FEATURE_COUNT_BYTES.set_default(True)
+    try:
+        create_state(config)
+        read_state(config)
+        read_state(config)
+    finally:
+        instrumentation.FEATURE_COUNT_BYTES.set_default(False)
+
+    create = {"api": "create_state"}
+    read = {"api": "read_state"}
+    assert registry.get("config_transactions_total", create) == 1
+    assert registry.get("config_writes_total", create) == 1
+    assert registry.get("config_reads_total", create) == 0
+    assert registry.get("config_bytes_written_total", create) > 0
+    assert registry.get("config_transactions_total", read) == 2
+    assert registry.get("config_reads_total", read) == 4
+    assert registry.get("config_transaction_retries_total", read) == 0
+    assert registry.get("config_transaction_seconds", read)["count"] == 2
+
+    path = tmp_path / "metrics.json"
+    registry.dump(str(path))
+    with open(path, "r", encoding="utf-8") as file:
+        snapshot = json.load(file)
+    assert {"name": "config_transactions_total", "labels": read, "value": 2} in (
+        snapshot["counters"]
+    )
+
+
+def test_serve_metrics():
+    """Test serving the metrics over HTTP."""
+
+    registry = MetricsRegistry()
+    registry.inc("requests_total")
+    server = serve_metrics(0, registry)
+    try:
+        url = "http://localhost:{}/metrics".format(server.server_address[1])
+        with urllib.request.urlopen(url) as response:
+            text = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "requests_total 1" in text
+
+
+# -----------------------------------------------------------------------------
+# Ancillary functions
+# -----------------------------------------------------------------------------
+
+
+def create_state(config):
+    """Create PB state."""
+    for txn in config.txn():
+        txn.create_processing_block_state(PB_ID, {"status": "RUNNING"})
+
+
+def read_state(config):
+    """Read PB state and ownership."""
+    for txn in config.txn():
+        txn.get_processing_block_state(PB_ID)
+        txn.is_processing_block_owner(PB_ID)
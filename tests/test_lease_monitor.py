@@ -0,0 +1,67 @@
+"""Lease monitor tests."""
+
+import threading
+
+from ska_sdp_workflow import workflow
+from ska_sdp_workflow.lease_monitor import LeaseMonitor
+from .test_workflow import (
+    CONFIG_DB_CLIENT,
+    create_pb_states,
+    create_sbi_pbi,
+    wipe_config_db,
+)
+
+PB_ID = "pb-mvp01-20200425-00001"
+
+
+def delete_owner():
+    """Delete the owner key of the processing block, as an expired lease does."""
+    CONFIG_DB_CLIENT.backend.delete("/pb/{}/owner".format(PB_ID), must_exist=False)
+
+
+def test_lease_monitor():
+    """Test calling the callbacks once when the ownership is lost."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    for txn in CONFIG_DB_CLIENT.txn():
+        txn.take_processing_block(PB_ID, CONFIG_DB_CLIENT.client_lease)
+
+    calls = []
+    monitor = LeaseMonitor(CONFIG_DB_CLIENT, PB_ID, interval=0.1)
+    monitor.add_callback(lambda: calls.append("first"))
+    monitor.start()
+    assert monitor.is_watching()
+    assert not monitor.get_lost_event().wait(0.3)
+
+    delete_owner()
+    assert monitor.get_lost_event().wait(5.0)
+    assert monitor.is_lost()
+    monitor.stop()
+    assert calls == ["first"]
+
+    # Callbacks added after the ownership is lost are called straight away
+    monitor.add_callback(lambda: calls.append("second"))
+    assert calls == ["first", "second"]
+
+
+def test_cancel_on_ownership_lost():
+    """Test cancelling the engines of a phase when the ownership is lost."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    pb = workflow.ProcessingBlock(PB_ID, monitor_lease=True)
+    monitor = pb.get_lease_monitor()
+    work_phase = pb.create_phase("Work", [])
+
+    event = threading.Event()
+    with work_phase:
+        deploy = work_phase.ee_deploy_test("test", event.wait, (5.0,))
+        delete_owner()
+        assert monitor.get_lost_event().wait(5.0)
+        assert deploy.is_cancelled()
+        event.set()
+
+    pb.exit()
+    assert not monitor.is_watching()
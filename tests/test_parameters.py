@@ -0,0 +1,102 @@
+"""Workflow parameters tests."""
+
+import jsonschema
+import pytest
+
+from ska_sdp_workflow import parameters, workflow
+from .test_workflow import VALUES, create_pb_states, create_sbi_pbi, wipe_config_db
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"reception.num_ports": {"type": "integer", "minimum": 1}},
+    "required": ["reception.num_ports"],
+}
+
+
+def test_validate():
+    """Test validating parameters with a cached validator."""
+
+    parameters.validate(VALUES, SCHEMA)
+    validator = parameters.get_validator(SCHEMA)
+    assert parameters.get_validator(SCHEMA) is validator
+
+    # The cache is keyed by the schema object and bounded
+    assert parameters.get_validator(dict(SCHEMA)) is not validator
+    schemas = [
+        {"type": "integer", "minimum": minimum}
+        for minimum in range(parameters.VALIDATOR_CACHE_SIZE + 1)
+    ]
+    for schema in schemas:
+        parameters.get_validator(schema)
+    validators = parameters._VALIDATORS  # pylint: disable=protected-access
+    assert len(validators) == parameters.VALIDATOR_CACHE_SIZE
+    assert id(SCHEMA) not in validators
+    assert id(schemas[-1]) in validators
+
+    with pytest.raises(jsonschema.ValidationError):
+        parameters.validate({"reception.num_ports": 0}, SCHEMA)
+
+
+def test_flatten_unflatten():
+    """Test converting parameters between flattened and nested."""
+
+    flat = make_parameters(100)
+    nested = parameters.unflatten(flat)
+    assert nested == recursive_nested_parameters(flat)
+    assert nested["channels"]["7"]["phase"] == {"x": 0.0}
+    assert parameters.flatten(nested) == flat
+
+
+def test_processing_block_parameters():
+    """Test validating and converting the parameters of a processing block."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    pb = workflow.ProcessingBlock("pb-mvp01-20200425-00000")
+
+    assert pb.get_parameters({"type": "object"}) == pb.get_parameters()
+    with pytest.raises(jsonschema.ValidationError):
+        pb.get_parameters({"type": "array"})
+
+    # Each call returns new nested parameters
+    flat = make_parameters(10)
+    nested = pb.nested_parameters(flat)
+    assert nested == recursive_nested_parameters(flat)
+    nested["channels"]["3"]["gain"] = 2.0
+    assert pb.nested_parameters(flat)["channels"]["3"]["gain"] == 1.0
+
+    # Changes to the flattened parameters in place are seen
+    flat["reception.num_ports"] = 2
+    assert pb.nested_parameters(flat)["reception"]["num_ports"] == 2
+
+
+# -----------------------------------------------------------------------------
+# Ancillary functions
+# -----------------------------------------------------------------------------
+
+
+def make_parameters(n_channels):
+    """Make flattened parameters with per-channel settings."""
+    flat = {"reception.receiver_port_start": 9000, "reception.num_ports": 1}
+    for i in range(n_channels):
+        flat["channels.{}.gain".format(i)] = 1.0
+        flat["channels.{}.phase.x".format(i)] = 0.0
+    return flat
+
+
+def recursive_nested_parameters(flat):
+    """Convert flattened parameters with the original recursive approach."""
+    result = {}
+    for keys, values in flat.items():
+        _split_rec(keys, values, result)
+    return result
+
+
+def _split_rec(keys, values, out):
+    """Split keys in dictionary using recursive approach."""
+    keys, *rest = keys.split(".", 1)
+    if rest:
+        _split_rec(rest[0], values, out.setdefault(keys, {}))
+    else:
+        out[keys] = values
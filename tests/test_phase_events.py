@@ -0,0 +1,102 @@
+"""Phase event stream tests."""
+
+import threading
+import time
+
+import pytest
+
+from ska_sdp_workflow.phase import ProcessingCancelledError
+from ska_sdp_workflow.phase_events import (
+    DEPLOYMENT_STATUS,
+    SBI_STATUS,
+    PhaseEvent,
+)
+from .test_workflow import (
+    CONFIG_DB_CLIENT,
+    create_pb_states,
+    create_sbi_pbi,
+    create_work_phase,
+    wipe_config_db,
+)
+
+PB_ID = "pb-mvp01-20200425-00001"
+
+
+def update_pb_state(**fields):
+    """Update fields of the PB state."""
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(PB_ID)
+        state.update(fields)
+        txn.update_processing_block_state(PB_ID, state)
+
+
+def set_deployments(deployments, delay=0.0):
+    """Set the deployment statuses one after the other."""
+    for deployment in deployments:
+        time.sleep(delay)
+        update_pb_state(deployments=deployment)
+
+
+def test_coalesce_events():
+    """Test coalescing a burst of changes into one event per value."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+    events = work_phase.events(debounce=0.5)
+
+    # Deployment b is created and removed during the burst
+    thread = threading.Thread(
+        target=set_deployments,
+        args=(
+            [
+                {"a": "RUNNING"},
+                {"a": "RUNNING", "b": "RUNNING"},
+                {"a": "FINISHED"},
+            ],
+            0.05,
+        ),
+    )
+    thread.start()
+    assert next(events) == PhaseEvent(DEPLOYMENT_STATUS, "FINISHED", key="a")
+    thread.join()
+
+    update_pb_state(deployments={"a": "FINISHED", "b": "FAILED"})
+    assert next(events) == PhaseEvent(DEPLOYMENT_STATUS, "FAILED", key="b")
+
+
+def test_filter_events():
+    """Test watching only the kinds of event requested."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+    stream = work_phase.events(kinds=[SBI_STATUS])
+
+    # Changes of the PB state are not read at all
+    update_pb_state(status="READY", deployments={"a": "RUNNING"})
+    for txn in CONFIG_DB_CLIENT.txn():
+        sbi_id = txn.get_processing_block(PB_ID).sbi_id
+        sbi = txn.get_scheduling_block(sbi_id)
+        sbi["status"] = "FINISHED"
+        txn.update_scheduling_block(sbi_id, sbi)
+    assert next(stream) == PhaseEvent(SBI_STATUS, "FINISHED", previous="ACTIVE")
+
+    with pytest.raises(ValueError):
+        work_phase.events(kinds=["unknown"])
+
+
+def test_cancelled_event():
+    """Test raising when the processing block is cancelled."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+    events = work_phase.events()
+
+    update_pb_state(status="CANCELLED")
+    with pytest.raises(ProcessingCancelledError):
+        next(events)
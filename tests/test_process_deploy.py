@@ -0,0 +1,65 @@
+"""Local process pool deployment tests."""
+
+import os
+
+import pytest
+
+from ska_sdp_workflow.ee_base_deploy import DeploymentFailedError, wait_until
+from .test_workflow import (
+    CONFIG_DB_CLIENT,
+    create_pb_states,
+    create_sbi_pbi,
+    create_work_phase,
+    wipe_config_db,
+)
+
+PB_ID = "pb-mvp01-20200425-00001"
+
+
+def square(value):
+    """Square a value in a worker process."""
+    return value * value, os.getpid()
+
+
+def invert(value):
+    """Invert a value in a worker process."""
+    return 1 / value
+
+
+def test_ee_deploy_local():
+    """Test running a batch of calls on a local process pool."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with work_phase:
+        deploy = work_phase.ee_deploy_local(
+            "batch", square, [(i,) for i in range(20)], max_workers=2, chunksize=5
+        )
+        assert wait_until(CONFIG_DB_CLIENT, deploy.is_finished, timeout=60.0)
+
+        results = deploy.get_results()
+        assert [value for value, _ in results] == [i * i for i in range(20)]
+        assert os.getpid() not in {pid for _, pid in results}
+
+        for txn in CONFIG_DB_CLIENT.txn():
+            state = txn.get_processing_block_state(PB_ID)
+        assert state["deployments"][deploy.get_id()] == "FINISHED"
+
+
+def test_ee_deploy_local_failed():
+    """Test marking the deployment as failed when a call raises."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+    work_phase = create_work_phase(PB_ID)
+
+    with work_phase:
+        deploy = work_phase.ee_deploy_local("batch", invert, [(1,), (0,)])
+        assert isinstance(deploy.exception(timeout=60.0), ZeroDivisionError)
+        with pytest.raises(DeploymentFailedError):
+            wait_until(CONFIG_DB_CLIENT, deploy.is_finished, timeout=5.0)
+        assert deploy.get_results() is None
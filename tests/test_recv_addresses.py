@@ -0,0 +1,47 @@
+"""Compact receive address encoding tests."""
+
+import json
+
+from ska_sdp_workflow import recv_addresses, recv_planner
+from .test_workflow import SCAN_TYPES, read_receive_addresses
+
+
+def test_encode_runs():
+    """Test encoding entries as runs and decoding them."""
+
+    entries = [[0, 9000, 1], [20, 9000, 1], [40, 9000, 1], [50, 9001, 1, 1], [7]]
+    runs = recv_addresses.encode_runs(entries)
+    assert runs == [
+        [3, 0, 9000, 1, 20, 0, 0],
+        [1, 50, 9001, 1, 1, 0, 0, 0, 0],
+        [1, 7, 0],
+    ]
+    assert recv_addresses.decode_runs(runs) == entries
+    assert not recv_addresses.encode_runs([])
+
+
+def test_round_trip():
+    """Test that decoding the compact encoding gives the receive addresses."""
+
+    for channels_per_port in (1, 3):
+        configured, _ = recv_planner.configure_recv_processes_ports(
+            SCAN_TYPES, 2, 9000, channels_per_port
+        )
+        for value in configured.values():
+            for host in value["host"]:
+                host[1] = "proc-pb-receive" + host[1] + "receive.sdp.svc.cluster.local"
+        configured["calibration_B"]["host"][0][1] = "receive-01.sdp"
+        configured["interface"] = "https://schema.skao.int/ska-sdp-recvaddrs/0.2"
+
+        compact = recv_addresses.encode(configured)
+        assert compact["interface"] == configured["interface"]
+        assert recv_addresses.is_compact(compact["science_A"])
+        assert recv_addresses.decode(compact) == configured
+        assert len(json.dumps(compact)) < len(json.dumps(configured))
+        assert compact["science_A"]["templates"] == [
+            ["proc-pb-receive-", ".receive.sdp.svc.cluster.local"]
+        ]
+
+    # Receive addresses which are not compact are unchanged
+    expected = read_receive_addresses()
+    assert recv_addresses.decode(expected) == expected
@@ -0,0 +1,133 @@
+"""Receive process and port planner tests."""
+
+# pylint: disable=invalid-name
+# pylint: disable=too-many-locals
+
+import random
+
+import numpy
+
+from ska_sdp_workflow import recv_planner
+
+
+def test_equivalent_to_loop_implementation():
+    """Test the planner against the original loop-based implementation."""
+
+    rng = random.Random(42)
+    for _ in range(500):
+        scan_types = []
+        for i in range(rng.randint(0, 4)):
+            channels = [
+                {
+                    "count": rng.choice([0, 1, 3, 4, 5, 7, 10, 13, 40]),
+                    "start": rng.randint(0, 5000),
+                }
+                for _ in range(rng.randint(0, 5))
+            ]
+            scan_types.append({"id": "scan_{}".format(i), "channels": channels})
+        max_channels = rng.randint(1, 12)
+        channels_per_port = rng.randint(1, 3)
+
+        expected = loop_configure_recv_processes_ports(
+            scan_types, max_channels, 9000, channels_per_port
+        )
+        result = recv_planner.configure_recv_processes_ports(
+            scan_types, max_channels, 9000, channels_per_port
+        )
+        assert result == expected
+
+
+def test_arrays_mode():
+    """Test returning the plan as arrays."""
+
+    scan_types = [
+        {
+            "id": "science_A",
+            "channels": [{"count": 4, "start": 0}, {"count": 7, "start": 2000}],
+        }
+    ]
+    plans, num_process = recv_planner.configure_recv_processes_ports(
+        scan_types, 4, 9000, 1, mode=recv_planner.ARRAYS
+    )
+    plan = plans["science_A"]
+
+    assert num_process == 4
+    assert len(plan) == 3
+    numpy.testing.assert_array_equal(plan.start, [0, 2000, 2004])
+    numpy.testing.assert_array_equal(plan.host_index, [0, 1, 2])
+    assert plan.ports(9000, 2)[:2] == [[0, 9000, 1, 0], [0, 9001, 1, 1]]
+
+
+def test_iter_receive_addresses_blocks():
+    """Test splitting the addresses of a scan type into blocks."""
+
+    scan_types = [
+        {"id": "science_A", "channels": [{"count": 40, "start": 0}]},
+        {"id": "calibration_B", "channels": [{"count": 7, "start": 100}]},
+    ]
+    expected = {
+        scan_type_id: entry
+        for scan_type_id, entry, _ in recv_planner.iter_receive_addresses(
+            scan_types, 4, 9000, 2, "host-{}"
+        )
+    }
+    for max_entries in (1, 3, 7, 10000):
+        result = {}
+        for scan_type_id, entry, _ in recv_planner.iter_receive_addresses(
+            scan_types, 4, 9000, 2, "host-{}", max_entries=max_entries
+        ):
+            # Each block holds whole steps, one host and two port entries each
+            assert len(entry["host"]) + len(entry["port"]) <= max(max_entries, 3)
+            joined = result.setdefault(scan_type_id, {"host": [], "port": []})
+            joined["host"].extend(entry["host"])
+            joined["port"].extend(entry["port"])
+        assert result == expected
+
+
+# -----------------------------------------------------------------------------
+# Ancillary functions
+# -----------------------------------------------------------------------------
+
+
+def loop_configure_recv_processes_ports(
+    scan_types, max_channels_per_process, port_start, channels_per_port
+):
+    """Original loop-based implementation, used as the reference."""
+    configured_host_port = {}
+    num_process = 0
+    total_process = 0
+
+    for scan_type in scan_types:
+        hosts = []
+        ports = []
+        prev_count = 0
+        process_per_channel = 0
+        entry = True
+
+        for chan in scan_type.get("channels"):
+            start = chan.get("start")
+            prev_count = prev_count + chan.get("count")
+            for i in range(0, chan.get("count"), max_channels_per_process):
+                prev_count = prev_count + chan.get("count")
+                if entry:
+                    num_process = 1
+                    entry = False
+                else:
+                    if prev_count >= max_channels_per_process:
+                        process_per_channel += 1
+                        num_process += process_per_channel
+                    if i == 0:
+                        prev_count = 0
+
+                hosts.append([start, "-{}.".format(process_per_channel)])
+                if channels_per_port > 1:
+                    for j in range(0, channels_per_port):
+                        ports.append([start, port_start + j, 1, j])
+                else:
+                    ports.append([start, port_start, 1])
+                start = start + max_channels_per_process
+
+        total_process = max(total_process, num_process)
+        configured_host_port[scan_type.get("id")] = {"host": hosts, "port": ports}
+
+    return configured_host_port, total_process
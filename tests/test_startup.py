@@ -0,0 +1,119 @@
+"""Workflow startup tests."""
+
+import json
+import os
+import subprocess
+import sys
+
+# Script running a real-time workflow which only deploys a Helm chart. It
+# prints the modules which should not have been imported.
+HELM_WORKFLOW = """
+import sys
+import ska_sdp_config
+import ska_sdp_workflow
+from ska_sdp_workflow import workflow
+
+workflow.FEATURE_CONFIG_DB.set_default(False)
+for txn in workflow.new_config_db().txn():
+    txn.create_scheduling_block("sbi-test", {"status": "ACTIVE", "scan_types": []})
+    txn.create_processing_block(
+        ska_sdp_config.ProcessingBlock(
+            "pb-test",
+            "sbi-test",
+            {"type": "realtime", "id": "test", "version": "0.1.0"},
+            parameters={},
+            dependencies=[],
+        )
+    )
+    txn.create_processing_block_state(
+        "pb-test", {"status": "WAITING", "resources_available": True}
+    )
+
+pb = ska_sdp_workflow.ProcessingBlock("pb-test")
+phase = pb.create_phase("Work", [])
+with phase:
+    phase.ee_deploy_helm("test")
+pb.exit()
+
+for name in ("distributed", "dask", "ska_sdp_workflow.dask_deploy"):
+    if name in sys.modules:
+        print(name)
+"""
+
+# Script claiming a processing block with the fast start entry point. It
+# prints whether the engine module has been imported in the background.
+FAST_START_WORKFLOW = """
+import sys
+import ska_sdp_workflow
+from ska_sdp_workflow import workflow
+
+import ska_sdp_config
+
+workflow.FEATURE_CONFIG_DB.set_default(False)
+for txn in workflow.new_config_db().txn():
+    txn.create_scheduling_block("sbi-test", {"status": "ACTIVE", "scan_types": []})
+    txn.create_processing_block(
+        ska_sdp_config.ProcessingBlock(
+            "pb-test",
+            "sbi-test",
+            {"type": "batch", "id": "test", "version": "0.1.0"},
+            parameters={},
+            dependencies=[],
+        )
+    )
+
+pb = ska_sdp_workflow.fast_start(
+    "pb-test", modules=["ska_sdp_workflow.recv_planner", "missing"], wait=True
+)
+pb.exit()
+print("ska_sdp_workflow.recv_planner" in sys.modules)
+"""
+
+
+def test_helm_workflow_does_not_import_dask():
+    """Test that Dask is not imported when only a Helm chart is deployed."""
+
+    env = dict(os.environ)
+    env.pop("FEATURE_CONFIG_DB", None)
+    result = subprocess.run(
+        [sys.executable, "-c", HELM_WORKFLOW],
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    assert result.stdout.split() == []
+
+
+def test_lazy_import():
+    """Test that the classes are loaded on first use."""
+
+    import ska_sdp_workflow  # pylint: disable=import-outside-toplevel
+
+    assert "DaskDeploy" in dir(ska_sdp_workflow)
+    assert ska_sdp_workflow.DaskDeploy.__name__ == "DaskDeploy"
+    assert set(ska_sdp_workflow.__all__) <= set(dir(ska_sdp_workflow))
+
+
+def test_startup_profile(tmp_path):
+    """Test profiling the startup of a workflow started with fast start."""
+
+    path = tmp_path / "startup.json"
+    env = dict(os.environ)
+    env.pop("FEATURE_CONFIG_DB", None)
+    env["SDP_WORKFLOW_STARTUP_PROFILE"] = str(path)
+    result = subprocess.run(
+        [sys.executable, "-c", FAST_START_WORKFLOW],
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    assert result.stdout.split() == ["True"]
+
+    with open(path, "r", encoding="utf-8") as file:
+        report = json.load(file)
+    stages = [stage["stage"] for stage in report["stages"]]
+    assert stages == ["configure_logging", "open_config_db", "claim"]
+    assert "ska_sdp_config" in report["imports"]
+    assert report["elapsed"] >= report["stages"][-1]["start"] > 0
@@ -0,0 +1,140 @@
+"""Processing block state writer tests."""
+# pylint: disable=too-few-public-methods
+
+import time
+
+import pytest
+
+from ska_sdp_workflow.state_writer import PBStateWriter
+from .test_workflow import CONFIG_DB_CLIENT, wipe_config_db, create_sbi_pbi
+
+PB_ID = "pb-mvp01-20200425-00002"
+
+
+def test_write_through():
+    """Test writing every update immediately."""
+
+    create_pb_state({"status": "RUNNING", "deployments": {}})
+    writer = PBStateWriter(CONFIG_DB_CLIENT, PB_ID)
+
+    writer.set_deployment_status("proc-dask", "RUNNING")
+    assert not writer.is_pending()
+    assert get_pb_state()["deployments"] == {"proc-dask": "RUNNING"}
+
+
+def test_coalesce_updates():
+    """Test merging updates and writing them in one flush."""
+
+    create_pb_state({"status": "RUNNING", "deployments": {"proc-a": "RUNNING"}})
+    writer = PBStateWriter(CONFIG_DB_CLIENT, PB_ID, flush_interval=60.0)
+
+    writer.set_deployment_status("proc-b", "RUNNING")
+    writer.set_deployment_status("proc-a", "FINISHED")
+    writer.set_deployment_status("proc-b", "FINISHED")
+    writer.set_receive_addresses({"science_A": {}})
+    writer.set_status("FINISHED")
+    assert writer.is_pending()
+    assert get_pb_state() == {
+        "status": "RUNNING",
+        "deployments": {"proc-a": "RUNNING"},
+    }
+
+    writer.flush()
+    assert not writer.is_pending()
+    assert get_pb_state() == {
+        "status": "FINISHED",
+        "deployments": {"proc-a": "FINISHED", "proc-b": "FINISHED"},
+        "receive_addresses": {"science_A": {}},
+    }
+
+
+def test_flush_interval():
+    """Test flushing automatically after the flush interval."""
+
+    create_pb_state({"status": "RUNNING", "deployments": {}})
+    writer = PBStateWriter(CONFIG_DB_CLIENT, PB_ID, flush_interval=0.05)
+
+    writer.set_deployment_status("proc-dask", "FINISHED")
+    for _ in range(100):
+        if not writer.is_pending():
+            break
+        time.sleep(0.01)
+    assert not writer.is_pending()
+
+    # Wait for the flush to complete
+    writer.close()
+    assert get_pb_state()["deployments"] == {"proc-dask": "FINISHED"}
+
+
+def test_flush_retry():
+    """Test flushing when the transaction is retried or fails."""
+
+    create_pb_state({"status": "RUNNING", "deployments": {}})
+
+    # The body of the transaction loop runs twice
+    writer = PBStateWriter(RetryConfig(), PB_ID, flush_interval=60.0)
+    writer.merge_field("receive_addresses", {"science_A": {"host": []}})
+    writer.set_deployment_status("proc-dask", "RUNNING")
+    writer.flush()
+    assert get_pb_state() == {
+        "status": "RUNNING",
+        "deployments": {"proc-dask": "RUNNING"},
+        "receive_addresses": {"science_A": {"host": []}},
+    }
+
+    # The updates are kept if the transaction fails
+    writer = PBStateWriter(FailOnceConfig(), PB_ID, flush_interval=60.0)
+    writer.merge_field("receive_addresses", {"science_B": {"host": []}})
+    writer.set_deployment_status("proc-dask", "FINISHED")
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    assert writer.is_pending()
+
+    writer.flush()
+    state = get_pb_state()
+    assert state["deployments"] == {"proc-dask": "FINISHED"}
+    assert set(state["receive_addresses"]) == {"science_A", "science_B"}
+
+
+# -----------------------------------------------------------------------------
+# Ancillary functions
+# -----------------------------------------------------------------------------
+
+
+def create_pb_state(state):
+    """Create SBI and PBs and the state of the PB."""
+    wipe_config_db()
+    create_sbi_pbi()
+    for txn in CONFIG_DB_CLIENT.txn():
+        txn.create_processing_block_state(PB_ID, state)
+
+
+def get_pb_state():
+    """Get the state of the PB."""
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(PB_ID)
+    return state
+
+
+class RetryConfig:
+    """Configuration client running the body of each transaction twice."""
+
+    def txn(self):
+        """Yield the transaction twice, as when it is retried."""
+        for txn in CONFIG_DB_CLIENT.txn():
+            yield txn
+            yield txn
+
+
+class FailOnceConfig:
+    """Configuration client whose first transaction fails."""
+
+    def __init__(self):
+        self._failed = False
+
+    def txn(self):
+        """Fail the first time, then start the transaction."""
+        if not self._failed:
+            self._failed = True
+            raise RuntimeError("Connection lost")
+        return CONFIG_DB_CLIENT.txn()
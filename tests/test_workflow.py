@@ -5,16 +5,20 @@
 # pylint: disable=invalid-name
 # pylint: disable=too-many-locals
 
+import contextlib
 import os
 import json
 import logging
+import threading
+import time
 from unittest.mock import patch
 import ska_sdp_config
 import yaml
 
 from ska_telmodel.schema import validate
 from ska_telmodel.sdp.version import SDP_RECVADDRS_PREFIX
-from ska_sdp_workflow import workflow
+from ska_sdp_workflow import recv_addresses, workflow
+from ska_sdp_workflow.instrumentation import METRICS
 
 LOG = logging.getLogger("workflow-test")
 LOG.setLevel(logging.DEBUG)
@@ -199,6 +203,110 @@ def test_real_time_workflow():
         assert pb_status == "FINISHED"
 
 
+def test_phase_enter_transactions():
+    """Test the number of transactions used to start a phase."""
+
+    # Wipe the config DB
+    wipe_config_db()
+
+    # Create sbi and pb
+    create_sbi_pbi()
+
+    pb_id = "pb-mvp01-20200425-00001"
+    for txn in CONFIG_DB_CLIENT.txn():
+        txn.create_processing_block_state(
+            pb_id, {"status": "WAITING", "resources_available": True}
+        )
+
+    work_phase = create_work_phase(pb_id)
+    assert work_phase.get_enter_txn_count() is None
+
+    with work_phase:
+        assert work_phase.get_enter_txn_count() == 1
+        for txn in CONFIG_DB_CLIENT.txn():
+            pb_state = txn.get_processing_block_state(pb_id)
+            assert pb_state.get("status") == "RUNNING"
+            assert pb_state.get("deployments") == {}
+
+
+def test_phase_enter_waiting():
+    """Test committing WAITING before waiting for the resources."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+
+    pb_id = "pb-mvp01-20200425-00001"
+    for txn in CONFIG_DB_CLIENT.txn():
+        txn.create_processing_block_state(pb_id, {"status": "RUNNING"})
+
+    work_phase = create_work_phase(pb_id)
+    thread = threading.Thread(target=work_phase.__enter__, daemon=True)
+    thread.start()
+
+    # WAITING is visible to other clients while the phase waits
+    deadline = time.monotonic() + 5.0
+    status = None
+    while status != "WAITING" and time.monotonic() < deadline:
+        time.sleep(0.01)
+        for txn in CONFIG_DB_CLIENT.txn():
+            status = txn.get_processing_block_state(pb_id).get("status")
+    assert status == "WAITING"
+    time.sleep(0.3)
+    assert thread.is_alive()
+
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(pb_id)
+        state["resources_available"] = True
+        txn.update_processing_block_state(pb_id, state)
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
+
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(pb_id)
+    assert state["status"] == "RUNNING"
+    assert state["deployments"] == {}
+    work_phase.__exit__(None, None, None)  # pylint: disable=unnecessary-dunder-call
+
+
+def test_check_state(caplog):
+    """Test reading the state once per check and logging status changes."""
+
+    wipe_config_db()
+    create_sbi_pbi()
+    create_pb_states()
+
+    pb_id = "pb-mvp01-20200425-00001"
+    work_phase = create_work_phase(pb_id)
+    labels = {"pb_id": pb_id, "phase": "Work"}
+
+    before = METRICS.total("config_reads_total")
+    checks = METRICS.get("phase_state_checks_total", labels) or 0
+    with caplog.at_level(logging.INFO, logger="ska_sdp_workflow"):
+        for _ in range(3):
+            for txn in CONFIG_DB_CLIENT.txn():
+                assert work_phase.check_state(txn)["status"] == "RUNNING"
+
+    # PB state, owner and SBI for each check
+    assert METRICS.total("config_reads_total") - before == 9
+    assert METRICS.get("phase_state_checks_total", labels) == checks + 3
+
+    # Identical messages are logged once within the interval
+    assert len([r for r in caplog.records if "SBI status" in r.message]) == 1
+
+    # A changed state is always logged
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(pb_id)
+        state["status"] = "READY"
+        txn.update_processing_block_state(pb_id, state)
+    with caplog.at_level(logging.INFO, logger="ska_sdp_workflow"):
+        for _ in range(2):
+            for txn in CONFIG_DB_CLIENT.txn():
+                assert work_phase.check_state(txn)["status"] == "READY"
+    messages = [r.message for r in caplog.records if "SBI status" in r.message]
+    assert len(messages) == 2
+    assert "PB status READY" in messages[1]
+
+
 @patch.dict(os.environ, MOCK_ENV_VARS)
 def test_batch_workflow():
     """Test batch workflow"""
@@ -318,6 +426,54 @@ def test_receive_addresses():
         assert pb_status == "FINISHED"
 
 
+@patch.dict(os.environ, MOCK_ENV_VARS)
+def test_stream_receive_addresses():
+    """Test generating receive addresses and writing them in chunks."""
+
+    # Wipe the config DB
+    wipe_config_db()
+
+    # Create sbi and pb
+    create_sbi_pbi()
+
+    # Create processing block states
+    create_pb_states()
+
+    pb_id = "pb-mvp01-20200425-00000"
+    pb = workflow.ProcessingBlock(pb_id)
+    work_phase = pb.create_phase("Work", [])
+
+    with work_phase:
+        work_phase.ee_deploy_helm("test-receive")
+
+        # Receive addresses generated in one go
+        host_port, num_process = pb.configure_recv_processes_ports(
+            SCAN_TYPES, 2, 9000, 3
+        )
+        pb.receive_addresses(configured_host_port=host_port)
+        expected = get_receive_addresses(pb_id)
+
+        for chunk_size, compact in ((1, False), (10000, False), (5, True)):
+            assert (
+                pb.stream_receive_addresses(
+                    SCAN_TYPES, 2, 9000, 3, chunk_size=chunk_size, compact=compact
+                )
+                == num_process
+            )
+            streamed = get_receive_addresses(pb_id)
+            for txn in CONFIG_DB_CLIENT.txn():
+                assert recv_addresses.read_chunks(txn, pb_id, streamed) == expected
+
+            # The scan types are split into chunks, not the state
+            chunks = [
+                value["chunks"] for key, value in streamed.items() if key != "interface"
+            ]
+            if chunk_size == 1:
+                assert min(chunks) > 1
+            elif chunk_size == 10000:
+                assert max(chunks) == 1
+
+
 @patch.dict(os.environ, MOCK_ENV_VARS)
 def test_dns_name():
     """Test generating dns name."""
@@ -382,6 +538,48 @@ def test_dns_name():
         assert pb_state.get("status") == "FINISHED"
 
 
+def test_remove_deployments():
+    """Test removing the deployments of several phases."""
+
+    # Wipe the config DB
+    wipe_config_db()
+
+    # Create sbi and pb
+    create_sbi_pbi()
+
+    # Create processing block states
+    create_pb_states()
+
+    pb_ids = ["pb-mvp01-20200425-00000", "pb-mvp01-20200425-00001"]
+    phases = [create_work_phase(pb_id) for pb_id in pb_ids]
+
+    with contextlib.ExitStack() as stack:
+        for work_phase in phases:
+            stack.enter_context(work_phase)
+            work_phase.ee_deploy_helm_bulk({"receive": None, "vis-receive": None})
+
+        # Set scheduling block instance to FINISHED
+        for txn in CONFIG_DB_CLIENT.txn():
+            for sbi_id in txn.list_scheduling_blocks():
+                sbi = txn.get_scheduling_block(sbi_id)
+                sbi["status"] = "FINISHED"
+                txn.update_scheduling_block(sbi_id, sbi)
+
+        for work_phase in phases:
+            assert work_phase.is_sbi_finished()
+            assert work_phase.get_teardown_time() is None
+
+        removed = workflow.Phase.remove_many(phases)
+        assert removed == [
+            ["proc-{}-receive".format(pb_id), "proc-{}-vis-receive".format(pb_id)]
+            for pb_id in pb_ids
+        ]
+        for work_phase in phases:
+            assert work_phase.get_teardown_time() >= 0.0
+        for txn in CONFIG_DB_CLIENT.txn():
+            assert txn.list_deployments() == []
+
+
 @patch.dict(os.environ, MOCK_ENV_VARS)
 def test_port():
     """Test generating and updating receive addresses."""
@@ -508,8 +706,8 @@ def get_sbi_pbs():
 def create_pb_states():
     """Create PB states in the config DB.
 
-    This creates the PB states with status = RUNNING, and for any workflow
-    matching the list of receive workflows, it adds the receive addresses.
+    This creates the PB states with status = RUNNING and the resources
+    available, so that the phases start without waiting.
 
     """
 
@@ -518,10 +716,17 @@ def create_pb_states():
         for pb_id in pb_list:
             pb_state = txn.get_processing_block_state(pb_id)
             if pb_state is None:
-                pb_state = {"status": "RUNNING"}
+                pb_state = {"status": "RUNNING", "resources_available": True}
                 txn.create_processing_block_state(pb_id, pb_state)
 
 
+def get_receive_addresses(pb_id):
+    """Get the receive addresses from the PB state."""
+    for txn in CONFIG_DB_CLIENT.txn():
+        state = txn.get_processing_block_state(pb_id)
+    return state.get("receive_addresses")
+
+
 def read_configuration_string():
     """Read configuration string from JSON file."""
     return read_json_data("configuration_string.json", decode=True)